@@ -0,0 +1,196 @@
+# A scaling benchmark suite for Run_MRT_for_All_Sources() on
+# synthetic topologies from 100 to 50000 nodes.
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.  Run it from this directory with:
+#     python mrt_benchmark_suite.py <results file> [<baseline file>]
+# It writes one JSON line per case to the results file and, given a
+# baseline file written by an earlier run, reports the cases whose
+# throughput or memory got worse by more than REGRESSION_TOLERANCE.
+# The exit status is 1 if there are any.
+#
+# Each case is a topology from one of the generators in
+# mrt_benchmarks.py (rings of rings, Clos, grid, random geometric and
+# scale-free) at one of SUITE_SIZES, with parallel links, asymmetric
+# metrics, some nodes outside the MRT Island for profile 0, and
+# prefixes advertised by up to three nodes.  The work done by
+# Run_MRT_for_All_Sources() grows as the square of the number of
+# nodes, which is far too long to run in full at 50000 nodes.  So the
+# GADAG is computed once, as Run_MRT_for_All_Sources() does, and then
+# only MAX_SAMPLED_SOURCES sources, evenly spaced in node_list, are
+# run.  The total time is estimated as the GADAG time plus the mean
+# time per sampled source times the number of nodes.  The phase times
+# and SPF counts of mrt.Enable_Instrumentation() are recorded for the
+# sampled sources.
+#
+# Each case runs in its own worker process, so that the peak resident
+# set size (ru_maxrss) of that process is the memory used by that
+# case alone, on top of the memory of this process when it forked.
+
+import sys
+import json
+import time
+import resource
+import multiprocessing
+
+import mrt_lowpoint_draft_text as mrt
+import mrt_benchmarks as bench
+
+SUITE_SIZES = [100, 1000, 10000, 50000]
+MAX_SAMPLED_SOURCES = 20
+REGRESSION_TOLERANCE = 0.2
+SUITE_SEED = 1
+
+def Ring_Of_Rings_Case_Links(num_nodes):
+    num_rings = max(1, int(num_nodes ** 0.5))
+    return bench.Ring_Of_Rings_Links(num_rings, num_nodes // num_rings,
+                                     SUITE_SEED)
+
+# Pods of 16 leaves and 4 spines, with 4 planes of 8 super-spines.
+def Clos_Case_Links(num_nodes):
+    num_pods = max(1, (num_nodes - 32) // 20)
+    return bench.Clos_Links(num_pods, 16, 4, 8)
+
+def Grid_Case_Links(num_nodes):
+    num_rows = max(1, int(num_nodes ** 0.5))
+    return bench.Grid_Links(num_rows, num_nodes // num_rows, SUITE_SEED)
+
+def Random_Geometric_Case_Links(num_nodes):
+    return bench.Random_Geometric_Links(num_nodes, 6, SUITE_SEED)
+
+def Scale_Free_Case_Links(num_nodes):
+    return bench.Scale_Free_Links(num_nodes, 2, SUITE_SEED)
+
+SUITE_CASES = [('ring_of_rings', Ring_Of_Rings_Case_Links),
+               ('clos', Clos_Case_Links),
+               ('grid', Grid_Case_Links),
+               ('random_geometric', Random_Geometric_Case_Links),
+               ('scale_free', Scale_Free_Case_Links)]
+
+def Build_Case_Topology(case_name, num_nodes):
+    link_func = dict(SUITE_CASES)[case_name]
+    link_list = link_func(num_nodes)
+    link_list = bench.Add_Parallel_Links(link_list, 0.05, SUITE_SEED)
+    link_list = bench.Make_Metrics_Asymmetric(link_list, 0.2, SUITE_SEED)
+    topo = bench.Build_Topology(link_list)
+    bench.Set_Random_Profile_IDs(topo, 0.05, 1, SUITE_SEED)
+    bench.Add_Random_Prefix_Advertisements(topo, len(topo.node_list) // 10,
+                                           3, SUITE_SEED)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    return (topo, len(link_list))
+
+def Sampled_Source_List(topo):
+    num_nodes = len(topo.node_list)
+    num_sources = min(num_nodes, MAX_SAMPLED_SOURCES)
+    return [topo.node_list[i * num_nodes // num_sources]
+            for i in range(num_sources)]
+
+# Runs in a worker process of Run_Benchmark_Suite().
+def Run_Suite_Case(case):
+    (case_name, num_nodes) = case
+    start_time = time.time()
+    (topo, num_links) = Build_Case_Topology(case_name, num_nodes)
+    build_seconds = time.time() - start_time
+    mrt.Enable_Instrumentation()
+    start_time = time.time()
+    mrt.Compute_Test_GR_Island_GADAG(topo)
+    gadag_seconds = time.time() - start_time
+    source_list = Sampled_Source_List(topo)
+    start_time = time.time()
+    for src in source_list:
+        if src.IN_MRT_ISLAND:
+            mrt.Run_MRT_for_One_Source_In_Island(topo, src)
+        else:
+            topo.init_new_source_in_island()
+            mrt.Run_Prim_SPF_for_One_Source(topo, src)
+    seconds_per_source = (time.time() - start_time) / len(source_list)
+    stats = mrt.Get_Instrumentation_Stats()
+    mrt.Disable_Instrumentation()
+    num_island_nodes = 0
+    for node in topo.node_list:
+        if node.IN_MRT_ISLAND:
+            num_island_nodes += 1
+    return {'case': case_name,
+            'num_nodes': len(topo.node_list),
+            'num_links': num_links,
+            'num_island_nodes': num_island_nodes,
+            'num_sampled_sources': len(source_list),
+            'build_seconds': build_seconds,
+            'gadag_seconds': gadag_seconds,
+            'seconds_per_source': seconds_per_source,
+            'estimated_total_seconds': gadag_seconds
+                + seconds_per_source * len(topo.node_list),
+            'max_rss_kb': resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss,
+            'phases': stats['phases'],
+            'spf': stats['spf']}
+
+def Run_Benchmark_Suite(results_filename, size_list=SUITE_SIZES):
+    result_list = []
+    with open(results_filename, 'w') as results_file:
+        for num_nodes in size_list:
+            for (case_name, link_func) in SUITE_CASES:
+                # a new process per case, so ru_maxrss is per case
+                pool = multiprocessing.Pool(1)
+                try:
+                    result = pool.apply(Run_Suite_Case,
+                                        ((case_name, num_nodes),))
+                    pool.close()
+                finally:
+                    pool.terminate()
+                    pool.join()
+                results_file.write(json.dumps(result, sort_keys=True)
+                                   + '\n')
+                results_file.flush()
+                print('%-18s %7d nodes %7d links %10.4f s/source '\
+                      '%10.1f s total %8d KB'
+                      % (case_name, result['num_nodes'],
+                         result['num_links'], result['seconds_per_source'],
+                         result['estimated_total_seconds'],
+                         result['max_rss_kb']))
+                result_list.append(result)
+    return result_list
+
+def Read_Suite_Results(results_filename):
+    result_list = []
+    with open(results_filename) as results_file:
+        for line in results_file:
+            if line.strip():
+                result_list.append(json.loads(line))
+    return result_list
+
+# Returns a list of (case, num_nodes, measure, baseline value, value)
+# for each measure of each case that grew by more than tolerance over
+# the baseline.  Cases missing from either list are skipped.
+def Compare_Suite_Results(result_list, baseline_list,
+                          tolerance=REGRESSION_TOLERANCE):
+    baseline_dict = {}
+    for baseline in baseline_list:
+        baseline_dict[(baseline['case'], baseline['num_nodes'])] = baseline
+    regression_list = []
+    for result in result_list:
+        key = (result['case'], result['num_nodes'])
+        if key not in baseline_dict:
+            continue
+        for measure in ['gadag_seconds', 'seconds_per_source',
+                        'max_rss_kb']:
+            baseline_value = baseline_dict[key][measure]
+            if result[measure] > baseline_value * (1 + tolerance):
+                regression_list.append(key + (measure, baseline_value,
+                                              result[measure]))
+    return regression_list
+
+if __name__ == '__main__':
+    if len(sys.argv) not in [2, 3]:
+        print('usage: python mrt_benchmark_suite.py <results file> '\
+              '[<baseline file>]')
+        exit()
+    result_list = Run_Benchmark_Suite(sys.argv[1])
+    if len(sys.argv) == 3:
+        regression_list = Compare_Suite_Results(
+            result_list, Read_Suite_Results(sys.argv[2]))
+        for regression in regression_list:
+            print('REGRESSION %s %d nodes %s: %g -> %g' % regression)
+        if regression_list:
+            sys.exit(1)
@@ -0,0 +1,1171 @@
+# Benchmarks for the MRT algorithm in mrt_lowpoint_draft_text.py.
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.  Run it from this directory with:
+#     python mrt_benchmarks.py
+# It prints one line per benchmark with the best time out of a few
+# repetitions.
+
+import os
+import sys
+import shutil
+import tempfile
+import array
+import math
+import random
+import threading
+import timeit
+import multiprocessing
+
+import mrt_lowpoint_draft_text as mrt
+import mrt_csr_topology as csr_topo
+import mrt_binary_results as bin_results
+import mrt_result_cache as result_cache
+import mrt_what_if as what_if
+
+BENCH_REPEAT = 20
+
+# Build a Topology directly from a list of links, without going
+# through an input file.  Each link is a tuple (nodea_node_id,
+# nodeb_node_id, metric) or (nodea_node_id, nodeb_node_id, metric,
+# reverse_metric), as in the rows of the .csv input file.
+def Build_Topology(link_list):
+    topo = mrt.Topology()
+    for link in link_list:
+        for node_id in link[0:2]:
+            if node_id not in topo.node_dict:
+                node = mrt.Node()
+                node.node_id = node_id
+                topo.node_list.append(node)
+                topo.node_dict[node_id] = node
+    for link in link_list:
+        metric = link[2]
+        reverse_metric = link[2]
+        if len(link) > 3:
+            reverse_metric = link[3]
+        nodea = topo.node_dict[link[0]]
+        nodeb = topo.node_dict[link[1]]
+        nodea_intf = mrt.Interface()
+        nodea_intf.metric = metric
+        nodea_intf.area = 0
+        nodeb_intf = mrt.Interface()
+        nodeb_intf.metric = reverse_metric
+        nodeb_intf.area = 0
+        nodea_intf.remote_intf = nodeb_intf
+        nodeb_intf.remote_intf = nodea_intf
+        nodea_intf.remote_node = nodeb
+        nodeb_intf.remote_node = nodea
+        nodea_intf.local_node = nodea
+        nodeb_intf.local_node = nodeb
+        nodea_intf.link_data = len(nodea.intf_list)
+        nodeb_intf.link_data = len(nodeb.intf_list)
+        nodea.intf_list.append(nodea_intf)
+        nodeb.intf_list.append(nodeb_intf)
+    return topo
+
+# The links of the chain are listed from the far end towards node 1,
+# so that node_list (and hence island_node_list) starts at the far
+# end of the chain.
+def Chain_Links(num_nodes):
+    link_list = []
+    for i in range(num_nodes - 1, 0, -1):
+        link_list.append((i + 1, i, 10))
+    return link_list
+
+def Random_Tree_Links(num_nodes, seed):
+    rng = random.Random(seed)
+    link_list = []
+    for i in range(2, num_nodes + 1):
+        link_list.append((rng.randint(1, i - 1), i, rng.randint(1, 20)))
+    return link_list
+
+# A random connected topology: a random spanning tree plus extra
+# links, so that the average node degree is about avg_degree.
+def Random_Mesh_Links(num_nodes, avg_degree, seed):
+    rng = random.Random(seed)
+    link_list = Random_Tree_Links(num_nodes, seed)
+    num_extra_links = max(0, num_nodes * avg_degree // 2 - (num_nodes - 1))
+    for i in range(num_extra_links):
+        nodea_node_id = rng.randint(1, num_nodes)
+        nodeb_node_id = rng.randint(1, num_nodes)
+        if nodea_node_id != nodeb_node_id:
+            link_list.append((nodea_node_id, nodeb_node_id,
+                              rng.randint(1, 20)))
+    return link_list
+
+# A two-tier leaf-spine topology in which every leaf connects to every
+# spine with the same metric, so that there are num_spines equal cost
+# paths between any two leaves.  Leaves are numbered from 1 and spines
+# follow them.
+def Leaf_Spine_Links(num_leaves, num_spines):
+    link_list = []
+    for leaf in range(1, num_leaves + 1):
+        for spine in range(num_leaves + 1, num_leaves + num_spines + 1):
+            link_list.append((leaf, spine, 10))
+    return link_list
+
+# Access rings of ring_size nodes hung off a core ring.  The first
+# node of each access ring is on the core ring, and the last one also
+# connects to the first node of the next access ring, so that every
+# access ring is dual-homed.
+def Ring_Of_Rings_Links(num_rings, ring_size, seed):
+    rng = random.Random(seed)
+    link_list = []
+    for ring in range(num_rings):
+        first_node_id = ring * ring_size + 1
+        next_first_node_id = ((ring + 1) % num_rings) * ring_size + 1
+        for i in range(ring_size - 1):
+            link_list.append((first_node_id + i, first_node_id + i + 1,
+                              rng.randint(1, 20)))
+        link_list.append((first_node_id + ring_size - 1, first_node_id,
+                          rng.randint(1, 20)))
+        if num_rings > 1:
+            link_list.append((first_node_id, next_first_node_id, 5))
+            link_list.append((first_node_id + ring_size - 1,
+                              next_first_node_id, rng.randint(1, 20)))
+    return link_list
+
+# A three-tier Clos: each pod has leaves_per_pod leaves connected to
+# all of its spines_per_pod spines, and spine i of every pod connects
+# to all the super-spines of plane i, which has plane_size of them.
+# All metrics are 10, so there are many equal cost paths.  The number
+# of nodes grows linearly with num_pods.
+def Clos_Links(num_pods, leaves_per_pod, spines_per_pod, plane_size):
+    link_list = []
+    pod_size = leaves_per_pod + spines_per_pod
+    first_super_spine_id = num_pods * pod_size + 1
+    for pod in range(num_pods):
+        first_leaf_id = pod * pod_size + 1
+        first_spine_id = first_leaf_id + leaves_per_pod
+        for spine in range(spines_per_pod):
+            spine_id = first_spine_id + spine
+            for leaf_id in range(first_leaf_id, first_spine_id):
+                link_list.append((leaf_id, spine_id, 10))
+            first_plane_id = first_super_spine_id + spine * plane_size
+            for super_spine_id in range(first_plane_id,
+                                        first_plane_id + plane_size):
+                link_list.append((spine_id, super_spine_id, 10))
+    return link_list
+
+def Grid_Links(num_rows, num_cols, seed):
+    rng = random.Random(seed)
+    link_list = []
+    for row in range(num_rows):
+        for col in range(num_cols):
+            node_id = row * num_cols + col + 1
+            if col + 1 < num_cols:
+                link_list.append((node_id, node_id + 1, rng.randint(1, 20)))
+            if row + 1 < num_rows:
+                link_list.append((node_id, node_id + num_cols,
+                                  rng.randint(1, 20)))
+    return link_list
+
+# Nodes at random points of the unit square, linked when they are
+# closer than the radius that gives an average degree of avg_degree,
+# with metrics that grow with the distance.  The points are bucketed
+# in cells of that radius, so that only neighboring cells are
+# searched.  Nodes that are consecutive in x order but in different
+# components are then linked, so that the topology is connected.
+def Random_Geometric_Links(num_nodes, avg_degree, seed):
+    rng = random.Random(seed)
+    radius = math.sqrt(float(avg_degree) / (math.pi * num_nodes))
+    point_list = [None]
+    cell_dict = {}
+    for node_id in range(1, num_nodes + 1):
+        point = (rng.random(), rng.random())
+        point_list.append(point)
+        cell = (int(point[0] / radius), int(point[1] / radius))
+        cell_dict.setdefault(cell, []).append(node_id)
+    link_list = []
+    component_dict = {}
+    def Find_Component(node_id):
+        root_node_id = node_id
+        while component_dict.get(root_node_id, root_node_id) != root_node_id:
+            root_node_id = component_dict[root_node_id]
+        while node_id != root_node_id:
+            (node_id, component_dict[node_id]) = \
+                (component_dict[node_id], root_node_id)
+        return root_node_id
+    def Add_Link(nodea_node_id, nodeb_node_id, distance):
+        link_list.append((nodea_node_id, nodeb_node_id,
+                          1 + int(20 * distance / radius)))
+        component_dict[Find_Component(nodea_node_id)] = \
+            Find_Component(nodeb_node_id)
+    for node_id in range(1, num_nodes + 1):
+        (x, y) = point_list[node_id]
+        (cell_x, cell_y) = (int(x / radius), int(y / radius))
+        for near_cell_x in range(cell_x - 1, cell_x + 2):
+            for near_cell_y in range(cell_y - 1, cell_y + 2):
+                for near_node_id in cell_dict.get((near_cell_x, near_cell_y),
+                                                  []):
+                    if near_node_id <= node_id:
+                        continue
+                    (near_x, near_y) = point_list[near_node_id]
+                    distance = math.hypot(near_x - x, near_y - y)
+                    if distance < radius:
+                        Add_Link(node_id, near_node_id, distance)
+    x_order_list = sorted(range(1, num_nodes + 1),
+                          key=lambda node_id: point_list[node_id][0])
+    for i in range(num_nodes - 1):
+        (nodea_node_id, nodeb_node_id) = x_order_list[i:i + 2]
+        if Find_Component(nodea_node_id) != Find_Component(nodeb_node_id):
+            (xa, ya) = point_list[nodea_node_id]
+            (xb, yb) = point_list[nodeb_node_id]
+            Add_Link(nodea_node_id, nodeb_node_id,
+                     math.hypot(xb - xa, yb - ya))
+    return link_list
+
+# A Barabasi-Albert scale-free topology: each new node links to
+# links_per_node distinct earlier nodes chosen with probability
+# proportional to their degree.
+def Scale_Free_Links(num_nodes, links_per_node, seed):
+    rng = random.Random(seed)
+    link_list = []
+    # each node appears here once per link, for degree-weighted choices
+    endpoint_list = []
+    for node_id in range(1, links_per_node + 2):
+        for prev_node_id in range(1, node_id):
+            link_list.append((prev_node_id, node_id, rng.randint(1, 20)))
+            endpoint_list.extend([prev_node_id, node_id])
+    for node_id in range(links_per_node + 2, num_nodes + 1):
+        target_set = set()
+        while len(target_set) < links_per_node:
+            target_set.add(rng.choice(endpoint_list))
+        for target_node_id in sorted(target_set):
+            link_list.append((target_node_id, node_id, rng.randint(1, 20)))
+            endpoint_list.extend([target_node_id, node_id])
+    return link_list
+
+# Add a parallel link, with its own metric, next to a fraction of the
+# links.
+def Add_Parallel_Links(link_list, fraction, seed):
+    rng = random.Random(seed)
+    new_link_list = []
+    for link in link_list:
+        new_link_list.append(link)
+        if rng.random() < fraction:
+            new_link_list.append((link[0], link[1], rng.randint(1, 20)))
+    return new_link_list
+
+# Give a fraction of the links a reverse metric different from their
+# metric.
+def Make_Metrics_Asymmetric(link_list, fraction, seed):
+    rng = random.Random(seed)
+    new_link_list = []
+    for link in link_list:
+        if rng.random() < fraction:
+            reverse_metric = rng.randint(1, 20)
+            if reverse_metric == link[2]:
+                reverse_metric = link[2] % 20 + 1
+            link = (link[0], link[1], link[2], reverse_metric)
+        new_link_list.append(link)
+    return new_link_list
+
+# A fraction of the nodes other than keep_node_id only support MRT
+# profile 1, so that they are outside the MRT Island for profile 0.
+def Set_Random_Profile_IDs(topo, outside_fraction, keep_node_id, seed):
+    rng = random.Random(seed)
+    for node in topo.node_list:
+        if node.node_id != keep_node_id and rng.random() < outside_fraction:
+            node.profile_id_list = [1]
+
+# num_prefixes prefixes, each advertised by 1 to max_advertisers
+# random nodes with a random cost.  Prefix ids follow the node ids.
+def Add_Random_Prefix_Advertisements(topo, num_prefixes, max_advertisers,
+                                     seed):
+    rng = random.Random(seed)
+    first_prefix_id = max(topo.node_dict) + 1
+    for prefix_id in range(first_prefix_id, first_prefix_id + num_prefixes):
+        num_advertisers = rng.randint(1, max_advertisers)
+        for node in rng.sample(topo.node_list, num_advertisers):
+            node.prefix_cost_dict[prefix_id] = rng.randint(0, 20)
+
+def Time_Once(func, setup=None):
+    if setup is not None:
+        setup()
+    start = timeit.default_timer()
+    func()
+    return timeit.default_timer() - start
+
+def Best_Time(func, setup=None, repeat=BENCH_REPEAT):
+    best = None
+    for i in range(repeat):
+        elapsed = Time_Once(func, setup)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+# Time two implementations of the same step alternately, so that both 
+# see the same machine load, and check that they leave the same 
+# results behind.  Returns the best time of each.
+def Compare_Times(func_a, func_b, setup, results):
+    best_a = None
+    best_b = None
+    for i in range(BENCH_REPEAT):
+        elapsed = Time_Once(func_a, setup)
+        if best_a is None or elapsed < best_a:
+            best_a = elapsed
+        results_a = results()
+        elapsed = Time_Once(func_b, setup)
+        if best_b is None or elapsed < best_b:
+            best_b = elapsed
+        assert results() == results_a
+    return (best_a, best_b)
+
+def Report(name, num_nodes, elapsed):
+    print('%-44s %7d nodes %10.4f s' % (name, num_nodes, elapsed))
+
+# Run func in a thread with a large stack and a high recursion limit,
+# so that the recursive reference implementations below can handle
+# deep topologies.
+def Run_With_Deep_Stack(func):
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000000)
+    threading.stack_size(512 * 1024 * 1024)
+    result_list = []
+    thread = threading.Thread(target=lambda: result_list.append(func()))
+    thread.start()
+    thread.join()
+    threading.stack_size(0)
+    sys.setrecursionlimit(old_limit)
+    return result_list[0]
+
+# Temporarily replace classes or functions of mrt_lowpoint_draft_text.py,
+# which its functions look up as module globals, and return the old 
+# ones so that they can be put back the same way.
+def Replace_Module_Globals(global_dict):
+    old_global_dict = {}
+    for name in global_dict:
+        old_global_dict[name] = getattr(mrt, name)
+        setattr(mrt, name, global_dict[name])
+    return old_global_dict
+
+# Recursive reference implementations of Lowpoint_Visit,
+# Assign_Block_ID and Set_Edge, as they appear in the draft, used to
+# compare speed and results against the iterative implementations.
+class Recursive_Counters:
+    dfs_number = 0
+    max_block_id = 0
+
+def Recursive_Lowpoint_Visit(x, parent, intf_p_to_x):
+    x.dfs_number = Recursive_Counters.dfs_number
+    x.lowpoint_number = x.dfs_number
+    Recursive_Counters.dfs_number += 1
+    x.dfs_parent = parent
+    if intf_p_to_x == None:
+        x.dfs_parent_intf = None
+    else:
+        x.dfs_parent_intf = intf_p_to_x.remote_intf
+    x.lowpoint_parent = None
+    if parent != None:
+        parent.dfs_child_list.append(x)
+    for intf in x.island_intf_list:
+        if intf.remote_node.dfs_number == None:
+            Recursive_Lowpoint_Visit(intf.remote_node, x, intf)
+            if intf.remote_node.lowpoint_number < x.lowpoint_number:
+                x.lowpoint_number = intf.remote_node.lowpoint_number
+                x.lowpoint_parent = intf.remote_node
+                x.lowpoint_parent_intf = intf
+        else:
+            if intf.remote_node is not parent:
+                if intf.remote_node.dfs_number < x.lowpoint_number:
+                    x.lowpoint_number = intf.remote_node.dfs_number
+                    x.lowpoint_parent = intf.remote_node
+                    x.lowpoint_parent_intf = intf
+
+def Recursive_Run_Lowpoint(topo):
+    Recursive_Counters.dfs_number = 0
+    Recursive_Lowpoint_Visit(topo.gadag_root, None, None)
+
+def Recursive_Assign_Block_ID(x, cur_block_id):
+    x.block_id = cur_block_id
+    for c in x.dfs_child_list:
+        if (c.localroot is x):
+            Recursive_Counters.max_block_id += 1
+            Recursive_Assign_Block_ID(c, Recursive_Counters.max_block_id)
+        else:
+            Recursive_Assign_Block_ID(c, cur_block_id)
+
+def Recursive_Run_Assign_Block_ID(topo):
+    Recursive_Counters.max_block_id = 0
+    Recursive_Assign_Block_ID(topo.gadag_root, 0)
+
+def Recursive_Set_Edge(y):
+    if (y.blue_next_hops == [] and y.red_next_hops == []):
+        Recursive_Set_Edge(y.localroot)
+        mrt.Copy_List_Items(y.blue_next_hops, y.localroot.blue_next_hops)
+        mrt.Copy_List_Items(y.red_next_hops, y.localroot.red_next_hops)
+        y.order_proxy = y.localroot.order_proxy
+
+def Clear_Lowpoint_Values(topo):
+    for node in topo.island_node_list:
+        node.dfs_number = None
+        node.dfs_child_list = []
+        node.lowpoint_parent = None
+        node.lowpoint_parent_intf = None
+
+def Lowpoint_Results(topo):
+    result_list = []
+    for node in topo.island_node_list:
+        result_list.append((node.dfs_number, node.lowpoint_number,
+                            node.dfs_parent, node.lowpoint_parent,
+                            node.lowpoint_parent_intf))
+    return result_list
+
+def Block_ID_Results(topo):
+    return [node.block_id for node in topo.island_node_list]
+
+# Bring the topology to the state just before the Set_Edge() loop in
+# Compute_MRT_NH_For_One_Src_To_Island_Dests() and return a function
+# that restores that state, so that only the Set_Edge() loop is timed.
+def Prepare_Set_Edge(topo, src):
+    saved_set_edge = mrt.Set_Edge
+    mrt.Set_Edge = lambda y: None
+    try:
+        mrt.Compute_MRT_NH_For_One_Src_To_Island_Dests(topo, src)
+    finally:
+        mrt.Set_Edge = saved_set_edge
+    saved_list = []
+    for y in topo.island_node_list:
+        saved_list.append((y, list(y.blue_next_hops),
+                           list(y.red_next_hops), y.order_proxy))
+    def restore():
+        for (y, blue_next_hops, red_next_hops, order_proxy) in saved_list:
+            y.blue_next_hops = list(blue_next_hops)
+            y.red_next_hops = list(red_next_hops)
+            y.order_proxy = order_proxy
+    return restore
+
+def Run_Set_Edge_Loop(topo, src, set_edge_func):
+    for y in topo.island_node_list:
+        if (y is not topo.gadag_root and y is not src):
+            set_edge_func(y)
+
+def Set_Edge_Results(topo):
+    result_list = []
+    for y in topo.island_node_list:
+        result_list.append((list(y.blue_next_hops), list(y.red_next_hops),
+                            y.order_proxy))
+    return result_list
+
+# Node 1 is used as GADAG root and node 2 as source.  On a chain,
+# the first Set_Edge() call then has to follow the local roots all
+# the way from the far end of the chain back to node 1.
+def Bench_Recursion_Free_Functions(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    src = topo.node_dict[2]
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    mrt.Reset_Computed_Node_and_Intf_Values(topo)
+    mrt.Compute_Island_GADAG(topo, src, 0, 0)
+
+    (rec_time, iter_time) = Run_With_Deep_Stack(lambda: Compare_Times(
+        lambda: Recursive_Run_Lowpoint(topo),
+        lambda: mrt.Run_Lowpoint(topo),
+        lambda: Clear_Lowpoint_Values(topo),
+        lambda: Lowpoint_Results(topo)))
+    Report(name + ' Run_Lowpoint recursive', num_nodes, rec_time)
+    Report(name + ' Run_Lowpoint iterative', num_nodes, iter_time)
+
+    (rec_time, iter_time) = Run_With_Deep_Stack(lambda: Compare_Times(
+        lambda: Recursive_Run_Assign_Block_ID(topo),
+        lambda: mrt.Run_Assign_Block_ID(topo),
+        None,
+        lambda: Block_ID_Results(topo)))
+    Report(name + ' Run_Assign_Block_ID recursive', num_nodes, rec_time)
+    Report(name + ' Run_Assign_Block_ID iterative', num_nodes, iter_time)
+
+    (rec_time, iter_time) = Run_With_Deep_Stack(lambda: Compare_Times(
+        lambda: Run_Set_Edge_Loop(topo, src, Recursive_Set_Edge),
+        lambda: Run_Set_Edge_Loop(topo, src, mrt.Set_Edge),
+        Prepare_Set_Edge(topo, src),
+        lambda: Set_Edge_Results(topo)))
+    Report(name + ' Set_Edge recursive', num_nodes, rec_time)
+    Report(name + ' Set_Edge iterative', num_nodes, iter_time)
+
+def Run_Recursion_Free_Benchmarks():
+    Bench_Recursion_Free_Functions('chain', Chain_Links(10000))
+    Bench_Recursion_Free_Functions('tree', Random_Tree_Links(10000, 1))
+
+def Bench_Parallel_Driver(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    serial_time = Time_Once(lambda: mrt.Run_MRT_for_All_Sources(topo))
+    Report(name + ' Run_MRT_for_All_Sources', num_nodes, serial_time)
+    num_workers = 2
+    while num_workers <= max(2, multiprocessing.cpu_count()):
+        parallel_time = Time_Once(
+            lambda: mrt.Run_MRT_for_All_Sources_Parallel(topo, num_workers))
+        Report('%s parallel, %d workers (x%.2f)' %
+               (name, num_workers, serial_time / parallel_time),
+               num_nodes, parallel_time)
+        num_workers *= 2
+
+def Run_Parallel_Benchmarks():
+    Bench_Parallel_Driver('mesh', Random_Mesh_Links(200, 4, 1))
+
+# Approximate memory used by the Node and Interface objects of topo:
+# each object, its attribute dict if it has one, and the lists and 
+# dicts it holds.  Shared objects such as small integers are not
+# counted.
+def Object_Size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+        value_list = obj.__dict__.values()
+    else:
+        value_list = [getattr(obj, name) for name in obj.__slots__]
+    for value in value_list:
+        if isinstance(value, (list, dict, set)):
+            size += sys.getsizeof(value)
+    return size
+
+def Object_Topology_Size(topo):
+    size = 0
+    for node in topo.node_list:
+        size += Object_Size(node)
+        for intf in node.intf_list:
+            size += Object_Size(intf)
+    return size
+
+def CSR_Topology_Size(csr):
+    size = sys.getsizeof(csr) + sys.getsizeof(csr.__dict__)
+    for value in csr.__dict__.values():
+        if isinstance(value, (array.array, dict)):
+            size += sys.getsizeof(value)
+    return size
+
+def Normal_SPF_Results(topo, spf_root):
+    mrt.Normal_SPF(topo, spf_root)
+    metric_list = []
+    next_hops_list = []
+    for y in topo.node_list:
+        metric_list.append(y.primary_spf_metric)
+        next_hops_list.append([intf.link_data
+                               for intf in y.primary_next_hops])
+    return (metric_list, next_hops_list)
+
+def CSR_Normal_SPF_Results(csr, spf_root_index):
+    (metric_list, next_hops_list) = \
+        csr_topo.CSR_Normal_SPF(csr, spf_root_index)
+    next_hops_list = [[csr_topo.Intf_Link_Data(csr, intf_index)
+                       for intf_index in next_hops]
+                      for next_hops in next_hops_list]
+    return (metric_list, next_hops_list)
+
+# Compare the memory used by the object model and by the CSR arrays
+# for the static topology, and the speed of Normal_SPF() and
+# CSR_Normal_SPF() from a few roots.
+def Bench_CSR_Topology(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    csr = csr_topo.Create_CSR_Topology(topo)
+    print('%-44s %7d nodes %10.1f MB' % (name + ' object model size',
+          num_nodes, Object_Topology_Size(topo) / 1e6))
+    print('%-44s %7d nodes %10.1f MB' % (name + ' CSR arrays size',
+          num_nodes, CSR_Topology_Size(csr) / 1e6))
+    root_list = topo.node_list[0:5]
+    assert [Normal_SPF_Results(topo, root) for root in root_list] == \
+        [CSR_Normal_SPF_Results(csr, csr.node_index_dict[root.node_id])
+         for root in root_list]
+    object_time = Best_Time(
+        lambda: [mrt.Normal_SPF(topo, root) for root in root_list])
+    csr_time = Best_Time(
+        lambda: [csr_topo.CSR_Normal_SPF(
+            csr, csr.node_index_dict[root.node_id]) for root in root_list])
+    Report(name + ' Normal_SPF x5', num_nodes, object_time)
+    Report(name + ' CSR_Normal_SPF x5', num_nodes, csr_time)
+
+def Run_CSR_Topology_Benchmarks():
+    Bench_CSR_Topology('mesh', Random_Mesh_Links(10000, 8, 1))
+
+SLOTTED_CLASS_NAMES = ['Topology', 'Node', 'Interface', 'Bundle', 'Alternate',
+                       'Proxy_Node_Attachment_Router', 'Named_Proxy_Node']
+
+# A copy of a slotted class of mrt_lowpoint_draft_text.py without the
+# __slots__, so that its instances keep their attributes in a dict.
+def Unslotted_Class(cls):
+    class_dict = {}
+    for name in cls.__dict__:
+        if name != '__slots__' and name not in cls.__slots__:
+            class_dict[name] = cls.__dict__[name]
+    return type(cls.__name__, (object,), class_dict)
+
+def GADAG_and_SPF_Results(topo):
+    result_list = []
+    for y in topo.node_list:
+        result_list.append((y.topo_order, y.primary_spf_metric,
+                            [intf.link_data for intf in y.primary_next_hops]))
+    return result_list
+
+# Compare the memory used by topologies built from the slotted classes
+# and from unslotted copies of them, after computing a GADAG and a few
+# SPFs on them, and the time taken by those computations.
+def Bench_Slots(name, link_list):
+    slotted_class_dict = {}
+    unslotted_class_dict = {}
+    for class_name in SLOTTED_CLASS_NAMES:
+        slotted_class_dict[class_name] = getattr(mrt, class_name)
+        unslotted_class_dict[class_name] = \
+            Unslotted_Class(getattr(mrt, class_name))
+    result_list = []
+    for (label, class_dict) in [('unslotted', unslotted_class_dict),
+                                ('slotted', slotted_class_dict)]:
+        old_class_dict = Replace_Module_Globals(class_dict)
+        topo = Build_Topology(link_list)
+        num_nodes = len(topo.node_list)
+        root_list = topo.node_list[0:5]
+        gadag_time = Best_Time(
+            lambda: mrt.Compute_Island_GADAG(topo, topo.node_list[0], 0, 0),
+            lambda: mrt.Reset_Computed_Node_and_Intf_Values(topo), 3)
+        spf_time = Best_Time(
+            lambda: [mrt.Normal_SPF(topo, root) for root in root_list],
+            None, 3)
+        result_list.append(GADAG_and_SPF_Results(topo))
+        print('%-44s %7d nodes %10.1f MB' % (name + ' ' + label + ' size',
+              num_nodes, Object_Topology_Size(topo) / 1e6))
+        Report(name + ' ' + label + ' Compute_Island_GADAG',
+               num_nodes, gadag_time)
+        Report(name + ' ' + label + ' Normal_SPF x5', num_nodes, spf_time)
+        Replace_Module_Globals(old_class_dict)
+    assert result_list[0] == result_list[1]
+
+# The SPF next-hop helpers as they were before the next-hops of a node
+# were also kept as a bitset: plain lists, with a linear scan of the
+# target list for each next-hop added.
+def List_Set_Next_Hops_To_Root_Intf(y, intf):
+    y.next_hops = [intf]
+
+def List_Copy_Next_Hops(y, x):
+    del y.next_hops[:]
+    for intf in x.next_hops:
+        y.next_hops.append(intf)
+
+def List_Add_Root_Intf_To_Next_Hops_If_New(y, intf):
+    if intf not in y.next_hops:
+        y.next_hops.append(intf)
+
+def List_Add_Next_Hops_If_New(y, x):
+    for intf in x.next_hops:
+        if intf not in y.next_hops:
+            y.next_hops.append(intf)
+
+LIST_NEXT_HOP_HELPERS = {
+    'Set_Next_Hops_To_Root_Intf': List_Set_Next_Hops_To_Root_Intf,
+    'Copy_Next_Hops': List_Copy_Next_Hops,
+    'Add_Root_Intf_To_Next_Hops_If_New':
+        List_Add_Root_Intf_To_Next_Hops_If_New,
+    'Add_Next_Hops_If_New': List_Add_Next_Hops_If_New}
+
+def Normal_SPF_Next_Hop_Results(topo):
+    return [[intf.link_data for intf in y.primary_next_hops]
+            for y in topo.node_list]
+
+def Bench_Next_Hop_Merging(name, link_list, root_id_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    root_list = [topo.node_dict[node_id] for node_id in root_id_list]
+    def Run_With_Lists():
+        old_helpers = Replace_Module_Globals(LIST_NEXT_HOP_HELPERS)
+        for root in root_list:
+            mrt.Normal_SPF(topo, root)
+        Replace_Module_Globals(old_helpers)
+    (list_time, bits_time) = Compare_Times(
+        Run_With_Lists,
+        lambda: [mrt.Normal_SPF(topo, root) for root in root_list],
+        None,
+        lambda: Normal_SPF_Next_Hop_Results(topo))
+    Report(name + ' Normal_SPF list scans', num_nodes, list_time)
+    Report(name + ' Normal_SPF bitsets', num_nodes, bits_time)
+
+# From a leaf, every other leaf has 32 equal cost paths; from a spine,
+# every other spine has one equal cost path through each leaf.
+def Run_Next_Hop_Merging_Benchmarks():
+    Bench_Next_Hop_Merging('leaf-spine leaf roots',
+                           Leaf_Spine_Links(1000, 32), [1, 2, 3])
+    Bench_Next_Hop_Merging('leaf-spine spine root',
+                           Leaf_Spine_Links(1000, 32), [1001])
+    Bench_Next_Hop_Merging('mesh', Random_Mesh_Links(10000, 8, 1),
+                           [1, 2, 3])
+
+# Run_Topological_Sort_GADAG() as it was before it used a deque, as a
+# reference for the order in which topo_order is assigned.
+def List_Run_Topological_Sort_GADAG(topo):
+    mrt.Modify_Block_Root_Incoming_Links(topo)
+    for node in topo.island_node_list:
+        node.unvisited = 0
+        for intf in node.island_intf_list:
+            if (intf.INCOMING == True):
+                node.unvisited += 1
+    working_list = []
+    topo_order_list = []
+    working_list.append(topo.gadag_root)
+    while working_list != []:
+        y = working_list.pop(0)
+        topo_order_list.append(y)
+        for intf in y.island_intf_list:
+            if ( intf.OUTGOING == True):
+                intf.remote_node.unvisited -= 1
+                if intf.remote_node.unvisited == 0:
+                    working_list.append(intf.remote_node)
+    next_topo_order = 1
+    while topo_order_list != []:
+        y = topo_order_list.pop(0)
+        y.topo_order = next_topo_order
+        next_topo_order += 1
+    mrt.Revert_Block_Root_Incoming_Links(topo)
+
+def Clear_Topo_Order(topo):
+    for node in topo.island_node_list:
+        node.topo_order = None
+
+def Topo_Order_Results(topo):
+    return [node.topo_order for node in topo.island_node_list]
+
+# Compare_Times() checks that both sorts assign every node the same
+# topo_order.
+def Bench_Topological_Sort(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    mrt.Reset_Computed_Node_and_Intf_Values(topo)
+    mrt.Compute_Island_GADAG(topo, topo.node_list[0], 0, 0)
+    (list_time, deque_time) = Compare_Times(
+        lambda: List_Run_Topological_Sort_GADAG(topo),
+        lambda: mrt.Run_Topological_Sort_GADAG(topo),
+        lambda: Clear_Topo_Order(topo),
+        lambda: Topo_Order_Results(topo))
+    Report(name + ' topological sort list.pop(0)', num_nodes, list_time)
+    Report(name + ' topological sort deque', num_nodes, deque_time)
+
+def Run_Topological_Sort_Benchmarks():
+    Bench_Topological_Sort('mesh', Random_Mesh_Links(5000, 4, 1))
+    Bench_Topological_Sort('mesh', Random_Mesh_Links(50000, 4, 1))
+    Bench_Topological_Sort('tree', Random_Tree_Links(50000, 1))
+
+# Per-source alternate selection for the island destinations should
+# grow linearly with the size of the island.
+def Bench_Alternate_Selection(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    src = topo.node_list[0]
+    mrt.Reset_Computed_Node_and_Intf_Values(topo)
+    mrt.Compute_Island_GADAG(topo, src, 0, 0)
+    mrt.Compute_MRT_NH_For_One_Src_To_Island_Dests(topo, src)
+    alt_time = Best_Time(
+        lambda: mrt.Select_Alts_For_One_Src_To_Island_Dests(topo, src),
+        None, 3)
+    Report(name + ' Select_Alts_For_One_Src_To_Island_Dests',
+           num_nodes, alt_time)
+
+def Run_Alternate_Selection_Benchmarks():
+    for num_nodes in [2500, 5000, 10000]:
+        Bench_Alternate_Selection('mesh',
+                                  Random_Mesh_Links(num_nodes, 4, 1))
+
+def All_Source_Results(topo):
+    result_dict = {}
+    for node in topo.node_list:
+        result_dict[node.node_id] = mrt.Encode_Source_Results(node)
+    return result_dict
+
+# Apply random link updates with topo.update_link(), and after each one
+# check the results against a full Run_MRT_for_All_Sources() on a copy
+# of the updated topology.
+# A fraction outside_fraction of the nodes other than node 1 do not
+# support MRT profile 0, so that some of the updated links are outside
+# the MRT Island that contains node 1.
+# The new metrics are chosen from metric_list.
+def Bench_Update_Link(name, link_list, outside_fraction, num_updates, seed,
+                      metric_list=[1, 5, 10, 20, 'DOWN']):
+    rng = random.Random(seed)
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    for node in topo.node_list:
+        if node.node_id != 1 and rng.random() < outside_fraction:
+            node.profile_id_list = [1]
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    mrt.Run_MRT_for_All_Sources(topo)
+    update_time = 0.0
+    full_time = 0.0
+    num_affected_list = []
+    for i in range(num_updates):
+        node = rng.choice(topo.node_list)
+        intf = rng.choice(node.intf_list)
+        metric = rng.choice(metric_list)
+        # keep the topology connected
+        if metric == 'DOWN' and (len(node.intf_list) < 3 or
+                len(intf.remote_node.intf_list) < 3):
+            metric = 10
+        update_time += Time_Once(lambda: num_affected_list.append(
+            len(topo.update_link(node.node_id, 
+                intf.remote_node.node_id, metric).affected_src_list)))
+        full_topo = mrt.Copy_Topology_For_Computation(topo)
+        full_time += Time_Once(
+            lambda: mrt.Run_MRT_for_All_Sources(full_topo))
+        assert All_Source_Results(topo) == All_Source_Results(full_topo)
+    Report(name + ' update_link x%d (%.0f sources each)' %
+           (num_updates, float(sum(num_affected_list)) / num_updates),
+           num_nodes, update_time)
+    Report(name + ' full recomputation x%d' % num_updates, num_nodes,
+           full_time)
+
+# The results of Run_MRT_for_All_Sources() on a copy of topo built as 
+# if from its links again, with the test_gr island found again and the 
+# prefixes of Add_Prefixes_for_Non_Island_Nodes() added for the nodes 
+# that are outside it now.
+def Rebuild_And_Run_MRT_for_All_Sources(topo):
+    full_topo = mrt.Copy_Topology_For_Computation(topo)
+    for node in full_topo.node_list:
+        if node.node_id + 1000 in node.prefix_cost_dict:
+            del node.prefix_cost_dict[node.node_id + 1000]
+    full_topo.island_node_list_for_test_gr = []
+    mrt.Compute_Island_Node_List_For_Test_GR(full_topo, topo.test_gr.node_id)
+    mrt.Add_Prefixes_for_Non_Island_Nodes(full_topo)
+    mrt.Run_MRT_for_All_Sources(full_topo)
+    return full_topo
+
+def Topology_Stays_Connected_Without(topo, removed_intf):
+    reached_set = set([topo.node_list[0]])
+    explore_list = [topo.node_list[0]]
+    while explore_list != []:
+        node = explore_list.pop()
+        for intf in node.intf_list:
+            if intf is removed_intf or intf is removed_intf.remote_intf:
+                continue
+            if intf.remote_node not in reached_set:
+                reached_set.add(intf.remote_node)
+                explore_list.append(intf.remote_node)
+    return len(reached_set) == len(topo.node_list)
+
+# Take random links of the MRT Island containing node 1 down with 
+# topo.update_link(), and after each one check the results and the 
+# island against Rebuild_And_Run_MRT_for_All_Sources().  With a sparse 
+# mesh and many nodes outside profile 0, taking down an island link 
+# often splits the island, so that the nodes cut off from node 1 leave 
+# it.  Only links whose removal keeps the topology connected are taken 
+# down, so that every prefix stays reachable.
+def Bench_Update_Link_Island_Changes(name, link_list, outside_fraction,
+                                     num_updates, seed):
+    rng = random.Random(seed)
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    Set_Random_Profile_IDs(topo, outside_fraction, 1, seed)
+    Add_Random_Prefix_Advertisements(topo, num_nodes // 10, 3, seed)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Add_Prefixes_for_Non_Island_Nodes(topo)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    mrt.Run_MRT_for_All_Sources(topo)
+    update_time = 0.0
+    num_island_changes = 0
+    for i in range(num_updates):
+        island_intf_list = []
+        for node in topo.node_list:
+            for intf in node.intf_list:
+                if intf.IN_MRT_ISLAND:
+                    island_intf_list.append(intf)
+        rng.shuffle(island_intf_list)
+        down_intf = None
+        for intf in island_intf_list:
+            if Topology_Stays_Connected_Without(topo, intf):
+                down_intf = intf
+                break
+        if down_intf == None:
+            break
+        old_island_size = len(topo.island_node_list_for_test_gr)
+        update_time += Time_Once(lambda: topo.update_link(
+            down_intf.local_node.node_id, down_intf.remote_node.node_id,
+            'DOWN'))
+        if len(topo.island_node_list_for_test_gr) != old_island_size:
+            num_island_changes += 1
+        full_topo = Rebuild_And_Run_MRT_for_All_Sources(topo)
+        assert All_Source_Results(topo) == All_Source_Results(full_topo)
+        assert ([node.node_id for node in topo.island_node_list_for_test_gr]
+                == [node.node_id 
+                    for node in full_topo.island_node_list_for_test_gr])
+    Report(name + ' update_link DOWN x%d (%d changed the island)' %
+           (num_updates, num_island_changes), num_nodes, update_time)
+
+def Run_Update_Link_Benchmarks():
+    Bench_Update_Link('mesh', Random_Mesh_Links(300, 4, 1), 0.0, 20, 1)
+    Bench_Update_Link('mesh metric only', Random_Mesh_Links(300, 4, 1), 
+                      0.0, 20, 1, [1, 5, 10, 20])
+    Bench_Update_Link('mesh (1/2 outside island)', 
+                      Random_Mesh_Links(150, 4, 1), 0.5, 10, 1)
+    Bench_Update_Link_Island_Changes('mesh (1/4 outside island)',
+                                     Random_Mesh_Links(150, 3, 1), 0.25,
+                                     20, 1)
+
+# Compare writing the .csv files with writing the binary results file,
+# and finding the blue next-hops of one (src, dest) pair by reading
+# the _blue_to_all.csv file with looking them up in the binary file.
+def Bench_Binary_Results(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    mrt.Run_MRT_for_All_Sources(topo)
+    work_dir = tempfile.mkdtemp()
+    try:
+        file_prefix = os.path.join(work_dir, 'bench')
+        bin_filename = file_prefix + '_results.bin'
+        csv_time = Time_Once(
+            lambda: mrt.Write_Output_To_Files(topo, file_prefix))
+        bin_time = Time_Once(lambda:
+            bin_results.Write_Binary_Results_To_File(topo, bin_filename))
+        csv_size = 0
+        for suffix in ['_gadag.csv', '_blue_to_all.csv', '_red_to_all.csv',
+                       '_alts_to_all.csv']:
+            csv_size += os.path.getsize(file_prefix + suffix)
+        bin_size = os.path.getsize(bin_filename)
+        assert bin_size < csv_size
+        src = topo.island_node_list_for_test_gr[-1]
+        dest_node_id = topo.island_node_list_for_test_gr[0].node_id
+        row_start = '%04d,%04d,%04d,' % (topo.gadag_root.node_id,
+                                         dest_node_id, src.node_id)
+        def Read_CSV_Rows():
+            row_list = []
+            with open(file_prefix + '_blue_to_all.csv') as csv_file:
+                for row in csv_file:
+                    if row.startswith(row_start):
+                        row_list.append(row)
+            return row_list
+        results = bin_results.Open_Binary_Results(bin_filename)
+        try:
+            csv_lookup_time = Best_Time(Read_CSV_Rows)
+            bin_lookup_time = Best_Time(lambda: bin_results.Lookup_Records(
+                results, 'blue', src.node_id, dest_node_id))
+            bin_row_list = []
+            for record in bin_results.Lookup_Records(
+                    results, 'blue', src.node_id, dest_node_id):
+                bin_row_list.append(bin_results.Record_Row('blue',
+                    results.gadag_root_node_id, dest_node_id, record))
+            assert sorted(Read_CSV_Rows()) == sorted(bin_row_list)
+        finally:
+            bin_results.Close_Binary_Results(results)
+    finally:
+        shutil.rmtree(work_dir)
+    Report(name + ' write .csv files (%d bytes)' % csv_size, num_nodes,
+           csv_time)
+    Report(name + ' write binary file (%d bytes)' % bin_size, num_nodes,
+           bin_time)
+    Report(name + ' one (src, dest) lookup, .csv', num_nodes, 
+           csv_lookup_time)
+    Report(name + ' one (src, dest) lookup, binary', num_nodes, 
+           bin_lookup_time)
+
+def Run_Binary_Results_Benchmarks():
+    Bench_Binary_Results('mesh', Random_Mesh_Links(300, 4, 1))
+
+def Write_Topology_Input_File(filename, link_list):
+    with open(filename + '.csv', 'w') as topo_file:
+        for link in link_list:
+            topo_file.write(','.join([str(col) for col in link]) + '\n')
+
+def Create_Topology_From_Files(filename):
+    topo = mrt.Create_Topology_From_File(filename)
+    mrt.Add_Profile_IDs_from_File(topo, filename)
+    mrt.Add_Prefix_Advertisements_From_File(topo, filename)
+    return topo
+
+# Create_Topology_From_File() only accepts node ids up to 999, so it
+# (with Add_Profile_IDs_from_File() and
+# Add_Prefix_Advertisements_From_File(), as in Load_Topology()) is
+# compared with Load_Topology() on a 999-node mesh, and
+# Load_CSR_Topology() and Load_Topology() are also timed on a file
+# with 1M links.
+def Bench_Topology_Loading(small_link_list, large_link_list):
+    work_dir = tempfile.mkdtemp()
+    try:
+        small_filename = os.path.join(work_dir, 'small')
+        large_filename = os.path.join(work_dir, 'large')
+        Write_Topology_Input_File(small_filename, small_link_list)
+        Write_Topology_Input_File(large_filename, large_link_list)
+        small_num_nodes = len(Build_Topology(small_link_list).node_list)
+        file_time = Best_Time(
+            lambda: Create_Topology_From_Files(small_filename))
+        load_time = Best_Time(lambda: csr_topo.Load_Topology(small_filename))
+        csr_time = Best_Time(
+            lambda: csr_topo.Load_CSR_Topology(small_filename))
+        small_csr = csr_topo.Load_CSR_Topology(small_filename)
+        from_csr_time = Best_Time(
+            lambda: csr_topo.Create_Topology_From_CSR(small_csr))
+        Report('mesh Create_Topology_From_File', small_num_nodes, file_time)
+        Report('mesh Load_Topology', small_num_nodes, load_time)
+        Report('mesh Load_CSR_Topology', small_num_nodes, csr_time)
+        Report('mesh Create_Topology_From_CSR', small_num_nodes,
+               from_csr_time)
+        large_time = Time_Once(
+            lambda: csr_topo.Load_CSR_Topology(large_filename))
+        large_csr = csr_topo.Load_CSR_Topology(large_filename)
+        large_num_links = large_csr.num_intfs // 2
+        large_num_nodes = large_csr.num_nodes
+        del large_csr
+        Report('mesh Load_CSR_Topology (%d links)' % large_num_links,
+               large_num_nodes, large_time)
+        large_load_time = Time_Once(
+            lambda: csr_topo.Load_Topology(large_filename))
+        Report('mesh Load_Topology (%d links)' % large_num_links,
+               large_num_nodes, large_load_time)
+    finally:
+        shutil.rmtree(work_dir)
+
+def Run_Topology_Loading_Benchmarks():
+    Bench_Topology_Loading(Random_Mesh_Links(999, 8, 1),
+                           Random_Mesh_Links(250000, 8, 1))
+
+# Compare Run_MRT_for_All_Sources() with Run_MRT_for_All_Sources_Cached()
+# on a cold cache, when it also writes the entry, and on a hit.
+def Bench_Result_Cache(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    for node in topo.node_list:
+        if node.node_id % 10 == 0:
+            node.prefix_cost_dict[100000 + node.node_id] = 1
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    full_topo = mrt.Copy_Topology_For_Computation(topo)
+    full_time = Time_Once(lambda: mrt.Run_MRT_for_All_Sources(full_topo))
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = result_cache.Result_Cache(cache_dir)
+        cold_time = Time_Once(lambda:
+            result_cache.Run_MRT_for_All_Sources_Cached(topo, cache))
+        assert All_Source_Results(topo) == All_Source_Results(full_topo)
+        hit_time = Best_Time(lambda:
+            result_cache.Run_MRT_for_All_Sources_Cached(topo, cache))
+        assert All_Source_Results(topo) == All_Source_Results(full_topo)
+        # only the named proxy stage is recomputed for a new prefix
+        for some_topo in (topo, full_topo):
+            some_topo.node_list[-1].prefix_cost_dict[200000] = 1
+        full_prefix_time = Time_Once(
+            lambda: mrt.Run_MRT_for_All_Sources(full_topo))
+        prefix_time = Time_Once(lambda:
+            result_cache.Run_MRT_for_All_Sources_Cached(topo, cache))
+        assert All_Source_Results(topo) == All_Source_Results(full_topo)
+        cache_size = 0
+        for filename in os.listdir(cache_dir):
+            cache_size += os.path.getsize(os.path.join(cache_dir, filename))
+    finally:
+        shutil.rmtree(cache_dir)
+    Report(name + ' Run_MRT_for_All_Sources', num_nodes, full_time)
+    Report(name + ' cached, cold cache (%d bytes)' % cache_size, num_nodes,
+           cold_time)
+    Report(name + ' cached, hit', num_nodes, hit_time)
+    Report(name + ' Run_MRT_for_All_Sources, new prefix', num_nodes,
+           full_prefix_time)
+    Report(name + ' cached, new prefix', num_nodes, prefix_time)
+
+def Run_Result_Cache_Benchmarks():
+    Bench_Result_Cache('mesh', Random_Mesh_Links(300, 4, 1))
+
+# Check the alternates of every source against every single link and
+# node failure with Run_What_If_Scenarios(), and compare that with one
+# full Run_MRT_for_All_Sources(), which is what each scenario used to
+# cost when it was checked by recomputing the topology without the
+# failed link or node.
+def Bench_What_If(name, link_list):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    full_time = Time_Once(lambda: mrt.Run_MRT_for_All_Sources(topo))
+    scenario_list = (what_if.Single_Link_Failure_Scenarios(topo) +
+                     what_if.Single_Node_Failure_Scenarios(topo))
+    report_list = []
+    what_if_time = Time_Once(lambda: report_list.append(
+        what_if.Run_What_If_Scenarios(topo, scenario_list)))
+    num_checks = sum(report_list[0].count_dict.values())
+    Check_Node_Protection_Delivered(report_list[0])
+    Report(name + ' one Run_MRT_for_All_Sources', num_nodes, full_time)
+    Report(name + ' what-if, %d scenarios (%d checks)' %
+           (len(scenario_list), num_checks), num_nodes, what_if_time)
+
+def Check_Node_Protection_Delivered(report):
+    for (kind, prot, outcome) in report.count_dict:
+        assert prot != 'NODE_PROTECTION' or outcome == 'DELIVERED'
+
+# In the complex example, node 5 is a cut-vertex and 5-76 a cut-link
+# that separate 76-79 from the rest of the network, so those failures
+# must not be reported as failed alternates to the destinations that
+# are cut off.
+def Check_What_If_Complex_Example():
+    work_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(work_dir, 'complex_topo_input')
+        mrt.Create_Complex_Topology_Input_File(filename)
+        topo = mrt.Create_Topology_From_File(filename)
+        mrt.Add_Profile_IDs_from_File(topo, filename)
+        mrt.Add_Prefix_Advertisements_From_File(topo, filename)
+    finally:
+        shutil.rmtree(work_dir)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 3)
+    mrt.Add_Prefixes_for_Non_Island_Nodes(topo)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 3)
+    mrt.Run_MRT_for_All_Sources(topo)
+    for intf in topo.node_dict[5].intf_list:
+        if intf.remote_node.node_id == 76:
+            cut_link_scenario = ('LINK', 5, intf.link_data)
+    report = what_if.Run_What_If_Scenarios(
+        topo, [('NODE', 5), cut_link_scenario], 1)
+    assert report.failure_list == []
+    scenario_list = (what_if.Single_Link_Failure_Scenarios(topo) +
+                     what_if.Single_Node_Failure_Scenarios(topo))
+    report = what_if.Run_What_If_Scenarios(topo, scenario_list, 1)
+    Check_Node_Protection_Delivered(report)
+
+def Run_What_If_Benchmarks():
+    Check_What_If_Complex_Example()
+    Bench_What_If('mesh', Random_Mesh_Links(300, 4, 1))
+
+# Run_MRT_for_All_Sources() with instrumentation disabled and enabled,
+# alternately so that both see the same machine load, followed by the
+# time of the five slowest phases in one run.
+def Bench_Instrumentation(name, link_list, repeat):
+    topo = Build_Topology(link_list)
+    num_nodes = len(topo.node_list)
+    mrt.Compute_Island_Node_List_For_Test_GR(topo, 1)
+    mrt.Raise_GADAG_Root_Selection_Priority(topo, 1)
+    disabled_time = None
+    enabled_time = None
+    for i in range(repeat):
+        elapsed = Time_Once(lambda: mrt.Run_MRT_for_All_Sources(topo))
+        if disabled_time is None or elapsed < disabled_time:
+            disabled_time = elapsed
+        mrt.Enable_Instrumentation()
+        try:
+            elapsed = Time_Once(lambda: mrt.Run_MRT_for_All_Sources(topo))
+            stats = mrt.Get_Instrumentation_Stats()
+        finally:
+            mrt.Disable_Instrumentation()
+        if enabled_time is None or elapsed < enabled_time:
+            enabled_time = elapsed
+    Report(name + ' instrumentation disabled', num_nodes, disabled_time)
+    Report(name + ' instrumentation enabled', num_nodes, enabled_time)
+    phase_list = sorted(stats['phases'].items(), reverse=True,
+                        key=lambda item: item[1]['seconds'])
+    for (phase_name, phase_stats) in phase_list[:5]:
+        Report(name + ' ' + phase_name, num_nodes, phase_stats['seconds'])
+
+def Run_Instrumentation_Benchmarks():
+    Bench_Instrumentation('mesh', Random_Mesh_Links(300, 4, 1), 5)
+
+def Run_Slots_Benchmarks():
+    Bench_Slots('mesh', Random_Mesh_Links(10000, 8, 1))
+
+if __name__ == '__main__':
+    Run_Recursion_Free_Benchmarks()
+    Run_Parallel_Benchmarks()
+    Run_CSR_Topology_Benchmarks()
+    Run_Slots_Benchmarks()
+    Run_Next_Hop_Merging_Benchmarks()
+    Run_Topological_Sort_Benchmarks()
+    Run_Alternate_Selection_Benchmarks()
+    Run_Update_Link_Benchmarks()
+    Run_Binary_Results_Benchmarks()
+    Run_Topology_Loading_Benchmarks()
+    Run_Result_Cache_Benchmarks()
+    Run_What_If_Benchmarks()
+    Run_Instrumentation_Benchmarks()
@@ -0,0 +1,367 @@
+# A compact binary file format for the results that
+# Write_Output_To_Files() writes as text in the _gadag.csv,
+# _blue_to_all.csv, _red_to_all.csv and _alts_to_all.csv files.
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.
+#
+# The file holds an interface table and four result tables, 'gadag',
+# 'blue', 'red' and 'alts', in that order.  It is laid out as follows
+# (all integers little-endian, node ids unsigned 32-bit):
+#
+#   header    HEADER_FORMAT: the magic string, the format version, the
+#             gadag_root node_id (NO_VALUE if test_gr has no profile 0
+#             island), the file offset and number of the interfaces,
+#             and then for each result table the file offset and
+#             number of its index entries and the file offset and
+#             number of its records
+#   intfs     the interfaces of every node, each INTF_FORMAT
+#             (local_node, remote_node, link_data)
+#   records   all records of the 'gadag' table, then of 'blue', 'red'
+#             and 'alts', each record in the format of its table in
+#             RECORD_FORMAT_DICT
+#   index     the index entries of the 'gadag' table, then of 'blue',
+#             'red' and 'alts', each entry INDEX_FORMAT
+#
+# Records refer to an interface by its position in the interface
+# table (NO_VALUE for none), so that it is stored once rather than
+# in every record that uses it.  A record of the 'gadag', 'blue' and
+# 'red' tables is one interface: a GADAG edge, or one blue or red
+# next-hop.  A record of the 'alts' table is (alternate next-hop
+# interface, failed primary next-hop interface, fec, prot).  The
+# gadag_root is only in the header, and the dest of a record is in
+# its index entry.
+#
+# An index entry (src, dest, first_record, num_records) gives the
+# records of the results of source src for destination dest.
+# first_record counts from the first record of the table.  The
+# entries of a table are sorted on (src, dest), so any (src, dest)
+# pair can be looked up with a binary search in a memory-mapped file
+# (Lookup_Records()) without parsing the rest of it.  Lookup_Records()
+# returns the interfaces of the records as (local_node, remote_node,
+# link_data).  The 'gadag' table has one entry for each node with
+# GADAG edges, with src set to the node and dest to NO_VALUE.
+#
+# Write_Binary_Results_To_File() writes the file from a Topology on
+# which the MRT algorithm has been run.  It holds the records of only
+# one source at a time in memory and spills the index entries to a
+# temporary file until the records are all written.
+# Open_Binary_Results() raises ValueError for a file that is not a
+# complete MRT binary results file.  Convert_Binary_Results_To_CSV()
+# writes the four .csv files exactly as Write_Output_To_Files() does.
+# It can also be run from the command line:
+#
+#   python mrt_binary_results.py <results file> <csv file prefix>
+
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+import mrt_lowpoint_draft_text as mrt
+
+MAGIC = 'MRTRES\0\0'
+VERSION = 3
+
+TABLE_NAMES = ['gadag', 'blue', 'red', 'alts']
+
+HEADER_FORMAT = '<8sIIqq' + 'qqqq' * len(TABLE_NAMES)
+INTF_FORMAT = '<III'
+RECORD_FORMAT_DICT = {'gadag': '<I', 'blue': '<I', 'red': '<I',
+                      'alts': '<IIBB'}
+INDEX_FORMAT = '<IIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INTF_SIZE = struct.calcsize(INTF_FORMAT)
+RECORD_SIZE_DICT = dict((table_name,
+                         struct.calcsize(RECORD_FORMAT_DICT[table_name]))
+                        for table_name in TABLE_NAMES)
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+# node ids are unsigned 32-bit values, and no interface has a link_data
+# or a position in the interface table of NO_VALUE
+NO_VALUE = 4294967295
+
+FEC_LIST = ['NO_ALTERNATE', 'BLUE', 'RED', 'GREEN']
+PROT_LIST = ['NO_PROTECTION', 'NODE_PROTECTION', 'LINK_PROTECTION',
+             'PARALLEL_CUTLINK']
+FEC_CODE_DICT = dict((fec, i) for (i, fec) in enumerate(FEC_LIST))
+PROT_CODE_DICT = dict((prot, i) for (i, prot) in enumerate(PROT_LIST))
+
+class Binary_Results:
+    def __init__(self):
+        self.results_file = None
+        self.mm = None
+        self.gadag_root_node_id = NO_VALUE
+        # (intf_offset, num_intfs)
+        self.intf_table = None
+        # per table name, (index_offset, num_index_entries,
+        # record_offset, num_records)
+        self.table_dict = {}
+
+def Intf_Index_Dict(topo):
+    intf_index_dict = {None: NO_VALUE}
+    for node in topo.node_list:
+        for intf in node.intf_list:
+            intf_index_dict[intf] = len(intf_index_dict) - 1
+    return intf_index_dict
+
+# For each source, in node_id order, the list of (dest, record list)
+# pairs of the given table, in dest order.
+def Table_Source_Results(topo, table_name, intf_index_dict):
+    if table_name == 'gadag':
+        for node in sorted(topo.node_list, key=lambda x: x.node_id):
+            record_list = []
+            for intf in node.intf_list:
+                if intf.SIMULATION_OUTGOING:
+                    record_list.append((intf_index_dict[intf],))
+            if record_list != []:
+                yield (node.node_id, [(NO_VALUE, record_list)])
+        return
+    for x in sorted(topo.island_node_list_for_test_gr,
+                    key=lambda x: x.node_id):
+        if table_name == 'blue':
+            result_dict = x.blue_next_hops_dict
+        elif table_name == 'red':
+            result_dict = x.red_next_hops_dict
+        else:
+            result_dict = x.alt_dict
+        dest_result_list = []
+        for dest_node_id in sorted(result_dict):
+            record_list = []
+            if table_name == 'alts':
+                for alt in result_dict[dest_node_id]:
+                    for alt_intf in alt.nh_list:
+                        record_list.append((intf_index_dict[alt_intf],
+                            intf_index_dict[alt.failed_intf],
+                            FEC_CODE_DICT[alt.fec],
+                            PROT_CODE_DICT[alt.prot]))
+            else:
+                for intf in result_dict[dest_node_id]:
+                    record_list.append((intf_index_dict[intf],))
+            dest_result_list.append((dest_node_id, record_list))
+        yield (x.node_id, dest_result_list)
+
+def Write_Binary_Results_To_File(topo, filename):
+    if topo.island_node_list_for_test_gr == []:
+        gadag_root_node_id = NO_VALUE
+    else:
+        gadag_root_node_id = topo.gadag_root.node_id
+    intf_index_dict = Intf_Index_Dict(topo)
+    table_entry_list = []
+    with open(filename, 'w+b') as results_file:
+        results_file.write('\0' * HEADER_SIZE)
+        intf_offset = results_file.tell()
+        num_intfs = 0
+        for node in topo.node_list:
+            for intf in node.intf_list:
+                results_file.write(struct.pack(INTF_FORMAT,
+                    intf.local_node.node_id, intf.remote_node.node_id,
+                    intf.link_data))
+                num_intfs += 1
+        index_file = tempfile.TemporaryFile()
+        try:
+            for table_name in TABLE_NAMES:
+                record_format = RECORD_FORMAT_DICT[table_name]
+                record_offset = results_file.tell()
+                num_records = 0
+                num_index_entries = 0
+                for (src_node_id, dest_result_list) in \
+                        Table_Source_Results(topo, table_name,
+                                             intf_index_dict):
+                    for (dest_node_id, record_list) in dest_result_list:
+                        index_file.write(struct.pack(INDEX_FORMAT,
+                            src_node_id, dest_node_id, num_records,
+                            len(record_list)))
+                        num_index_entries += 1
+                        for record in record_list:
+                            results_file.write(struct.pack(record_format,
+                                                           *record))
+                        num_records += len(record_list)
+                table_entry_list.append([None, num_index_entries,
+                                         record_offset, num_records])
+            index_offset = results_file.tell()
+            for table_entry in table_entry_list:
+                table_entry[0] = index_offset
+                index_offset += table_entry[1] * INDEX_SIZE
+            index_file.seek(0)
+            shutil.copyfileobj(index_file, results_file)
+        finally:
+            index_file.close()
+        header_field_list = [MAGIC, VERSION, gadag_root_node_id,
+                             intf_offset, num_intfs]
+        for table_entry in table_entry_list:
+            header_field_list.extend(table_entry)
+        results_file.seek(0)
+        results_file.write(struct.pack(HEADER_FORMAT, *header_field_list))
+
+# Checks that the header is that of an MRT binary results file, and
+# that the interfaces, records and index entries it gives are within
+# the file.
+def Read_Header(results, file_size, filename):
+    header_field_list = struct.unpack_from(HEADER_FORMAT, results.mm, 0)
+    if header_field_list[0] != MAGIC or header_field_list[1] != VERSION:
+        raise ValueError('Not an MRT binary results file: ' + filename)
+    results.gadag_root_node_id = header_field_list[2]
+    results.intf_table = header_field_list[3:5]
+    section_list = [(results.intf_table[0], results.intf_table[1],
+                     INTF_SIZE)]
+    for i in range(len(TABLE_NAMES)):
+        table_entry = header_field_list[5 + 4 * i: 9 + 4 * i]
+        results.table_dict[TABLE_NAMES[i]] = table_entry
+        section_list.append((table_entry[0], table_entry[1], INDEX_SIZE))
+        section_list.append((table_entry[2], table_entry[3],
+                             RECORD_SIZE_DICT[TABLE_NAMES[i]]))
+    for (offset, count, size) in section_list:
+        if (offset < HEADER_SIZE or count < 0 or
+            offset + count * size > file_size):
+            raise ValueError('Truncated MRT binary results file: ' +
+                             filename)
+
+def Open_Binary_Results(filename):
+    results = Binary_Results()
+    results.results_file = open(filename, 'rb')
+    try:
+        file_size = os.fstat(results.results_file.fileno()).st_size
+        if file_size < HEADER_SIZE:
+            raise ValueError('Not an MRT binary results file (too '
+                             'short): ' + filename)
+        results.mm = mmap.mmap(results.results_file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        Read_Header(results, file_size, filename)
+    except:
+        if results.mm != None:
+            results.mm.close()
+        results.results_file.close()
+        raise
+    return results
+
+def Close_Binary_Results(results):
+    results.mm.close()
+    results.results_file.close()
+
+def Index_Entry(results, table_name, i):
+    index_offset = results.table_dict[table_name][0]
+    return struct.unpack_from(INDEX_FORMAT, results.mm,
+                              index_offset + i * INDEX_SIZE)
+
+def Intf_Fields(results, intf_index):
+    if intf_index == NO_VALUE:
+        return (NO_VALUE, NO_VALUE, NO_VALUE)
+    return struct.unpack_from(INTF_FORMAT, results.mm,
+                              results.intf_table[0] + intf_index * INTF_SIZE)
+
+# A record of the 'gadag', 'blue' and 'red' tables is returned as
+# (local_node, remote_node, link_data), and a record of the 'alts'
+# table as (local_node, remote_node, link_data, prim_local_node,
+# prim_remote_node, prim_link_data, fec, prot).
+def Read_Records(results, table_name, first_record, num_records):
+    record_format = RECORD_FORMAT_DICT[table_name]
+    record_size = RECORD_SIZE_DICT[table_name]
+    record_offset = results.table_dict[table_name][2]
+    record_list = []
+    for i in range(first_record, first_record + num_records):
+        record = struct.unpack_from(record_format, results.mm,
+                                    record_offset + i * record_size)
+        if table_name == 'alts':
+            record_list.append(Intf_Fields(results, record[0]) +
+                               Intf_Fields(results, record[1]) +
+                               record[2:])
+        else:
+            record_list.append(Intf_Fields(results, record[0]))
+    return record_list
+
+# Return the records of table_name for (src_node_id, dest_node_id),
+# or [] if there are none.  For the 'gadag' table, dest_node_id is
+# NO_VALUE.
+def Lookup_Records(results, table_name, src_node_id, dest_node_id):
+    key = (src_node_id, dest_node_id)
+    low = 0
+    high = results.table_dict[table_name][1]
+    while low < high:
+        mid = (low + high) // 2
+        if Index_Entry(results, table_name, mid)[0:2] < key:
+            low = mid + 1
+        else:
+            high = mid
+    if low == results.table_dict[table_name][1]:
+        return []
+    (src, dest, first_record, num_records) = \
+        Index_Entry(results, table_name, low)
+    if (src, dest) != key:
+        return []
+    return Read_Records(results, table_name, first_record, num_records)
+
+def Intf_Strings(local_node, remote_node, link_data):
+    if link_data == NO_VALUE:
+        return ("None", "None", "None")
+    return ("%04d" % (local_node), "%04d" % (remote_node),
+            "%03d" % (link_data))
+
+# The CSV row for one record, formatted as by Write_GADAG_To_File(),
+# MRT_Row_List() and Alternate_Row_List().
+def Record_Row(table_name, gadag_root, dest, record):
+    intf_strings = Intf_Strings(*record[0:3])
+    if table_name == 'gadag':
+        return ','.join(intf_strings) + '\n'
+    row_fields = ["%04d" % (gadag_root), "%04d" % (dest)]
+    if table_name == 'alts':
+        row_fields.extend(Intf_Strings(*record[3:6]))
+        row_fields.extend(intf_strings)
+        row_fields.append(FEC_LIST[record[6]])
+    else:
+        row_fields.extend(intf_strings)
+    return ','.join(row_fields) + '\n'
+
+# Write the rows of one table in the order that the .csv writers of
+# mrt_lowpoint_draft_text.py use (see Write_Rows_By_Dest_And_Source()),
+# one (dest, source) group at a time.
+def Write_Table_Rows(results, table_name, csv_file):
+    src_node_id_set = set()
+    dest_node_id_set = set()
+    for i in range(results.table_dict[table_name][1]):
+        (src, dest, first_record, num_records) = \
+            Index_Entry(results, table_name, i)
+        src_node_id_set.add(src)
+        dest_node_id_set.add(dest)
+    src_node_id_list = sorted(src_node_id_set, key=mrt.Node_Id_Sort_Key)
+    for dest_node_id in sorted(dest_node_id_set, key=mrt.Node_Id_Sort_Key):
+        for src_node_id in src_node_id_list:
+            row_list = []
+            for record in Lookup_Records(results, table_name, src_node_id,
+                                         dest_node_id):
+                row_list.append(Record_Row(table_name,
+                    results.gadag_root_node_id, dest_node_id, record))
+            row_list.sort()
+            csv_file.writelines(row_list)
+
+def Convert_Binary_Results_To_CSV(filename, file_prefix):
+    results = Open_Binary_Results(filename)
+    try:
+        with open(file_prefix + '_gadag.csv', 'w') as gadag_file:
+            gadag_file.write('local_node,'\
+                             'remote_node,local_intf_link_data\n')
+            Write_Table_Rows(results, 'gadag', gadag_file)
+        for color in ['blue', 'red']:
+            with open(file_prefix + '_' + color + '_to_all.csv',
+                      'w') as mrt_file:
+                mrt_file.write('gadag_root,dest,'\
+                    'local_node,remote_node,link_data\n')
+                Write_Table_Rows(results, color, mrt_file)
+        with open(file_prefix + '_alts_to_all.csv', 'w') as alt_file:
+            alt_file.write('gadag_root,dest,'\
+                'prim_nh.local_node,prim_nh.remote_node,'\
+                'prim_nh.link_data,alt_nh.local_node,'\
+                'alt_nh.remote_node,alt_nh.link_data,'\
+                'alt_nh.fec\n')
+            Write_Table_Rows(results, 'alts', alt_file)
+    finally:
+        Close_Binary_Results(results)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('usage: python mrt_binary_results.py <results file> '\
+              '<csv file prefix>')
+        exit()
+    Convert_Binary_Results_To_CSV(sys.argv[1], sys.argv[2])
@@ -0,0 +1,542 @@
+# A compact, array-backed storage format for a Topology.
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.
+#
+# A CSR_Topology is a storage and conversion format, not a second
+# implementation of the MRT algorithm: the MRT computations still run
+# on the Node and Interface objects of mrt_lowpoint_draft_text.py,
+# after Create_Topology_From_CSR().  The only computation on the
+# arrays themselves is CSR_Normal_SPF(), which is only a little faster
+# than Normal_SPF() (see Bench_CSR_Topology() in mrt_benchmarks.py).
+# What the format saves is memory, and the time of reading large
+# input files.
+#
+# The Node and Interface classes keep every attribute in a
+# per-instance dict.  A CSR_Topology instead numbers the nodes 0..N-1
+# in the order of topo.node_list and stores the interfaces in
+# compressed sparse row (CSR) form: the interfaces of the node with
+# index i are the entries intf_offsets[i] .. intf_offsets[i+1]-1 of
+# the per-interface arrays.  Within a node the interfaces keep the
+# order of node.intf_list, so the link_data of interface i is
+# i - intf_offsets[intf_local_index[i]].
+#
+# Only the static description of the topology (the part read from the
+# input files) is kept in the arrays.  Create_CSR_Topology() and
+# Create_Topology_From_CSR() convert to and from the object model, so
+# Create_Topology_From_File(), Add_Profile_IDs_from_File(),
+# Add_Prefix_Advertisements_From_File() and the Write_* functions can
+# be used unchanged on either side of the conversion.
+#
+# For large topologies, Load_CSR_Topology() reads the same .csv,
+# .profile and .prefix input files directly into a CSR_Topology,
+# without creating a Node or Interface object.
+
+import array
+import heapq
+import itertools
+import json
+import operator
+import os.path
+
+import mrt_lowpoint_draft_text as mrt
+
+# bits of CSR_Topology.intf_flags
+INTF_MRT_INELIGIBLE = 0x1
+INTF_IGP_EXCLUDED = 0x2
+
+MAX_METRIC = 2147483647 # 2^31-1 as max metric, as in Normal_SPF()
+MAX_ID = 4294967295 # node ids and prefix ids are unsigned 32-bit values
+
+# Node ids, profile ids and prefix ids are kept in arrays of ID_TYPECODE,
+# an unsigned type of at least 32 bits.  'l' is not enough: it is 
+# signed, and only 32 bits on 64-bit Windows.  Node and interface 
+# indices, metrics and areas are below 2^31, so they are kept in 'l'.
+if array.array('I').itemsize >= 4:
+    ID_TYPECODE = 'I'
+else:
+    ID_TYPECODE = 'L'
+
+class CSR_Topology:
+    def __init__(self):
+        self.num_nodes = 0
+        self.num_intfs = 0
+        # per-node arrays, indexed by node index
+        self.node_id = array.array(ID_TYPECODE)
+        self.GR_sel_priority = array.array('B')
+        self.intf_offsets = array.array('l', [0])
+        self.profile_offsets = array.array('l', [0])
+        self.prefix_offsets = array.array('l', [0])
+        # per-interface arrays, indexed by interface index
+        self.intf_local_index = array.array('l')
+        self.intf_remote_index = array.array('l')
+        self.intf_remote_intf = array.array('l')
+        self.intf_metric = array.array('l')
+        self.intf_area = array.array('l')
+        self.intf_flags = array.array('B')
+        # profile ids and prefix advertisements, also in CSR form
+        self.profile_id = array.array(ID_TYPECODE)
+        self.prefix = array.array(ID_TYPECODE)
+        self.prefix_cost = array.array('l')
+        self.node_index_dict = {}
+        self.test_gr_index = -1
+        self.test_gr_island_index = array.array('l')
+
+def Intf_Link_Data(csr, intf_index):
+    return intf_index - csr.intf_offsets[csr.intf_local_index[intf_index]]
+
+def Intf_Index(csr, node_index, link_data):
+    return csr.intf_offsets[node_index] + link_data
+
+# Build a CSR_Topology holding the same nodes, interfaces, profile ids
+# and prefix advertisements as topo.  The interfaces of each node must
+# have link_data equal to their position in node.intf_list, which is
+# how Create_Topology_From_File() numbers them.  A node id, profile id
+# or prefix id that is not an unsigned 32-bit value raises ValueError.
+def Create_CSR_Topology(topo):
+    csr = CSR_Topology()
+    for node in topo.node_list:
+        for value in ([node.node_id] + node.profile_id_list 
+                      + list(node.prefix_cost_dict)):
+            if not 0 <= value <= MAX_ID:
+                raise ValueError('id %r of node %r is not an unsigned '
+                                 '32-bit value' % (value, node.node_id))
+    for node in topo.node_list:
+        csr.node_index_dict[node.node_id] = csr.num_nodes
+        csr.num_nodes += 1
+    intf_index_dict = {}
+    for node in topo.node_list:
+        node_index = csr.node_index_dict[node.node_id]
+        csr.node_id.append(node.node_id)
+        csr.GR_sel_priority.append(node.GR_sel_priority)
+        for intf in node.intf_list:
+            assert intf.link_data == len(csr.intf_local_index) - \
+                csr.intf_offsets[node_index]
+            intf_index_dict[intf] = len(csr.intf_local_index)
+            flags = 0
+            if intf.MRT_INELIGIBLE:
+                flags |= INTF_MRT_INELIGIBLE
+            if intf.IGP_EXCLUDED:
+                flags |= INTF_IGP_EXCLUDED
+            csr.intf_local_index.append(node_index)
+            csr.intf_remote_index.append(
+                csr.node_index_dict[intf.remote_node.node_id])
+            csr.intf_metric.append(intf.metric)
+            csr.intf_area.append(intf.area)
+            csr.intf_flags.append(flags)
+        csr.intf_offsets.append(len(csr.intf_local_index))
+        csr.profile_id.extend(node.profile_id_list)
+        csr.profile_offsets.append(len(csr.profile_id))
+        for prefix in sorted(node.prefix_cost_dict):
+            csr.prefix.append(prefix)
+            csr.prefix_cost.append(node.prefix_cost_dict[prefix])
+        csr.prefix_offsets.append(len(csr.prefix))
+    csr.num_intfs = len(csr.intf_local_index)
+    for node in topo.node_list:
+        for intf in node.intf_list:
+            csr.intf_remote_intf.append(intf_index_dict[intf.remote_intf])
+    if topo.test_gr != None:
+        csr.test_gr_index = csr.node_index_dict[topo.test_gr.node_id]
+    for node in topo.island_node_list_for_test_gr:
+        csr.test_gr_island_index.append(csr.node_index_dict[node.node_id])
+    return csr
+
+# The inverse of Create_CSR_Topology(): build a Topology whose node_list
+# follows the node indices and whose intf_lists follow the interface
+# indices, ready to run the MRT algorithm and the Write_* functions on.
+# All the Node and Interface objects are created first, so that each
+# interface is filled in with a single pass over the interface arrays,
+# including its remote_intf.
+def Create_Topology_From_CSR(csr):
+    topo = mrt.Topology()
+    node_list = [mrt.Node() for i in range(csr.num_nodes)]
+    intf_list = [mrt.Interface() for j in range(csr.num_intfs)]
+    intf_offsets = csr.intf_offsets.tolist()
+    profile_offsets = csr.profile_offsets.tolist()
+    prefix_offsets = csr.prefix_offsets.tolist()
+    # the ID_TYPECODE arrays give longs, and the ids read from the 
+    # input files are ints
+    profile_id = map(int, csr.profile_id)
+    prefix = map(int, csr.prefix)
+    prefix_cost = csr.prefix_cost.tolist()
+    for (i, node, node_id, GR_sel_priority) in itertools.izip(
+            itertools.count(), node_list, map(int, csr.node_id),
+            csr.GR_sel_priority.tolist()):
+        node.node_id = node_id
+        node.GR_sel_priority = GR_sel_priority
+        node.profile_id_list = profile_id[
+            profile_offsets[i]:profile_offsets[i+1]]
+        if prefix_offsets[i] != prefix_offsets[i+1]:
+            node.prefix_cost_dict = dict(itertools.izip(
+                prefix[prefix_offsets[i]:prefix_offsets[i+1]],
+                prefix_cost[prefix_offsets[i]:prefix_offsets[i+1]]))
+        node.intf_list = intf_list[intf_offsets[i]:intf_offsets[i+1]]
+        topo.node_dict[node_id] = node
+    topo.node_list = node_list
+    for (j, intf, local_index, remote_index, remote_intf_index, metric,
+         area, flags) in itertools.izip(itertools.count(), intf_list,
+            csr.intf_local_index.tolist(), csr.intf_remote_index.tolist(),
+            csr.intf_remote_intf.tolist(), csr.intf_metric.tolist(),
+            csr.intf_area.tolist(), csr.intf_flags.tolist()):
+        intf.metric = metric
+        intf.area = area
+        if flags != 0:
+            intf.MRT_INELIGIBLE = bool(flags & INTF_MRT_INELIGIBLE)
+            intf.IGP_EXCLUDED = bool(flags & INTF_IGP_EXCLUDED)
+        intf.link_data = j - intf_offsets[local_index]
+        intf.local_node = node_list[local_index]
+        intf.remote_node = node_list[remote_index]
+        intf.remote_intf = intf_list[remote_intf_index]
+    if csr.test_gr_index != -1:
+        topo.test_gr = node_list[csr.test_gr_index]
+    for i in csr.test_gr_island_index:
+        topo.island_node_list_for_test_gr.append(node_list[i])
+    return topo
+
+def Create_CSR_Topology_From_File(filename):
+    return Load_CSR_Topology(filename)
+
+def Report_Malformed_Line(malformed_line_list, filename, line_number,
+                          line, reason):
+    if malformed_line_list == None:
+        print('skipping line %d of %s (%s): %s' % (line_number, filename,
+              reason, line.rstrip('\r\n')))
+    else:
+        malformed_line_list.append((filename, line_number, line, reason))
+
+# Return the values of cols as ints, or a reason why they cannot be
+# used.
+def Parse_Int_Cols(cols, min_value_list, max_value_list):
+    try:
+        value_list = map(int, cols)
+    except ValueError:
+        return 'not an integer'
+    for i in range(len(value_list)):
+        if (value_list[i] < min_value_list[i] 
+            or value_list[i] > max_value_list[i]):
+            return 'column %d out of range' % (i + 1)
+    return value_list
+
+# Read the links of a .csv file all at once, as four lists in file
+# order: the node ids at each end, the metric and the reverse metric.
+# The lines are joined and split into one list of columns, which is
+# converted with a single map(int, ...), and the ranges are checked on
+# whole columns, instead of splitting, converting and checking each
+# line on its own.  Returns None if any line cannot be used (or is
+# blank, other than the last), so that Read_Links_By_Line() can report
+# and skip such lines.
+def Read_Links_In_Bulk(topo_filename):
+    with open(topo_filename) as topo_file:
+        line_list = topo_file.read().split('\n')
+    if line_list[-1] == '':
+        line_list.pop()
+    num_links = len(line_list)
+    if num_links == 0:
+        return None
+    comma_count_list = map(str.count, line_list,
+                           itertools.repeat(',', num_links))
+    min_comma_count = min(comma_count_list)
+    max_comma_count = max(comma_count_list)
+    if min_comma_count < 2 or max_comma_count > 3:
+        return None
+    if min_comma_count != max_comma_count:
+        # give the lines without a reverse metric their metric as one
+        line_list = [line + line[line.rindex(','):] if comma_count == 2
+                     else line for (line, comma_count)
+                     in itertools.izip(line_list, comma_count_list)]
+    col_text = ','.join(line_list)
+    del line_list
+    value_list = None
+    # If there are only digits, commas and whitespace, json.loads() can
+    # only return ints, and it parses them several times faster than
+    # int().  It rejects leading zeros, which int() accepts.
+    if col_text.translate(None, '0123456789,\r\t ') == '':
+        try:
+            value_list = json.loads('[' + col_text + ']')
+        except ValueError:
+            pass
+    if value_list == None:
+        try:
+            value_list = map(int, col_text.split(','))
+        except ValueError:
+            return None
+    del col_text
+    num_cols = max_comma_count + 1
+    nodea_node_id_list = value_list[0::num_cols]
+    nodeb_node_id_list = value_list[1::num_cols]
+    metric_list = value_list[2::num_cols]
+    reverse_metric_list = value_list[num_cols - 1::num_cols]
+    for (col_list, max_value) in [(nodea_node_id_list, MAX_ID),
+                                  (nodeb_node_id_list, MAX_ID),
+                                  (metric_list, MAX_METRIC),
+                                  (reverse_metric_list, MAX_METRIC)]:
+        if min(col_list) < 0 or max(col_list) > max_value:
+            return None
+    if any(map(operator.eq, nodea_node_id_list, nodeb_node_id_list)):
+        return None
+    return (nodea_node_id_list, nodeb_node_id_list, metric_list,
+            reverse_metric_list)
+
+# The same as Read_Links_In_Bulk(), but one line at a time, reporting
+# and skipping the lines that cannot be used.
+def Read_Links_By_Line(topo_filename, malformed_line_list):
+    nodea_node_id_list = []
+    nodeb_node_id_list = []
+    metric_list = []
+    reverse_metric_list = []
+    with open(topo_filename) as topo_file:
+        line_number = 0
+        for line in topo_file:
+            line_number += 1
+            cols = line.split(',')
+            if len(cols) != 3 and len(cols) != 4:
+                if line.strip() != '':
+                    Report_Malformed_Line(malformed_line_list, 
+                        topo_filename, line_number, line,
+                        'expected 3 or 4 columns')
+                continue
+            try:
+                value_list = map(int, cols)
+            except ValueError:
+                Report_Malformed_Line(malformed_line_list, topo_filename,
+                    line_number, line, 'not an integer')
+                continue
+            if len(value_list) == 3:
+                value_list.append(value_list[2])
+            (nodea_node_id, nodeb_node_id, metric, reverse_metric) = \
+                value_list
+            if not (0 <= nodea_node_id <= MAX_ID 
+                    and 0 <= nodeb_node_id <= MAX_ID
+                    and 0 <= metric <= MAX_METRIC 
+                    and 0 <= reverse_metric <= MAX_METRIC):
+                Report_Malformed_Line(malformed_line_list, topo_filename,
+                    line_number, line, 'value out of range')
+                continue
+            if nodea_node_id == nodeb_node_id:
+                Report_Malformed_Line(malformed_line_list, topo_filename,
+                    line_number, line, 'link from a node to itself')
+                continue
+            nodea_node_id_list.append(nodea_node_id)
+            nodeb_node_id_list.append(nodeb_node_id)
+            metric_list.append(metric)
+            reverse_metric_list.append(reverse_metric)
+    return (nodea_node_id_list, nodeb_node_id_list, metric_list,
+            reverse_metric_list)
+
+# Load_CSR_Topology() reads the input files that
+# Create_Topology_From_File(), Add_Profile_IDs_from_File() and
+# Add_Prefix_Advertisements_From_File() read, making a single pass
+# over each file and keeping only arrays.  Nodes get indices in the
+# order in which they first appear in the .csv file, and each node
+# gets its interfaces in file order, so that link_data matches what
+# Create_Topology_From_File() assigns.
+#
+# Node ids and prefix ids can be any unsigned 32-bit value, and
+# metrics range from 0 to 2^31-1.  A prefix id must not also be a
+# node id.  A line that cannot be used is reported and skipped,
+# instead of ending the program: for example a line with the wrong
+# number of columns, a value that is not an integer or is out of
+# range, a link from a node to itself, or a profile or prefix for a
+# node that is not in the .csv file.  Lines are reported by printing
+# them, or by appending (filename, line_number, line, reason) to
+# malformed_line_list if one is given.  Blank lines are ignored.
+#
+# The links are read by Read_Links_In_Bulk(), or if that finds a line
+# that cannot be used, by Read_Links_By_Line().
+def Load_CSR_Topology(filename, malformed_line_list=None):
+    csr = CSR_Topology()
+    topo_filename = filename + '.csv'
+    link_lists = Read_Links_In_Bulk(topo_filename)
+    if link_lists == None:
+        link_lists = Read_Links_By_Line(topo_filename, malformed_line_list)
+    node_index_dict = csr.node_index_dict
+    get_node_index = node_index_dict.get
+    node_id_list = []
+    # for each node index, the (remote node index, remote link_data,
+    # metric) of each of its interfaces, in file order, flattened into
+    # one list
+    node_intf_values_list = []
+    for (nodea_node_id, nodeb_node_id, metric, reverse_metric) in \
+            itertools.izip(*link_lists):
+        nodea_index = get_node_index(nodea_node_id)
+        if nodea_index == None:
+            nodea_index = len(node_id_list)
+            node_index_dict[nodea_node_id] = nodea_index
+            node_id_list.append(nodea_node_id)
+            nodea_intf_values = []
+            node_intf_values_list.append(nodea_intf_values)
+        else:
+            nodea_intf_values = node_intf_values_list[nodea_index]
+        nodeb_index = get_node_index(nodeb_node_id)
+        if nodeb_index == None:
+            nodeb_index = len(node_id_list)
+            node_index_dict[nodeb_node_id] = nodeb_index
+            node_id_list.append(nodeb_node_id)
+            nodeb_intf_values = []
+            node_intf_values_list.append(nodeb_intf_values)
+        else:
+            nodeb_intf_values = node_intf_values_list[nodeb_index]
+        nodea_link_data = len(nodea_intf_values) // 3
+        nodea_intf_values += (nodeb_index, len(nodeb_intf_values) // 3,
+                              metric)
+        nodeb_intf_values += (nodea_index, nodea_link_data, reverse_metric)
+    del link_lists
+    csr.num_nodes = len(node_id_list)
+    csr.node_id = array.array(ID_TYPECODE, node_id_list)
+    csr.GR_sel_priority = array.array('B', [128]) * csr.num_nodes
+    intf_values = []
+    for node_index in range(csr.num_nodes):
+        node_intf_values = node_intf_values_list[node_index]
+        intf_values.extend(node_intf_values)
+        csr.intf_offsets.append(len(intf_values) // 3)
+        csr.intf_local_index.extend(
+            array.array('l', [node_index]) * (len(node_intf_values) // 3))
+    del node_intf_values_list
+    csr.num_intfs = len(intf_values) // 3
+    intf_remote_index = intf_values[0::3]
+    intf_offsets_list = csr.intf_offsets.tolist()
+    csr.intf_remote_index = array.array('l', intf_remote_index)
+    csr.intf_remote_intf = array.array('l', map(operator.add,
+        map(intf_offsets_list.__getitem__, intf_remote_index),
+        intf_values[1::3]))
+    csr.intf_metric = array.array('l', intf_values[2::3])
+    csr.intf_area = array.array('l', [0]) * csr.num_intfs
+    csr.intf_flags = array.array('B', [0]) * csr.num_intfs
+    Load_CSR_Profile_IDs(csr, filename, malformed_line_list)
+    Load_CSR_Prefix_Advertisements(csr, filename, malformed_line_list)
+    return csr
+
+# Read the lines of a .profile or .prefix file into one list per node
+# index of (line_number, line, value_list), where value_list holds the
+# values of the line other than the node id in column node_col.
+def Load_Per_Node_Values(csr, values_filename, node_col, min_value_list,
+                         max_value_list, malformed_line_list):
+    per_node_value_list = [[] for i in range(csr.num_nodes)]
+    with open(values_filename) as values_file:
+        line_number = 0
+        for line in values_file:
+            line_number += 1
+            cols = line.split(',')
+            if len(cols) != len(min_value_list):
+                if line.strip() != '':
+                    Report_Malformed_Line(malformed_line_list, 
+                        values_filename, line_number, line,
+                        'expected %d columns' % len(min_value_list))
+                continue
+            value_list = Parse_Int_Cols(cols, min_value_list, 
+                                        max_value_list)
+            if isinstance(value_list, str):
+                Report_Malformed_Line(malformed_line_list, values_filename,
+                                      line_number, line, value_list)
+                continue
+            this_node_id = value_list.pop(node_col)
+            if this_node_id not in csr.node_index_dict:
+                Report_Malformed_Line(malformed_line_list, values_filename,
+                    line_number, line, 'unknown node')
+                continue
+            per_node_value_list[csr.node_index_dict[this_node_id]].append(
+                (line_number, line, value_list))
+    return per_node_value_list
+
+# As in Add_Profile_IDs_from_File(), every node supports only profile 0
+# if there is no .profile file.
+def Load_CSR_Profile_IDs(csr, filename, malformed_line_list):
+    profile_filename = filename + '.profile'
+    if not os.path.exists(profile_filename):
+        csr.profile_id = array.array(ID_TYPECODE, [0]) * csr.num_nodes
+        csr.profile_offsets = array.array('l', range(csr.num_nodes + 1))
+        return
+    per_node_value_list = Load_Per_Node_Values(csr, profile_filename, 0,
+        [0, 0], [MAX_ID, MAX_ID], malformed_line_list)
+    for node_index in range(csr.num_nodes):
+        for (line_number, line, value_list) in \
+                per_node_value_list[node_index]:
+            csr.profile_id.append(value_list[0])
+        csr.profile_offsets.append(len(csr.profile_id))
+
+# The prefix file has lines of (prefix_id, node_id, cost).  As in
+# Create_CSR_Topology(), the prefixes of each node are kept sorted, and
+# a later line for the same node and prefix replaces an earlier one,
+# as in Add_Prefix_Advertisements_From_File().
+def Load_CSR_Prefix_Advertisements(csr, filename, malformed_line_list):
+    prefix_filename = filename + '.prefix'
+    if not os.path.exists(prefix_filename):
+        csr.prefix_offsets = array.array('l', [0]) * (csr.num_nodes + 1)
+        return
+    per_node_value_list = Load_Per_Node_Values(csr, prefix_filename, 1,
+        [0, 0, 0], [MAX_ID, MAX_ID, MAX_METRIC], malformed_line_list)
+    for node_index in range(csr.num_nodes):
+        prefix_cost_dict = {}
+        for (line_number, line, value_list) in \
+                per_node_value_list[node_index]:
+            prefix_id = value_list[0]
+            if prefix_id in csr.node_index_dict:
+                Report_Malformed_Line(malformed_line_list, prefix_filename,
+                    line_number, line, 'prefix id is also a node id')
+                continue
+            prefix_cost_dict[prefix_id] = value_list[1]
+        for prefix in sorted(prefix_cost_dict):
+            csr.prefix.append(prefix)
+            csr.prefix_cost.append(prefix_cost_dict[prefix])
+        csr.prefix_offsets.append(len(csr.prefix))
+
+# Load_CSR_Topology() followed by Create_Topology_From_CSR(): a
+# replacement for Create_Topology_From_File() followed by
+# Add_Profile_IDs_from_File() and Add_Prefix_Advertisements_From_File()
+# that accepts node ids above 999 and skips malformed lines instead of
+# exiting.  It is only a little faster than those (see
+# Bench_Topology_Loading() in mrt_benchmarks.py), since most of the
+# time of either goes to creating the Node and Interface objects.
+def Load_Topology(filename, malformed_line_list=None):
+    return Create_Topology_From_CSR(
+        Load_CSR_Topology(filename, malformed_line_list))
+
+# CSR_Normal_SPF() computes the same shortest paths as Normal_SPF(),
+# with the same (metric, node_id) order of extraction from the heap.
+# It returns two lists indexed by node index: the metric of the
+# shortest path from spf_root_index (MAX_METRIC if unreachable) and
+# the list of primary next-hops, each given as the interface index of
+# an interface of the root.  As in Normal_SPF(), the next-hops of a
+# node are the ones it had when it was extracted from the heap.
+def CSR_Normal_SPF(csr, spf_root_index):
+    intf_offsets = csr.intf_offsets
+    intf_remote_index = csr.intf_remote_index
+    intf_metric = csr.intf_metric
+    node_id = csr.node_id
+    spf_metric = [MAX_METRIC] * csr.num_nodes
+    next_hops = [None] * csr.num_nodes
+    primary_next_hops = [[] for i in range(csr.num_nodes)]
+    visited = [False] * csr.num_nodes
+    spf_metric[spf_root_index] = 0
+    next_hops[spf_root_index] = []
+    spf_heap = [(0, node_id[spf_root_index], spf_root_index)]
+    while spf_heap != []:
+        min_index = heapq.heappop(spf_heap)[2]
+        if visited[min_index]:
+            continue
+        visited[min_index] = True
+        min_metric = spf_metric[min_index]
+        min_next_hops = next_hops[min_index]
+        primary_next_hops[min_index] = list(min_next_hops)
+        for intf_index in range(intf_offsets[min_index],
+                                intf_offsets[min_index + 1]):
+            remote_index = intf_remote_index[intf_index]
+            if visited[remote_index]:
+                continue
+            path_metric = min_metric + intf_metric[intf_index]
+            if path_metric < spf_metric[remote_index]:
+                spf_metric[remote_index] = path_metric
+                if min_index == spf_root_index:
+                    next_hops[remote_index] = [intf_index]
+                else:
+                    next_hops[remote_index] = list(min_next_hops)
+                heapq.heappush(spf_heap, (path_metric, node_id[remote_index],
+                                          remote_index))
+            elif path_metric == spf_metric[remote_index]:
+                if min_index == spf_root_index:
+                    mrt.Add_Item_To_List_If_New(next_hops[remote_index],
+                                                intf_index)
+                else:
+                    mrt.Add_Items_To_List_If_New(next_hops[remote_index],
+                                                 min_next_hops)
+    return (spf_metric, primary_next_hops)
@@ -40,10 +40,24 @@
 import random 
 import os.path
 import heapq
+import collections
+import multiprocessing
+import json
+import time
 
 # simple Class definitions allow structure-like dot notation for 
 # variables and a convenient place to initialize those variables.
-class Topology:
+# Every attribute is listed in __slots__ and initialized in __init__ 
+# or init_new_computing_router, so instances carry no attribute dict.
+class Topology(object):
+    __slots__ = ('gadag_root', 'node_list', 'node_dict', 'test_gr',
+                 'island_node_list_for_test_gr', 'stored_named_proxy_dict',
+                 'island_node_list', 'island_profile_id', 'island_area',
+                 'next_dfs_number', 'max_block_id', 'named_proxy_dict',
+                 'island_nbr_set', 'island_border_set', 'alt_tie_break',
+                 'alt_tie_break_seed', 'red_alt_count', 'blue_alt_count',
+                 'island_marking_dest_set', 'island_named_proxy_dict',
+                 'prefix_class_dict')
     def __init__(self):
         self.gadag_root = None
         self.node_list = []
@@ -51,12 +65,51 @@ class Topology:
         self.test_gr = None
         self.island_node_list_for_test_gr = []
         self.stored_named_proxy_dict = {}
+        # see Choose_Red_Or_Blue()
+        self.alt_tie_break = 'HASH'
+        self.alt_tie_break_seed = 0
         self.init_new_computing_router()
     def init_new_computing_router(self):
         self.island_node_list = []
+        self.island_profile_id = None
+        self.island_area = None
+        self.next_dfs_number = 0
+        self.max_block_id = 0
+        # see Compute_Loop_Free_Island_Neighbors_For_Each_Prefix()
+        self.island_marking_dest_set = None
+        # see Attach_Named_Proxy_Nodes_Once()
+        self.island_named_proxy_dict = None
+        # see Create_Basic_Named_Proxy_Nodes()
+        self.prefix_class_dict = {}
+        self.island_nbr_set = None
+        self.island_border_set = None
+        self.init_new_source_in_island()
+    def init_new_source_in_island(self):
         self.named_proxy_dict = {}   
+        self.red_alt_count = 0
+        self.blue_alt_count = 0
+    def update_link(self, nodea_node_id, nodeb_node_id, metric,
+                    reverse_metric=None):
+        return Update_Link(self, nodea_node_id, nodeb_node_id, metric,
+                           reverse_metric)
         
-class Node:
+class Node(object):
+    __slots__ = ('node_id', 'intf_list', 'profile_id_list', 'GR_sel_priority',
+                 'blue_next_hops_dict', 'red_next_hops_dict',
+                 'blue_to_green_nh_dict', 'red_to_green_nh_dict',
+                 'prefix_cost_dict', 'pnh_dict', 'alt_dict',
+                 'island_intf_list', 'IN_MRT_ISLAND', 'IN_GADAG',
+                 'dfs_number', 'dfs_parent', 'dfs_parent_intf',
+                 'dfs_child_list', 'lowpoint_number', 'lowpoint_parent',
+                 'lowpoint_parent_intf', 'localroot', 'block_id',
+                 'IS_CUT_VERTEX', 'blue_next_hops', 'red_next_hops',
+                 'primary_next_hops', 'alt_list', 'unvisited', 'topo_order',
+                 'HIGHER', 'LOWER', 'order_proxy', 'spf_metric', 'next_hops',
+                 'next_hops_bits', 'primary_spf_metric',
+                 'mrt_island_next_hops', 'collapsed_metric',
+                 'collapsed_next_hops',
+                 'PATH_HITS_ISLAND', 'isl_marking_spf_dict',
+                 'min_intf_metric_dict', 'min_intf_list_dict')
     def __init__(self):
         self.node_id = None
         self.intf_list = []
@@ -88,14 +141,39 @@ class Node:
         self.red_next_hops = []
         self.primary_next_hops = []
         self.alt_list = []
+        self.unvisited = 0
+        self.topo_order = None
+        self.HIGHER = False
+        self.LOWER = False
+        self.order_proxy = None
+        self.spf_metric = None
+        self.next_hops = None
+        self.next_hops_bits = 0
+        self.primary_spf_metric = None
+        self.mrt_island_next_hops = []
+        self.collapsed_metric = None
+        self.collapsed_next_hops = []
+        self.PATH_HITS_ISLAND = False
+        self.isl_marking_spf_dict = None
+        self.min_intf_metric_dict = None
+        self.min_intf_list_dict = None
         
-class Interface:
+class Interface(object):
+    __slots__ = ('metric', 'area', 'MRT_INELIGIBLE', 'IGP_EXCLUDED',
+                 'SIMULATION_OUTGOING', 'link_data', 'local_node',
+                 'remote_node', 'remote_intf', 'UNDIRECTED', 'INCOMING',
+                 'OUTGOING', 'INCOMING_STORED', 'OUTGOING_STORED',
+                 'IN_MRT_ISLAND', 'PROCESSED')
     def __init__(self):
         self.metric = None
         self.area = None
         self.MRT_INELIGIBLE = False
         self.IGP_EXCLUDED = False
         self.SIMULATION_OUTGOING = False
+        self.link_data = None
+        self.local_node = None
+        self.remote_node = None
+        self.remote_intf = None
         self.init_new_computing_router()
     def init_new_computing_router(self):
         self.UNDIRECTED = True
@@ -106,13 +184,16 @@ class Interface:
         self.IN_MRT_ISLAND = False
         self.PROCESSED = False
 
-class Bundle:
+class Bundle(object):
+    __slots__ = ('UNDIRECTED', 'OUTGOING', 'INCOMING')
     def __init__(self):
         self.UNDIRECTED = True
         self.OUTGOING = False
         self.INCOMING = False
 
-class Alternate:
+class Alternate(object):
+    __slots__ = ('failed_intf', 'red_or_blue', 'nh_list', 'fec', 'prot',
+                 'info')
     def __init__(self):
         self.failed_intf = None
         self.red_or_blue = None
@@ -121,7 +202,9 @@ class Alternate:
         self.prot = 'NO_PROTECTION'
         self.info = 'NONE'
 
-class Proxy_Node_Attachment_Router:
+class Proxy_Node_Attachment_Router(object):
+    __slots__ = ('prefix', 'node', 'named_proxy_cost', 'min_lfin',
+                 'nh_intf_list')
     def __init__(self):
         self.prefix = None
         self.node = None
@@ -129,11 +212,18 @@ class Proxy_Node_Attachment_Router:
         self.min_lfin = None
         self.nh_intf_list = []
         
-class Named_Proxy_Node:
+class Named_Proxy_Node(object):
+    __slots__ = ('node_id', 'prefix_list', 'node_prefix_cost_list',
+                 'lfin_list', 'ibr_lfin_pair_list', 'pnar1', 'pnar2',
+                 'pnar_X', 'pnar_Y', 'blue_next_hops', 'red_next_hops',
+                 'primary_next_hops', 'blue_next_hops_dict',
+                 'red_next_hops_dict', 'pnh_dict', 'alt_dict', 'alt_list')
     def __init__(self):
-        self.node_id = None  #this is the prefix_id
+        self.node_id = None  #this is the class id, its lowest prefix
+        self.prefix_list = []
         self.node_prefix_cost_list = []
         self.lfin_list = []
+        self.ibr_lfin_pair_list = []
         self.pnar1 = None
         self.pnar2 = None
         self.pnar_X = None
@@ -145,6 +235,7 @@ class Named_Proxy_Node:
         self.red_next_hops_dict = {}
         self.pnh_dict = {}
         self.alt_dict = {}
+        self.alt_list = []
 
 def Interface_Compare(intf_a, intf_b):
     if intf_a.metric < intf_b.metric:
@@ -168,6 +259,52 @@ def Reset_Computed_Node_and_Intf_Values(topo):
         for intf in node.intf_list:
             intf.init_new_computing_router()
 
+# All of the values computed by the MRT algorithm are stored on the 
+# Topology, Node and Interface objects that it runs on, including the 
+# counters used by Run_Lowpoint() and Run_Assign_Block_ID().  To run 
+# several computations at the same time (for example, what-if 
+# computations in different threads), each computation should run on 
+# its own copy of the topology, created by this function.  The copy 
+# has the same nodes, interfaces, metrics, profiles, prefixes and 
+# test_gr as topo, but none of its computed values.  topo itself is 
+# only read, so any number of copies can be made from it concurrently 
+# as long as nothing is computing on topo at the same time.
+def Copy_Topology_For_Computation(topo):
+    new_topo = Topology()
+    for node in topo.node_list:
+        new_node = Node()
+        new_node.node_id = node.node_id
+        new_node.profile_id_list = list(node.profile_id_list)
+        new_node.GR_sel_priority = node.GR_sel_priority
+        new_node.prefix_cost_dict = dict(node.prefix_cost_dict)
+        new_topo.node_list.append(new_node)
+        new_topo.node_dict[new_node.node_id] = new_node
+    new_intf_dict = {}
+    for node in topo.node_list:
+        new_node = new_topo.node_dict[node.node_id]
+        for intf in node.intf_list:
+            new_intf = Interface()
+            new_intf.metric = intf.metric
+            new_intf.area = intf.area
+            new_intf.MRT_INELIGIBLE = intf.MRT_INELIGIBLE
+            new_intf.IGP_EXCLUDED = intf.IGP_EXCLUDED
+            new_intf.link_data = intf.link_data
+            new_intf.local_node = new_node
+            new_intf.remote_node = \
+                new_topo.node_dict[intf.remote_node.node_id]
+            new_node.intf_list.append(new_intf)
+            new_intf_dict[intf] = new_intf
+    for intf in new_intf_dict:
+        new_intf_dict[intf].remote_intf = new_intf_dict[intf.remote_intf]
+    if topo.test_gr != None:
+        new_topo.test_gr = new_topo.node_dict[topo.test_gr.node_id]
+    new_topo.alt_tie_break = topo.alt_tie_break
+    new_topo.alt_tie_break_seed = topo.alt_tie_break_seed
+    for node in topo.island_node_list_for_test_gr:
+        new_topo.island_node_list_for_test_gr.append(
+            new_topo.node_dict[node.node_id])
+    return new_topo
+
 # This function takes a file with links represented by 2-digit 
 # numbers in the format:
 # 01,05,10    
@@ -267,13 +404,18 @@ def Set_Island_Intf_and_Node_Lists(topo):
                 if intf.IN_MRT_ISLAND:
                     node.island_intf_list.append(intf)
 
-global_dfs_number = None
-
-def Lowpoint_Visit(x, parent, intf_p_to_x):
-    global global_dfs_number
-    x.dfs_number = global_dfs_number
+# Lowpoint_Visit() is a depth-first search that uses explicit 
+# stacks instead of recursion, so that the DFS depth is not limited 
+# by the Python recursion limit.  node_stack holds the current DFS 
+# path and intf_iter_stack holds, for each node on that path, an 
+# iterator over the interfaces that remain to be explored.  Nodes 
+# are visited, and lowpoint values are updated, in exactly the same 
+# order as the recursive form of the algorithm.
+def Lowpoint_Visit(topo, x, parent, intf_p_to_x):
+    dfs_number = topo.next_dfs_number
+    x.dfs_number = dfs_number
     x.lowpoint_number = x.dfs_number
-    global_dfs_number += 1
+    dfs_number += 1
     x.dfs_parent = parent
     if intf_p_to_x == None:
         x.dfs_parent_intf = None
@@ -282,41 +424,73 @@ def Lowpoint_Visit(x, parent, intf_p_to_x):
     x.lowpoint_parent = None
     if parent != None:
         parent.dfs_child_list.append(x)
-    for intf in x.island_intf_list:
-        if intf.remote_node.dfs_number == None:
-            Lowpoint_Visit(intf.remote_node, x, intf)
-            if intf.remote_node.lowpoint_number < x.lowpoint_number:
-                x.lowpoint_number = intf.remote_node.lowpoint_number
-                x.lowpoint_parent = intf.remote_node
-                x.lowpoint_parent_intf = intf
+    node_stack = [x]
+    intf_iter_stack = [iter(x.island_intf_list)]
+    while node_stack != []:
+        y = node_stack[-1]
+        for intf in intf_iter_stack[-1]:
+            z = intf.remote_node
+            if z.dfs_number == None:
+                # visit z as a DFS child of y
+                z.dfs_number = dfs_number
+                z.lowpoint_number = z.dfs_number
+                dfs_number += 1
+                z.dfs_parent = y
+                z.dfs_parent_intf = intf.remote_intf
+                z.lowpoint_parent = None
+                y.dfs_child_list.append(z)
+                node_stack.append(z)
+                intf_iter_stack.append(iter(z.island_intf_list))
+                break
+            if z is not y.dfs_parent:
+                if z.dfs_number < y.lowpoint_number:
+                    y.lowpoint_number = z.dfs_number
+                    y.lowpoint_parent = z
+                    y.lowpoint_parent_intf = intf
         else:
-            if intf.remote_node is not parent:
-                if intf.remote_node.dfs_number < x.lowpoint_number:
-                    x.lowpoint_number = intf.remote_node.dfs_number
-                    x.lowpoint_parent = intf.remote_node
-                    x.lowpoint_parent_intf = intf
+            # all interfaces of y have been explored, so return to 
+            # the DFS parent of y and update its lowpoint from y
+            node_stack.pop()
+            intf_iter_stack.pop()
+            if node_stack != []:
+                p = node_stack[-1]
+                if y.lowpoint_number < p.lowpoint_number:
+                    p.lowpoint_number = y.lowpoint_number
+                    p.lowpoint_parent = y
+                    p.lowpoint_parent_intf = y.dfs_parent_intf.remote_intf
+    topo.next_dfs_number = dfs_number
 
 def Run_Lowpoint(topo):
-    global global_dfs_number
-    global_dfs_number = 0
-    Lowpoint_Visit(topo.gadag_root, None, None)
-
-max_block_id = None
-
-def Assign_Block_ID(x, cur_block_id):    
-    global max_block_id
+    topo.next_dfs_number = 0
+    Lowpoint_Visit(topo, topo.gadag_root, None, None)
+
+# Assign_Block_ID() walks the DFS tree in pre-order using an explicit 
+# stack instead of recursion.  Each stack entry holds a node on the 
+# current path in the DFS tree and an iterator over its DFS children 
+# that remain to be visited.  New block IDs are allocated in the same 
+# order as in the recursive form of the algorithm.
+def Assign_Block_ID(topo, x, cur_block_id):    
+    block_id = topo.max_block_id
     x.block_id = cur_block_id
-    for c in x.dfs_child_list:
-        if (c.localroot is x):
-            max_block_id += 1
-            Assign_Block_ID(c, max_block_id)
+    stack = [(x, iter(x.dfs_child_list))]
+    while stack != []:
+        (y, child_iter) = stack[-1]
+        for c in child_iter:
+            if (c.localroot is y):
+                block_id += 1
+                c.block_id = block_id
+            else:
+                c.block_id = y.block_id
+            if c.dfs_child_list != []:
+                stack.append((c, iter(c.dfs_child_list)))
+                break
         else:
-            Assign_Block_ID(c, cur_block_id)
+            stack.pop()
+    topo.max_block_id = block_id
 
 def Run_Assign_Block_ID(topo):
-    global max_block_id
-    max_block_id = 0
-    Assign_Block_ID(topo.gadag_root, max_block_id)
+    topo.max_block_id = 0
+    Assign_Block_ID(topo, topo.gadag_root, topo.max_block_id)
             
 def Construct_Ear(x, stack, intf, ear_type):
     ear_list = []
@@ -453,6 +627,10 @@ def Revert_Block_Root_Incoming_Links(topo):
                         intf.INCOMING_STORED = False
                         intf.remote_intf.OUTGOING_STORED = False
 
+# Kahn's algorithm: a node is appended to working_list once all of its 
+# incoming links have been traversed.  Nodes get their topo_order in 
+# the order they leave working_list, which is a deque so that taking 
+# the first node is O(1) and the whole sort is O(N+E).
 def Run_Topological_Sort_GADAG(topo):
     Modify_Block_Root_Incoming_Links(topo)
     for node in topo.island_node_list:
@@ -460,22 +638,18 @@ def Run_Topological_Sort_GADAG(topo):
         for intf in node.island_intf_list:
             if (intf.INCOMING == True):
                 node.unvisited += 1
-    working_list = []
-    topo_order_list = []
+    working_list = collections.deque()
     working_list.append(topo.gadag_root)
-    while working_list != []:
-        y = working_list.pop(0)
-        topo_order_list.append(y)
+    next_topo_order = 1
+    while working_list:
+        y = working_list.popleft()
+        y.topo_order = next_topo_order
+        next_topo_order += 1
         for intf in y.island_intf_list:
             if ( intf.OUTGOING == True):
                 intf.remote_node.unvisited -= 1
                 if intf.remote_node.unvisited == 0:
                     working_list.append(intf.remote_node)
-    next_topo_order = 1
-    while topo_order_list != []:               
-        y = topo_order_list.pop(0)
-        y.topo_order = next_topo_order
-        next_topo_order += 1
     Revert_Block_Root_Incoming_Links(topo)
 
 def Set_Other_Undirected_Links_Based_On_Topo_Order(topo):
@@ -513,121 +687,247 @@ def In_Common_Block(x,y):
     return False
 
 def Copy_List_Items(target_list, source_list):
-    del target_list[:] # Python idiom to remove all elements of a list
-    for element in source_list:
-        target_list.append(element)
+    target_list[:] = source_list # replace the elements in place
 
 def Add_Item_To_List_If_New(target_list, item):
     if item not in target_list:
         target_list.append(item)
 
+# Appends the items of source_list that are not yet in target_list, 
+# keeping the order of both lists.  Looking the items up in a set of 
+# the target items makes merging k items into a list of k items O(k) 
+# instead of O(k^2).
+def Add_Items_To_List_If_New(target_list, source_list):
+    if len(source_list) == 1:
+        if source_list[0] not in target_list:
+            target_list.append(source_list[0])
+        return
+    target_set = set(target_list)
+    for item in source_list:
+        if item not in target_set:
+            target_set.add(item)
+            target_list.append(item)
+
+# During an SPF, the next-hops of a node y are interfaces of the SPF 
+# root.  y.next_hops keeps them in the order in which they were found,
+# and y.next_hops_bits has bit intf.link_data set for each of them.
+# With the bitset, adding a next-hop that is already present costs 
+# O(1), and merging next-hops from min_node that are all present 
+# already (the common case with ECMP) costs O(1) instead of O(k^2).
+def Set_Next_Hops_To_Root_Intf(y, intf):
+    y.next_hops = [intf]
+    y.next_hops_bits = 1 << intf.link_data
+
+def Copy_Next_Hops(y, x):
+    y.next_hops[:] = x.next_hops
+    y.next_hops_bits = x.next_hops_bits
+
+def Add_Root_Intf_To_Next_Hops_If_New(y, intf):
+    intf_bit = 1 << intf.link_data
+    if not y.next_hops_bits & intf_bit:
+        y.next_hops.append(intf)
+        y.next_hops_bits |= intf_bit
+
+def Add_Next_Hops_If_New(y, x):
+    new_bits = x.next_hops_bits & ~y.next_hops_bits
+    if new_bits:
+        for intf in x.next_hops:
+            if (new_bits >> intf.link_data) & 1:
+                y.next_hops.append(intf)
+        y.next_hops_bits |= new_bits
+
+# Each SPF stores the results for a node y with one of these functions 
+# when y is visited.
+def Store_Increasing_Results(y):
+    y.HIGHER = True
+    Copy_List_Items(y.blue_next_hops, y.next_hops)
+
+def Store_Decreasing_Results(y):
+    y.LOWER = True
+    Copy_List_Items(y.red_next_hops, y.next_hops)
+
+def Store_Normal_SPF_Results(y):
+    y.primary_spf_metric = y.spf_metric
+    Copy_List_Items(y.primary_next_hops, y.next_hops)
+
+def Store_MRT_Island_SPF_Results(y):
+    Copy_List_Items(y.mrt_island_next_hops, y.next_hops)
+
+def Store_Collapsed_SPF_Results(y):
+    y.collapsed_metric = y.spf_metric
+    Copy_List_Items(y.collapsed_next_hops, y.next_hops)
+
+STORE_RESULTS_FUNC_DICT = {
+    'INCREASING': Store_Increasing_Results,
+    'DECREASING': Store_Decreasing_Results,
+    'NORMAL_SPF': Store_Normal_SPF_Results,
+    'MRT_ISLAND_SPF': Store_MRT_Island_SPF_Results,
+    'COLLAPSED_SPF': Store_Collapsed_SPF_Results}
+
 def Store_Results(y, direction):
-    if direction == 'INCREASING':
-        y.HIGHER = True
-        Copy_List_Items(y.blue_next_hops, y.next_hops)
-    if direction == 'DECREASING':
-        y.LOWER = True
-        Copy_List_Items(y.red_next_hops, y.next_hops)
-    if direction == 'NORMAL_SPF':
-        y.primary_spf_metric = y.spf_metric
-        Copy_List_Items(y.primary_next_hops, y.next_hops)
-    if direction == 'MRT_ISLAND_SPF':
-        Copy_List_Items(y.mrt_island_next_hops, y.next_hops)
-    if direction == 'COLLAPSED_SPF':
-        y.collapsed_metric = y.spf_metric
-        Copy_List_Items(y.collapsed_next_hops, y.next_hops)
+    STORE_RESULTS_FUNC_DICT[direction](y)
                     
-# Note that the Python heapq fucntion allows for duplicate items, 
-# so we use the 'spf_visited' property to only consider a node 
-# as min_node the first time it gets removed from the heap.
-def SPF_No_Traverse_Block_Root(topo, spf_root, block_root, direction):
-    spf_heap = []
-    for y in topo.island_node_list:
-        y.spf_metric = 2147483647 # 2^31-1
+# SPF_Kernel() is the SPF shared by SPF_No_Traverse_Block_Root(), 
+# Normal_SPF() and Island_Marking_SPF().  It computes the spf_metric 
+# and next_hops of the nodes in node_list, from spf_root, where
+# - intf_list_func(min_node) returns the interfaces over which the 
+#   SPF may leave min_node (the edge filter of the SPF), or all of 
+#   min_node.intf_list if intf_list_func is None,
+# - store_func(min_node) stores the results for min_node when it is 
+#   visited, and returns True if the SPF can stop there, and
+# - path_func(y, min_node, is_shorter), unless it is None, is called 
+#   each time a shorter (is_shorter True) or an equal cost path to y 
+#   is found through min_node.
+# With with_next_hops False, next_hops are left empty, for SPFs that 
+# only need the metrics.  The callers set any other per-node values 
+# that their result functions need before calling SPF_Kernel().  
+# spf_name is the name under which Record_SPF_Counts() records the 
+# counts of the run.  Speeding up SPF_Kernel() speeds up every SPF.
+#
+# The nodes that have been reached but not yet visited are kept in a 
+# bucket queue, exactly once each.  Since metrics are integers, 
+# bucket_dict maps each metric value to the bucket of nodes with that 
+# spf_metric (a dict from node_id to node), and metric_heap holds the 
+# metric values that have a bucket.  Lowering the spf_metric of a node 
+# (decrease-key) moves it from the bucket of its old metric to that of 
+# its new one, instead of pushing a duplicate heap entry that would 
+# have to be skipped when popped.  The bucket with the lowest metric 
+# is turned into current_heap, a heap of (node_id, node) tuples, so 
+# that nodes are visited in the same (spf_metric, node_id) order as 
+# with a heap of (spf_metric, node_id, node) tuples.  A node reached 
+# over a link with metric 0 goes straight into current_heap.
+
+# Returns the metric and the heap of the next bucket that is not 
+# empty, or (None, []) if there is none.
+def Pop_SPF_Bucket(metric_heap, bucket_dict):
+    while metric_heap != []:
+        metric = heapq.heappop(metric_heap)
+        bucket_heap = bucket_dict.pop(metric).items()
+        if bucket_heap != []:
+            heapq.heapify(bucket_heap)
+            return (metric, bucket_heap)
+    return (None, [])
+
+def SPF_Kernel(spf_name, spf_root, node_list, intf_list_func, store_func,
+               path_func, with_next_hops=True):
+    for y in node_list:
+        y.spf_metric = 2147483647 # 2^31-1 as max metric
         y.next_hops = []
-        y.spf_visited = False
+        y.next_hops_bits = 0
     spf_root.spf_metric = 0
-    heapq.heappush(spf_heap,
-                   (spf_root.spf_metric, spf_root.node_id,  spf_root) )
-    while spf_heap != []:
-        #extract third element of tuple popped from heap
-        min_node = heapq.heappop(spf_heap)[2]
-        if min_node.spf_visited:
-            continue
-        min_node.spf_visited = True 
-        Store_Results(min_node, direction)
-        if ( (min_node is spf_root) or (min_node is not block_root) ):
-            for intf in min_node.island_intf_list:
-                if ( ( (direction == 'INCREASING' and intf.OUTGOING )
-                    or (direction == 'DECREASING' and intf.INCOMING ) )
-                    and In_Common_Block(spf_root, intf.remote_node) ) :
-                    path_metric = min_node.spf_metric + intf.metric
-                    if path_metric < intf.remote_node.spf_metric:
-                        intf.remote_node.spf_metric = path_metric
-                        if min_node is spf_root:
-                            intf.remote_node.next_hops = [intf]
-                        else:
-                            Copy_List_Items(intf.remote_node.next_hops,
-                                            min_node.next_hops)
-                        heapq.heappush(spf_heap,
-                                       ( intf.remote_node.spf_metric,
-                                         intf.remote_node.node_id,
-                                         intf.remote_node ) )
-                    elif path_metric == intf.remote_node.spf_metric:
-                        if min_node is spf_root:
-                            Add_Item_To_List_If_New(
-                                intf.remote_node.next_hops,intf)
-                        else:
-                            for nh_intf in min_node.next_hops:
-                                Add_Item_To_List_If_New(
-                                    intf.remote_node.next_hops,nh_intf)
+    metric_heap = []
+    bucket_dict = {}
+    current_metric = 0
+    current_heap = [(spf_root.node_id, spf_root)]
+    # see Record_SPF_Counts()
+    insert_count = 1
+    decrease_key_count = 0
+    ecmp_merge_count = 0
+    while True:
+        if current_heap == []:
+            (current_metric, current_heap) = Pop_SPF_Bucket(metric_heap,
+                                                            bucket_dict)
+            if current_heap == []:
+                break
+        min_node = heapq.heappop(current_heap)[1]
+        if store_func(min_node):
+            break
+        if intf_list_func == None:
+            intf_list = min_node.intf_list
+        else:
+            intf_list = intf_list_func(min_node)
+        from_root = min_node is spf_root
+        for intf in intf_list:
+            y = intf.remote_node
+            path_metric = min_node.spf_metric + intf.metric
+            old_metric = y.spf_metric
+            if path_metric < old_metric:
+                y.spf_metric = path_metric
+                if with_next_hops:
+                    if from_root:
+                        Set_Next_Hops_To_Root_Intf(y, intf)
+                    else:
+                        Copy_Next_Hops(y, min_node)
+                if path_func != None:
+                    path_func(y, min_node, True)
+                if old_metric == 2147483647:
+                    insert_count += 1
+                else:
+                    decrease_key_count += 1
+                    del bucket_dict[old_metric][y.node_id]
+                if path_metric == current_metric:
+                    heapq.heappush(current_heap, (y.node_id, y))
+                elif path_metric in bucket_dict:
+                    bucket_dict[path_metric][y.node_id] = y
+                else:
+                    bucket_dict[path_metric] = {y.node_id: y}
+                    heapq.heappush(metric_heap, path_metric)
+            elif path_metric == old_metric:
+                ecmp_merge_count += 1
+                if with_next_hops:
+                    if from_root:
+                        Add_Root_Intf_To_Next_Hops_If_New(y, intf)
+                    else:
+                        Add_Next_Hops_If_New(y, min_node)
+                if path_func != None:
+                    path_func(y, min_node, False)
+    if instrumentation_stats != None:
+        Record_SPF_Counts(spf_name, insert_count, decrease_key_count,
+                          ecmp_merge_count)
+
+# The edge filter of SPF_No_Traverse_Block_Root(): the GADAG links 
+# in direction that stay in a block of spf_root (as In_Common_Block() 
+# checks), and none out of block_root unless it is spf_root.
+def Block_SPF_Intf_List_Func(spf_root, block_root, direction):
+    root_block_id = spf_root.block_id
+    root_localroot = spf_root.localroot
+    def Outgoing_Intf_List(min_node):
+        if min_node is block_root and min_node is not spf_root:
+            return []
+        return [intf for intf in min_node.island_intf_list
+                if intf.OUTGOING
+                and (intf.remote_node.block_id == root_block_id
+                     or intf.remote_node.localroot is spf_root
+                     or intf.remote_node is root_localroot)]
+    def Incoming_Intf_List(min_node):
+        if min_node is block_root and min_node is not spf_root:
+            return []
+        return [intf for intf in min_node.island_intf_list
+                if intf.INCOMING
+                and (intf.remote_node.block_id == root_block_id
+                     or intf.remote_node.localroot is spf_root
+                     or intf.remote_node is root_localroot)]
+    if direction == 'INCREASING':
+        return Outgoing_Intf_List
+    return Incoming_Intf_List
+
+def SPF_No_Traverse_Block_Root(topo, spf_root, block_root, direction):
+    SPF_Kernel('SPF_No_Traverse_Block_Root', spf_root,
+               topo.island_node_list,
+               Block_SPF_Intf_List_Func(spf_root, block_root, direction),
+               STORE_RESULTS_FUNC_DICT[direction], None)
                     
 def Normal_SPF(topo, spf_root):
-    spf_heap = []
     for y in topo.node_list:
-        y.spf_metric = 2147483647 # 2^31-1 as max metric 
-        y.next_hops = []
         y.primary_spf_metric = 2147483647
         y.primary_next_hops = []
-        y.spf_visited = False
-    spf_root.spf_metric = 0
-    heapq.heappush(spf_heap,
-                   (spf_root.spf_metric,spf_root.node_id,spf_root) )
-    while spf_heap != []:
-        #extract third element of tuple popped from heap
-        min_node = heapq.heappop(spf_heap)[2] 
-        if min_node.spf_visited:
-            continue
-        min_node.spf_visited = True 
-        Store_Results(min_node, 'NORMAL_SPF')
-        for intf in min_node.intf_list:
-            path_metric = min_node.spf_metric + intf.metric
-            if path_metric < intf.remote_node.spf_metric:
-                intf.remote_node.spf_metric = path_metric
-                if min_node is spf_root:
-                    intf.remote_node.next_hops = [intf]
-                else:
-                    Copy_List_Items(intf.remote_node.next_hops,
-                                    min_node.next_hops)
-                heapq.heappush(spf_heap,
-                               ( intf.remote_node.spf_metric,
-                                 intf.remote_node.node_id,
-                                 intf.remote_node ) )
-            elif path_metric == intf.remote_node.spf_metric:
-                if min_node is spf_root:
-                    Add_Item_To_List_If_New(
-                        intf.remote_node.next_hops,intf)
-                else:
-                    for nh_intf in min_node.next_hops:
-                        Add_Item_To_List_If_New(
-                            intf.remote_node.next_hops,nh_intf)
-
+    SPF_Kernel('Normal_SPF', spf_root, topo.node_list, None,
+               Store_Normal_SPF_Results, None)
+
+# Set_Edge() follows the chain of local roots up from y until it 
+# finds a node x whose MRT next-hops are already set.  Each node on 
+# the chain below x would inherit the next-hops and order_proxy of its 
+# own local root, so they all end up with those of x.  Walking the 
+# chain twice avoids the recursion of the original form.
 def Set_Edge(y): 
-    if (y.blue_next_hops == [] and y.red_next_hops == []):
-        Set_Edge(y.localroot)
-        Copy_List_Items(y.blue_next_hops,y.localroot.blue_next_hops)
-        Copy_List_Items(y.red_next_hops ,y.localroot.red_next_hops)
-        y.order_proxy = y.localroot.order_proxy
+    x = y
+    while (x.blue_next_hops == [] and x.red_next_hops == []):
+        x = x.localroot
+    while y is not x:
+        Copy_List_Items(y.blue_next_hops,x.blue_next_hops)
+        Copy_List_Items(y.red_next_hops ,x.red_next_hops)
+        y.order_proxy = x.order_proxy
+        y = y.localroot
 
 def Compute_MRT_NH_For_One_Src_To_Island_Dests(topo,x):
     for y in topo.island_node_list:
@@ -695,29 +995,27 @@ def Store_Primary_NHs_For_One_Source_To_Nodes(topo,x):
         x.pnh_dict[y.node_id] = []
         Copy_List_Items(x.pnh_dict[y.node_id], y.primary_next_hops)
        
+# The results for a named proxy node are stored for each prefix in its 
+# class, in the order of topo.prefix_class_dict.  The prefixes of a 
+# class share the lists of P, which is not changed after this.
 def Store_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,x):
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
-        x.blue_next_hops_dict[P.node_id] = []
-        x.red_next_hops_dict[P.node_id] = []
-        Copy_List_Items(x.blue_next_hops_dict[P.node_id],
-                        P.blue_next_hops)
-        Copy_List_Items(x.red_next_hops_dict[P.node_id],
-                        P.red_next_hops)
+    for prefix in topo.prefix_class_dict:
+        P = topo.named_proxy_dict[topo.prefix_class_dict[prefix]]
+        x.blue_next_hops_dict[prefix] = P.blue_next_hops
+        x.red_next_hops_dict[prefix] = P.red_next_hops
         
 def Store_Alts_For_One_Src_To_Named_Proxy_Nodes(topo,x):
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
-        x.alt_dict[P.node_id] = []
-        Copy_List_Items(x.alt_dict[P.node_id],
-                        P.alt_list)               
+    for prefix in topo.prefix_class_dict:
+        P = topo.named_proxy_dict[topo.prefix_class_dict[prefix]]
+        if prefix in P.alt_dict:
+            x.alt_dict[prefix] = P.alt_dict[prefix]
+        else:
+            x.alt_dict[prefix] = P.alt_list
        
 def Store_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,x):
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
-        x.pnh_dict[P.node_id] = []
-        Copy_List_Items(x.pnh_dict[P.node_id],
-                        P.primary_next_hops)
+    for prefix in topo.prefix_class_dict:
+        P = topo.named_proxy_dict[topo.prefix_class_dict[prefix]]
+        x.pnh_dict[prefix] = P.primary_next_hops
 
 def Select_Alternates_Internal(D, F, primary_intf,
                                D_lower, D_higher, D_topo_order):
@@ -809,6 +1107,53 @@ def Is_Remote_Node_In_NH_List(node, intf_list):
             return True
     return False
 
+# An alternate may use either MRT when both avoid the failure 
+# (USE_RED_OR_BLUE), or when a link-protecting alternate has no 
+# reason to prefer one of them.  Choose_Red_Or_Blue() returns 'RED' 
+# or 'BLUE' for such an alternate of src to dest_node_id, for the 
+# failure of failed_intf, according to topo.alt_tie_break:
+#   'HASH'    - a hash of topo.alt_tie_break_seed, src, dest_node_id 
+#               and failed_intf, so the choice is the same in every 
+#               run, whichever sources are computed and in which order
+#   'BALANCE' - the MRT used by fewer of the alternates selected so 
+#               far for src, with 'HASH' breaking ties
+#   'RANDOM'  - a random choice, so that results differ between runs,
+#               and Run_MRT_for_All_Sources_Parallel() and 
+#               Topology.update_link() cannot reproduce the results 
+#               of Run_MRT_for_All_Sources()
+# Changing topo.alt_tie_break_seed gives a different, but still 
+# deterministic, set of 'HASH' choices.
+def Tie_Break_Hash(topo, src, dest_node_id, failed_intf):
+    h = (2166136261 ^ topo.alt_tie_break_seed) & 0xffffffff
+    for value in (src.node_id, dest_node_id, 
+                  failed_intf.local_node.node_id, failed_intf.link_data):
+        h = ((h ^ (value & 0xffffffff)) * 16777619) & 0xffffffff
+    # final mixing, so that every input bit affects the low bit
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h
+
+def Choose_Red_Or_Blue(topo, src, dest_node_id, failed_intf):
+    if topo.alt_tie_break == 'RANDOM':
+        return random.choice(['RED','BLUE'])
+    if topo.alt_tie_break == 'BALANCE':
+        if topo.red_alt_count < topo.blue_alt_count:
+            return 'RED'
+        if topo.blue_alt_count < topo.red_alt_count:
+            return 'BLUE'
+    if Tie_Break_Hash(topo, src, dest_node_id, failed_intf) & 1:
+        return 'RED'
+    return 'BLUE'
+
+def Count_Alternate_MRT(topo, alt):
+    if alt.fec == 'RED':
+        topo.red_alt_count += 1
+    elif alt.fec == 'BLUE':
+        topo.blue_alt_count += 1
+
 def Select_Alts_For_One_Src_To_Island_Dests(topo,x):
     Normal_SPF(topo, x)
     for D in topo.island_node_list:
@@ -823,7 +1168,9 @@ def Select_Alts_For_One_Src_To_Island_Dests(topo,x):
             #We need to test if F is in the island, as opposed
             #to just testing if failed_intf is in island_intf_list,
             #because failed_intf could be marked as MRT_INELIGIBLE.
-            if F in topo.island_node_list:
+            #F.IN_MRT_ISLAND is set exactly for the nodes in 
+            #topo.island_node_list, and is an O(1) test.
+            if F.IN_MRT_ISLAND:
                 alt.info = Select_Alternates(D, F, failed_intf)
             else:
                 #The primary next-hop is not in the MRT Island. 
@@ -833,7 +1180,8 @@ def Select_Alts_For_One_Src_To_Island_Dests(topo,x):
                 alt.info = 'USE_RED_OR_BLUE'
                 
             if (alt.info == 'USE_RED_OR_BLUE'):
-                alt.red_or_blue = random.choice(['USE_RED','USE_BLUE'])
+                alt.red_or_blue = 'USE_' + \
+                    Choose_Red_Or_Blue(topo, x, D.node_id, failed_intf)
             if (alt.info == 'USE_BLUE'
                 or alt.red_or_blue == 'USE_BLUE'):
                 Copy_List_Items(alt.nh_list, D.blue_next_hops)
@@ -882,9 +1230,11 @@ def Select_Alts_For_One_Src_To_Island_Dests(topo,x):
                     alt.fec = 'RED'
                     alt.prot = 'LINK_PROTECTION'                    
                 else:
-                    alt.fec = random.choice(['RED','BLUE'])
+                    alt.fec = Choose_Red_Or_Blue(topo, x, D.node_id,
+                                                 failed_intf)
                     alt.prot = 'LINK_PROTECTION' 
                     
+            Count_Alternate_MRT(topo, alt)
             D.alt_list.append(alt)
 
 def Write_GADAG_To_File(topo, file_prefix):
@@ -906,68 +1256,97 @@ def Write_GADAG_To_File(topo, file_prefix):
         for edge_string in gadag_edge_list:
             gadag_file.write(edge_string);
 
+# The _to_all.csv files hold one row for each next-hop of each source
+# to each destination, so there are far too many rows to build and
+# sort all of them in memory for a large topology.  The rows are
+# instead written one (dest, source) group at a time, in the same
+# order that sorting all of the row strings would give.  Rows start
+# with gadag_root and dest, and the next field is always an interface
+# of the source itself.  Node ids are written as "%04d" strings
+# followed by a ',', so sorting dests and sources on that string
+# (Node_Id_Sort_Key) and then sorting the few rows within a group
+# puts every row where the full sort would have put it.
+def Node_Id_Sort_Key(node_id):
+    return "%04d," % node_id
+
+def Write_Rows_By_Dest_And_Source(out_file, src_list, get_result_dict,
+                                  get_row_list):
+    dest_node_id_set = set()
+    for src in src_list:
+        dest_node_id_set.update(get_result_dict(src))
+    src_list = sorted(src_list, key=lambda x: Node_Id_Sort_Key(x.node_id))
+    for dest_node_id in sorted(dest_node_id_set, key=Node_Id_Sort_Key):
+        for src in src_list:
+            result_dict = get_result_dict(src)
+            if dest_node_id in result_dict:
+                row_list = get_row_list(dest_node_id, 
+                                        result_dict[dest_node_id])
+                row_list.sort()
+                out_file.writelines(row_list)
+
+def MRT_Row_List(topo, dest_node_id, next_hop_list):
+    row_list = []
+    for intf in next_hop_list:
+        gadag_root =  "%04d" % (topo.gadag_root.node_id)
+        dest_node =  "%04d" % (dest_node_id)
+        local_node =  "%04d" % (intf.local_node.node_id)
+        remote_node = "%04d" % (intf.remote_node.node_id)
+        intf_data = "%03d" % (intf.link_data)
+        edge_string=(gadag_root+','+dest_node+','+local_node+
+                       ','+remote_node+','+intf_data+'\n')
+        row_list.append(edge_string)
+    return row_list
+
 def Write_MRTs_For_All_Dests_To_File(topo, color, file_prefix):
-    edge_list = []
-    for node in topo.island_node_list_for_test_gr:
-        if color == 'blue':
-            node_next_hops_dict = node.blue_next_hops_dict
-        elif color == 'red':
-            node_next_hops_dict = node.red_next_hops_dict
-        for dest_node_id in node_next_hops_dict:
-            for intf in node_next_hops_dict[dest_node_id]:
-                gadag_root =  "%04d" % (topo.gadag_root.node_id)
-                dest_node =  "%04d" % (dest_node_id)
-                local_node =  "%04d" % (intf.local_node.node_id)
-                remote_node = "%04d" % (intf.remote_node.node_id)
-                intf_data = "%03d" % (intf.link_data)
-                edge_string=(gadag_root+','+dest_node+','+local_node+
-                               ','+remote_node+','+intf_data+'\n')
-                edge_list.append(edge_string)
-    edge_list.sort()
+    if color == 'blue':
+        get_next_hops_dict = lambda node: node.blue_next_hops_dict
+    elif color == 'red':
+        get_next_hops_dict = lambda node: node.red_next_hops_dict
     filename = file_prefix + '_' + color + '_to_all.csv'
     with open(filename, 'w') as mrt_file:
         mrt_file.write('gadag_root,dest,'\
             'local_node,remote_node,link_data\n')
-        for edge_string in edge_list:
-            mrt_file.write(edge_string);
+        Write_Rows_By_Dest_And_Source(mrt_file, 
+            topo.island_node_list_for_test_gr, get_next_hops_dict, 
+            lambda dest_node_id, next_hop_list: 
+                MRT_Row_List(topo, dest_node_id, next_hop_list))
             
 def Write_Both_MRTs_For_All_Dests_To_File(topo, file_prefix):            
     Write_MRTs_For_All_Dests_To_File(topo, 'blue', file_prefix)
     Write_MRTs_For_All_Dests_To_File(topo, 'red', file_prefix)    
 
+def Alternate_Row_List(topo, dest_node_id, alt_list):
+    row_list = []
+    for alt in alt_list:
+        for alt_intf in alt.nh_list:
+            gadag_root =  "%04d" % (topo.gadag_root.node_id)
+            dest_node =  "%04d" % (dest_node_id)
+            prim_local_node =  \
+                "%04d" % (alt.failed_intf.local_node.node_id)
+            prim_remote_node = \
+                "%04d" % (alt.failed_intf.remote_node.node_id)
+            prim_intf_data = \
+                "%03d" % (alt.failed_intf.link_data)
+            if alt_intf == None:
+                alt_local_node = "None"
+                alt_remote_node = "None"
+                alt_intf_data = "None"
+            else:
+                alt_local_node = \
+                    "%04d" % (alt_intf.local_node.node_id)
+                alt_remote_node = \
+                    "%04d" % (alt_intf.remote_node.node_id)
+                alt_intf_data = \
+                    "%03d" % (alt_intf.link_data)
+            edge_string = (gadag_root+','+dest_node+','+
+                prim_local_node+','+prim_remote_node+','+
+                prim_intf_data+','+alt_local_node+','+
+                alt_remote_node+','+alt_intf_data+','+
+                alt.fec +'\n')
+            row_list.append(edge_string)
+    return row_list
+
 def Write_Alternates_For_All_Dests_To_File(topo, file_prefix):
-    edge_list = []
-    for x in topo.island_node_list_for_test_gr:
-        for dest_node_id in x.alt_dict:
-            alt_list = x.alt_dict[dest_node_id]
-            for alt in alt_list:
-                for alt_intf in alt.nh_list:
-                    gadag_root =  "%04d" % (topo.gadag_root.node_id)
-                    dest_node =  "%04d" % (dest_node_id)
-                    prim_local_node =  \
-                        "%04d" % (alt.failed_intf.local_node.node_id)
-                    prim_remote_node = \
-                        "%04d" % (alt.failed_intf.remote_node.node_id)
-                    prim_intf_data = \
-                        "%03d" % (alt.failed_intf.link_data)
-                    if alt_intf == None:
-                        alt_local_node = "None"
-                        alt_remote_node = "None"
-                        alt_intf_data = "None"
-                    else:
-                        alt_local_node = \
-                            "%04d" % (alt_intf.local_node.node_id)
-                        alt_remote_node = \
-                            "%04d" % (alt_intf.remote_node.node_id)
-                        alt_intf_data = \
-                            "%03d" % (alt_intf.link_data)
-                    edge_string = (gadag_root+','+dest_node+','+
-                        prim_local_node+','+prim_remote_node+','+
-                        prim_intf_data+','+alt_local_node+','+
-                        alt_remote_node+','+alt_intf_data+','+
-                        alt.fec +'\n')
-                    edge_list.append(edge_string)
-    edge_list.sort()
     filename = file_prefix + '_alts_to_all.csv'
     with open(filename, 'w') as alt_file:
         alt_file.write('gadag_root,dest,'\
@@ -975,8 +1354,10 @@ def Write_Alternates_For_All_Dests_To_File(topo, file_prefix):
             'prim_nh.link_data,alt_nh.local_node,'\
             'alt_nh.remote_node,alt_nh.link_data,'\
             'alt_nh.fec\n')
-        for edge_string in edge_list:
-            alt_file.write(edge_string);
+        Write_Rows_By_Dest_And_Source(alt_file, 
+            topo.island_node_list_for_test_gr, lambda x: x.alt_dict,
+            lambda dest_node_id, alt_list: 
+                Alternate_Row_List(topo, dest_node_id, alt_list))
 
 def Raise_GADAG_Root_Selection_Priority(topo,node_id):
     node = topo.node_dict[node_id]
@@ -1025,13 +1406,66 @@ def Add_Prefix_Advertisements_From_File(topo, filename):
             advertising_node = topo.node_dict[prefix_node_id]
             advertising_node.prefix_cost_dict[prefix_id] = prefix_cost
         
+# The prefix that Add_Prefixes_for_Non_Island_Nodes() gives a node 
+# outside the MRT Island is node_id + 1000.  The results for a node and 
+# for a prefix are kept under the same ids (in pnh_dict, 
+# blue_next_hops_dict, alt_dict, ...), so for node ids of 1000 and 
+# above that prefix id may be the id of another node or of an 
+# advertised prefix, and their results would be merged.  Raise 
+# ValueError rather than merge them.
+def Non_Island_Prefix_Id(topo, node, prefix_id_set):
+    prefix_id = node.node_id + 1000
+    if prefix_id in topo.node_dict or prefix_id in prefix_id_set:
+        raise ValueError('prefix id ' + str(prefix_id) + ' for node ' +
+                         str(node.node_id) + ' outside the MRT Island ' +
+                         'is already a node id or a prefix id')
+    return prefix_id
+
+def Advertised_Prefix_Id_Set(topo):
+    prefix_id_set = set()
+    for node in topo.node_list:
+        prefix_id_set.update(node.prefix_cost_dict)
+    return prefix_id_set
+
 def Add_Prefixes_for_Non_Island_Nodes(topo):
+    prefix_id_set = Advertised_Prefix_Id_Set(topo)
+    prefix_list = []
     for node in topo.node_list:
         if node.IN_MRT_ISLAND:
             continue
-        prefix_id = node.node_id + 1000
+        prefix_id = Non_Island_Prefix_Id(topo, node, prefix_id_set)
+        prefix_list.append((node, prefix_id))
+    for (node, prefix_id) in prefix_list:
         node.prefix_cost_dict[prefix_id] = 0
 
+# Used by Update_Link() when a link change has changed the test_gr 
+# island: nodes that have left the island get the prefix of 
+# Add_Prefixes_for_Non_Island_Nodes(), and nodes that have joined it 
+# lose theirs.  Returns True if any prefix was added or removed.
+def Update_Prefixes_for_Non_Island_Nodes(topo, old_island_node_list):
+    old_island_node_set = set(old_island_node_list)
+    changed_node_list = []
+    for node in topo.node_list:
+        if node.IN_MRT_ISLAND != (node in old_island_node_set):
+            changed_node_list.append(node)
+    if changed_node_list == []:
+        return False
+    prefix_id_set = Advertised_Prefix_Id_Set(topo)
+    prefix_list = []
+    for node in changed_node_list:
+        if node.IN_MRT_ISLAND:
+            prefix_list.append((node, node.node_id + 1000))
+        else:
+            prefix_list.append((node, Non_Island_Prefix_Id(
+                topo, node, prefix_id_set)))
+    for (node, prefix_id) in prefix_list:
+        if node.IN_MRT_ISLAND:
+            if prefix_id in node.prefix_cost_dict:
+                del node.prefix_cost_dict[prefix_id]
+        else:
+            node.prefix_cost_dict[prefix_id] = 0
+    return True
+
 def Add_Profile_IDs_from_File(topo, filename):
     profile_filename = filename + '.profile'
     for node in topo.node_list:
@@ -1051,71 +1485,75 @@ def Add_Profile_IDs_from_File(topo, filename):
         for node in topo.node_list:
             node.profile_id_list = [0]
 
-def Island_Marking_SPF(topo,spf_root):
-    spf_root.isl_marking_spf_dict = {}
+# PATH_HITS_ISLAND is set for y if y is in the MRT Island, or if one 
+# of the shortest paths to y goes through a node where it is set.
+def Mark_Path_Hits_Island(y, min_node, is_shorter):
+    if y.IN_MRT_ISLAND:
+        y.PATH_HITS_ISLAND = True
+    elif is_shorter:
+        y.PATH_HITS_ISLAND = min_node.PATH_HITS_ISLAND
+    elif min_node.PATH_HITS_ISLAND:
+        y.PATH_HITS_ISLAND = True
+
+# Island_Marking_SPF() only stores the results for the nodes in 
+# dest_node_set, and stops once it has visited all of them.
+def Island_Marking_SPF(topo,spf_root,dest_node_set):
+    isl_marking_spf_dict = {}
+    spf_root.isl_marking_spf_dict = isl_marking_spf_dict
     for y in topo.node_list:
-        y.spf_metric = 2147483647 # 2^31-1 as max metric
         y.PATH_HITS_ISLAND = False
-        y.next_hops = []
-        y.spf_visited = False
-    spf_root.spf_metric = 0
-    spf_heap = []
-    heapq.heappush(spf_heap,
-                   (spf_root.spf_metric,spf_root.node_id,spf_root) )        
-    while spf_heap != []:
-        #extract third element of tuple popped from heap
-        min_node = heapq.heappop(spf_heap)[2] 
-        if min_node.spf_visited:
-            continue
-        min_node.spf_visited = True
-        spf_root.isl_marking_spf_dict[min_node.node_id] = \
-            (min_node.spf_metric, min_node.PATH_HITS_ISLAND)
-        for intf in min_node.intf_list:
-            path_metric = min_node.spf_metric + intf.metric
-            if path_metric < intf.remote_node.spf_metric:
-                intf.remote_node.spf_metric = path_metric
-                if min_node is spf_root:
-                    intf.remote_node.next_hops = [intf]
-                else:
-                    Copy_List_Items(intf.remote_node.next_hops,
-                                    min_node.next_hops)
-                if (intf.remote_node.IN_MRT_ISLAND):
-                    intf.remote_node.PATH_HITS_ISLAND = True
-                else:
-                    intf.remote_node.PATH_HITS_ISLAND = \
-                        min_node.PATH_HITS_ISLAND
-                heapq.heappush(spf_heap,
-                               ( intf.remote_node.spf_metric,
-                                 intf.remote_node.node_id,
-                                 intf.remote_node ) )
-            elif path_metric == intf.remote_node.spf_metric:
-                if min_node is spf_root:
-                    Add_Item_To_List_If_New(
-                        intf.remote_node.next_hops,intf)
-                else:
-                    for nh_intf in min_node.next_hops:
-                        Add_Item_To_List_If_New(
-                            intf.remote_node.next_hops,nh_intf)
-                if (intf.remote_node.IN_MRT_ISLAND):
-                    intf.remote_node.PATH_HITS_ISLAND = True
-                else:
-                    if (intf.remote_node.PATH_HITS_ISLAND 
-                        or min_node.PATH_HITS_ISLAND):
-                        intf.remote_node.PATH_HITS_ISLAND = True
-
-
+    unvisited_dest_set = set(dest_node_set)
+    def Store_Island_Marking_Results(y):
+        if y in unvisited_dest_set:
+            isl_marking_spf_dict[y.node_id] = (y.spf_metric, 
+                                               y.PATH_HITS_ISLAND)
+            unvisited_dest_set.remove(y)
+            return unvisited_dest_set == set()
+        return False
+    SPF_Kernel('Island_Marking_SPF', spf_root, topo.node_list,
+               None, Store_Island_Marking_Results,
+               Mark_Path_Hits_Island, False)
+
+
+# Prefixes advertised by the same nodes with the same costs are in 
+# the same equivalence class, which has a single named proxy node.  
+# The LFINs, PNARs, next-hops and alternates of that named proxy node 
+# are computed once for the class, and are stored for each prefix in 
+# P.prefix_list by the Store functions.  The lowest prefix in a class 
+# is its class id, the node_id of P, and the key of P in 
+# topo.named_proxy_dict.  topo.prefix_class_dict maps each prefix to 
+# its class id.  node_prefix_cost_list is in node_list order for 
+# every prefix, so it identifies the class as it is.
 def Create_Basic_Named_Proxy_Nodes(topo):
+    prefix_class_dict = {}
     for node in topo.node_list:
         for prefix in node.prefix_cost_dict:
             prefix_cost = node.prefix_cost_dict[prefix]
-            if prefix in topo.named_proxy_dict:
-                P = topo.named_proxy_dict[prefix]
-                P.node_prefix_cost_list.append((node,prefix_cost))
+            if prefix in prefix_class_dict:
+                prefix_class_dict[prefix].append((node,prefix_cost))
             else:
-                P = Named_Proxy_Node()
-                topo.named_proxy_dict[prefix] = P
+                prefix_class_dict[prefix] = [(node,prefix_cost)]
+    adv_class_dict = {}
+    for prefix in prefix_class_dict:
+        adv_key = tuple(prefix_class_dict[prefix])
+        if adv_key in adv_class_dict:
+            P = adv_class_dict[adv_key]
+            P.prefix_list.append(prefix)
+            if prefix < P.node_id:
                 P.node_id = prefix
-                P.node_prefix_cost_list = [(node,prefix_cost)]
+        else:
+            P = Named_Proxy_Node()
+            adv_class_dict[adv_key] = P
+            P.node_id = prefix
+            P.prefix_list = [prefix]
+            P.node_prefix_cost_list = prefix_class_dict[prefix]
+        # replacing the values keeps the order of the prefixes
+        prefix_class_dict[prefix] = P
+    for P in adv_class_dict.values():
+        topo.named_proxy_dict[P.node_id] = P
+    for prefix in prefix_class_dict:
+        prefix_class_dict[prefix] = prefix_class_dict[prefix].node_id
+    topo.prefix_class_dict = prefix_class_dict
 
 def Compute_Loop_Free_Island_Neighbors_For_Each_Prefix(topo):
     topo.island_nbr_set = set()
@@ -1128,11 +1566,21 @@ def Compute_Loop_Free_Island_Neighbors_For_Each_Prefix(topo):
                 topo.island_nbr_set.add(node)
                 topo.island_border_set.add(intf.remote_node)
                 
-    for island_nbr in topo.island_nbr_set:
-        Island_Marking_SPF(topo,island_nbr)
+    # The island marking SPFs do not depend on the source, so their 
+    # results are kept until the island or the advertising nodes 
+    # change, or Update_Link() changes a metric.
+    dest_node_set = set()
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
+        for (adv_node, prefix_cost) in P.node_prefix_cost_list:
+            dest_node_set.add(adv_node)
+    if topo.island_marking_dest_set != dest_node_set:
+        for island_nbr in topo.island_nbr_set:
+            Island_Marking_SPF(topo,island_nbr,dest_node_set)
+        topo.island_marking_dest_set = dest_node_set
           
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
         P.lfin_list = []
         for island_nbr in topo.island_nbr_set:
             min_isl_nbr_to_pref_cost = 2147483647
@@ -1150,13 +1598,16 @@ def Compute_Loop_Free_Island_Neighbors_For_Each_Prefix(topo):
                 P.lfin_list.append( (island_nbr, 
                                      min_isl_nbr_to_pref_cost) )
 
-
+# For each LFIN of a prefix, only the IBRs adjacent to that LFIN can 
+# pair with it, so lfin_ibr_dict indexes those IBRs by LFIN.  The 
+# LFINs are visited in lfin_list order, so each IBR keeps the first 
+# LFIN with the lowest cost, as it would by scanning lfin_list.  
+# P.ibr_lfin_pair_list holds the IBRs that have an LFIN for P.
 def Compute_Island_Border_Router_LFIN_Pairs_For_Each_Prefix(topo):
+    lfin_ibr_dict = {}
     for ibr in topo.island_border_set:
-        ibr.prefix_lfin_dict = {}
         ibr.min_intf_metric_dict = {}
         ibr.min_intf_list_dict = {}
-        ibr.min_intf_list_dict[None] = None
         for intf in ibr.intf_list:
             if not intf.remote_node in topo.island_nbr_set:
                 continue
@@ -1174,23 +1625,32 @@ def Compute_Island_Border_Router_LFIN_Pairs_For_Each_Prefix(topo):
                       < ibr.min_intf_metric_dict[intf.remote_node]):
                     ibr.min_intf_list_dict[intf.remote_node].\
                         append(intf)
+        for lfin in ibr.min_intf_metric_dict:
+            if lfin in lfin_ibr_dict:
+                lfin_ibr_dict[lfin].append(ibr)
+            else:
+                lfin_ibr_dict[lfin] = [ibr]
     
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
-        for ibr in topo.island_border_set:
-            min_ibr_lfin_pref_cost = 2147483647
-            min_lfin = None
-            for (lfin, lfin_to_pref_cost) in P.lfin_list:
-                if not lfin in ibr.min_intf_metric_dict:
-                    continue
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
+        ibr_lfin_dict = {}
+        for (lfin, lfin_to_pref_cost) in P.lfin_list:
+            if not lfin in lfin_ibr_dict:
+                continue
+            for ibr in lfin_ibr_dict[lfin]:
                 ibr_lfin_pref_cost = \
                     ibr.min_intf_metric_dict[lfin] + lfin_to_pref_cost
+                if ibr in ibr_lfin_dict:
+                    min_ibr_lfin_pref_cost = ibr_lfin_dict[ibr][1]
+                else:
+                    min_ibr_lfin_pref_cost = 2147483647
                 if ibr_lfin_pref_cost < min_ibr_lfin_pref_cost:
-                    min_ibr_lfin_pref_cost = ibr_lfin_pref_cost
-                    min_lfin = lfin
-            ibr.prefix_lfin_dict[prefix] = (min_lfin, 
-                min_ibr_lfin_pref_cost,
-                ibr.min_intf_list_dict[min_lfin])
+                    ibr_lfin_dict[ibr] = (lfin, ibr_lfin_pref_cost)
+        P.ibr_lfin_pair_list = []
+        for ibr in ibr_lfin_dict:
+            (min_lfin, min_ibr_lfin_pref_cost) = ibr_lfin_dict[ibr]
+            P.ibr_lfin_pair_list.append((ibr, min_lfin, 
+                min_ibr_lfin_pref_cost, ibr.min_intf_list_dict[min_lfin]))
 
 def Proxy_Node_Att_Router_Compare(pnar_a, pnar_b):
     if pnar_a.named_proxy_cost < pnar_b.named_proxy_cost:
@@ -1206,23 +1666,22 @@ def Proxy_Node_Att_Router_Compare(pnar_a, pnar_b):
     if pnar_b.min_lfin == None:
         return 1
 
+# The PNARs are shared by the prefixes of a class, so their prefix is 
+# the class id.
 def Choose_Proxy_Node_Attachment_Routers(topo):
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
         pnar_candidate_list = []
         for (node, prefix_cost) in P.node_prefix_cost_list:
             if not node.IN_MRT_ISLAND:
                 continue
             pnar = Proxy_Node_Attachment_Router()
-            pnar.prefix = prefix
+            pnar.prefix = P.node_id
             pnar.named_proxy_cost = prefix_cost
             pnar.node = node
             pnar_candidate_list.append(pnar)
-        for ibr in topo.island_border_set:
-            (min_lfin, prefix_cost, min_intf_list) = \
-                ibr.prefix_lfin_dict[prefix]
-            if min_lfin == None:
-                continue
+        for (ibr, min_lfin, prefix_cost, min_intf_list) in \
+                P.ibr_lfin_pair_list:
             pnar = Proxy_Node_Attachment_Router()
             pnar.named_proxy_cost = prefix_cost
             pnar.node = ibr
@@ -1247,6 +1706,37 @@ def Attach_Named_Proxy_Nodes(topo):
     Compute_Island_Border_Router_LFIN_Pairs_For_Each_Prefix(topo)
     Choose_Proxy_Node_Attachment_Routers(topo)
 
+# The named proxy nodes and their PNARs only depend on the MRT Island 
+# and the prefix advertisements, not on the source.  So they are 
+# computed for the first source in the island, kept in 
+# topo.island_named_proxy_dict and only read after that, until the 
+# island changes or Update_Link() changes a metric.  This must be 
+# called while topo.named_proxy_dict is still empty.
+def Attach_Named_Proxy_Nodes_Once(topo):
+    if topo.island_named_proxy_dict != None:
+        return
+    Create_Basic_Named_Proxy_Nodes(topo)
+    Attach_Named_Proxy_Nodes(topo)
+    topo.island_named_proxy_dict = topo.named_proxy_dict
+    topo.named_proxy_dict = {}
+
+# Each source gets its own Named_Proxy_Node for each prefix class to 
+# hold its next-hops and alternates.  The prefixes, advertisements, 
+# LFINs and PNARs are shared with the one in 
+# topo.island_named_proxy_dict.
+def Create_Named_Proxy_Nodes_For_One_Src(topo):
+    Attach_Named_Proxy_Nodes_Once(topo)
+    for class_id in topo.island_named_proxy_dict:
+        island_P = topo.island_named_proxy_dict[class_id]
+        P = Named_Proxy_Node()
+        P.node_id = class_id
+        P.prefix_list = island_P.prefix_list
+        P.node_prefix_cost_list = island_P.node_prefix_cost_list
+        P.lfin_list = island_P.lfin_list
+        P.pnar1 = island_P.pnar1
+        P.pnar2 = island_P.pnar2
+        topo.named_proxy_dict[class_id] = P
+
 def Select_Proxy_Node_NHs(P,S):
     if P.pnar1.node.node_id < P.pnar2.node.node_id:
         X = P.pnar1.node
@@ -1390,18 +1880,20 @@ def Select_Proxy_Node_NHs(P,S):
     assert(False)
     
 def Compute_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,S):
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
         if P.pnar2 == None:
             if S is P.pnar1.node:
                 # set the MRT next-hops for the PNAR to 
                 # reach the LFIN and change FEC to green
                 Copy_List_Items(P.blue_next_hops,
                                 P.pnar1.nh_intf_list)
-                S.blue_to_green_nh_dict[P.node_id] = True
+                for prefix in P.prefix_list:
+                    S.blue_to_green_nh_dict[prefix] = True
                 Copy_List_Items(P.red_next_hops,
                                 P.pnar1.nh_intf_list)
-                S.red_to_green_nh_dict[P.node_id] = True
+                for prefix in P.prefix_list:
+                    S.red_to_green_nh_dict[prefix] = True
             else:
                 # inherit MRT NHs for P from pnar1
                 Copy_List_Items(P.blue_next_hops, 
@@ -1423,11 +1915,13 @@ def Compute_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,S):
             if P.blue_next_hops == []:
                 Copy_List_Items(P.blue_next_hops,
                     this_pnar.nh_intf_list)
-                S.blue_to_green_nh_dict[P.node_id] = True
+                for prefix in P.prefix_list:
+                    S.blue_to_green_nh_dict[prefix] = True
             if P.red_next_hops == []:
                 Copy_List_Items(P.red_next_hops,
                     this_pnar.nh_intf_list)
-                S.red_to_green_nh_dict[P.node_id] = True                   
+                for prefix in P.prefix_list:
+                    S.red_to_green_nh_dict[prefix] = True                   
 
 def Select_Alternates_Proxy_Node(P,F,primary_intf):
     S = primary_intf.local_node
@@ -1681,8 +2175,8 @@ def Select_Alternates_Proxy_Node(P,F,primary_intf):
     assert(False)
 
 def Compute_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src):            
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
         min_total_pref_cost = 2147483647
         for (adv_node, prefix_cost) in P.node_prefix_cost_list:
             total_pref_cost = (adv_node.primary_spf_metric 
@@ -1692,18 +2186,50 @@ def Compute_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src):
                 Copy_List_Items(P.primary_next_hops,
                                 adv_node.primary_next_hops)
             elif total_pref_cost == min_total_pref_cost:
-                for nh_intf in adv_node.primary_next_hops:
-                    Add_Item_To_List_If_New(P.primary_next_hops,
-                                            nh_intf)
+                Add_Items_To_List_If_New(P.primary_next_hops,
+                                         adv_node.primary_next_hops)
+
+# Choose_Red_Or_Blue() depends on the prefix, and with the 'BALANCE' 
+# tie-break on the alternates counted before it, so an alternate with 
+# info 'USE_RED_OR_BLUE' is chosen for each prefix in its class, in 
+# the order of topo.prefix_class_dict, and all of the alternates are 
+# counted in that order.  A prefix with such an alternate gets its own 
+# alternate list in P.alt_dict, and the others share P.alt_list.
+def Choose_Alts_For_Each_Prefix(topo, src):
+    for prefix in topo.prefix_class_dict:
+        P = topo.named_proxy_dict[topo.prefix_class_dict[prefix]]
+        alt_list = P.alt_list
+        for i in range(len(alt_list)):
+            class_alt = alt_list[i]
+            if class_alt.info == 'USE_RED_OR_BLUE':
+                if alt_list is P.alt_list:
+                    alt_list = list(P.alt_list)
+                    P.alt_dict[prefix] = alt_list
+                alt = Alternate()
+                alt.failed_intf = class_alt.failed_intf
+                alt.info = class_alt.info
+                alt.red_or_blue = 'USE_' + Choose_Red_Or_Blue(topo, src, 
+                    prefix, alt.failed_intf)
+                if alt.red_or_blue == 'USE_BLUE':
+                    Copy_List_Items(alt.nh_list, P.blue_next_hops)
+                    alt.fec = 'BLUE'
+                else:
+                    Copy_List_Items(alt.nh_list, P.red_next_hops)
+                    alt.fec = 'RED'
+                alt.prot = 'NODE_PROTECTION'
+                alt_list[i] = alt
+            Count_Alternate_MRT(topo, alt_list[i])
 
 def Select_Alts_For_One_Src_To_Named_Proxy_Nodes(topo,src):
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
         P.alt_list = []
         for failed_intf in P.primary_next_hops:
             alt = Alternate()
             alt.failed_intf = failed_intf
-            if failed_intf not in src.island_intf_list:
+            #failed_intf is an interface of src, so it is in
+            #src.island_intf_list exactly when it is IN_MRT_ISLAND.
+            if not failed_intf.IN_MRT_ISLAND:
                 alt.info = 'PRIM_NH_FOR_PROXY_NODE_NOT_IN_ISLAND'
             elif P.pnar1 is None:
                 alt.info = 'NO_PNARs_EXIST_FOR_THIS_PREFIX'
@@ -1715,13 +2241,14 @@ def Select_Alts_For_One_Src_To_Named_Proxy_Nodes(topo,src):
                 #inherit alternates from the only pnar.
                 alt.info = Select_Alternates(P.pnar1.node, 
                             failed_intf.remote_node, failed_intf)
-            elif failed_intf in src.island_intf_list:
+            elif failed_intf.IN_MRT_ISLAND:
                 alt.info = Select_Alternates_Proxy_Node(P,
                             failed_intf.remote_node, failed_intf)
         
             if alt.info == 'USE_RED_OR_BLUE':
-                alt.red_or_blue = \
-                    random.choice(['USE_RED','USE_BLUE'])
+                # chosen for each prefix by Choose_Alts_For_Each_Prefix()
+                P.alt_list.append(alt)
+                continue
             if (alt.info == 'USE_BLUE' 
                 or alt.red_or_blue == 'USE_BLUE'):
                 Copy_List_Items(alt.nh_list, P.blue_next_hops)
@@ -1796,17 +2323,43 @@ def Select_Alts_For_One_Src_To_Named_Proxy_Nodes(topo,src):
                 alt.prot = 'NO_PROTECTION'
 
             P.alt_list.append(alt)
-
-def Run_Basic_MRT_for_One_Source(topo, src):
-    MRT_Island_Identification(topo, src, 0, 0)
+    Choose_Alts_For_Each_Prefix(topo, src)
+
+# The GADAG, block IDs, local roots and topological order only depend 
+# on the MRT Island (and the profile and area used to identify it), 
+# not on the computing router.  Compute_Island_GADAG() computes them 
+# once for the island containing computing_rtr.  The results must not 
+# be modified by the per-source functions that follow, so that they 
+# can be shared by every source in the island.
+def Compute_Island_GADAG(topo, computing_rtr, profile_id, area):
+    MRT_Island_Identification(topo, computing_rtr, profile_id, area)
     Set_Island_Intf_and_Node_Lists(topo)
-    Set_GADAG_Root(topo,src)
+    Set_GADAG_Root(topo,computing_rtr)
     Sort_Interfaces(topo)
     Run_Lowpoint(topo)
     Assign_Remaining_Lowpoint_Parents(topo)
     Construct_GADAG_via_Lowpoint(topo)
     Run_Assign_Block_ID(topo)
     Add_Undirected_Links(topo)
+    topo.island_profile_id = profile_id
+    topo.island_area = area
+
+# Computes the GADAG of the test_gr island for profile 0 and area 0, 
+# after resetting the computed values of topo.  If test_gr does not 
+# support profile 0, island_node_list_for_test_gr is empty and there is 
+# no island, so no GADAG is computed and every node is left out of the 
+# island, to run only Run_Prim_SPF_for_One_Source().
+def Compute_Test_GR_Island_GADAG(topo):
+    Reset_Computed_Node_and_Intf_Values(topo)
+    if topo.island_node_list_for_test_gr != []:
+        Compute_Island_GADAG(topo, topo.test_gr, 0, 0)
+
+def Run_Basic_MRT_for_One_Source(topo, src):
+    Compute_Island_GADAG(topo, src, 0, 0)
+    Run_Basic_MRT_for_One_Source_In_Island(topo, src)
+
+def Run_Basic_MRT_for_One_Source_In_Island(topo, src):
+    topo.init_new_source_in_island()
     Compute_MRT_NH_For_One_Src_To_Island_Dests(topo,src)
     Store_MRT_Nexthops_For_One_Src_To_Island_Dests(topo,src)
     Select_Alts_For_One_Src_To_Island_Dests(topo,src)
@@ -1819,33 +2372,49 @@ def Store_GADAG_and_Named_Proxies_Once(topo):
                 intf.SIMULATION_OUTGOING = True
             else:
                 intf.SIMULATION_OUTGOING = False
-    for prefix in topo.named_proxy_dict:
-        P = topo.named_proxy_dict[prefix]
-        topo.stored_named_proxy_dict[prefix] = P
+    for class_id in topo.named_proxy_dict:
+        P = topo.named_proxy_dict[class_id]
+        topo.stored_named_proxy_dict[class_id] = P
     
+# The GADAG is computed once per MRT Island and shared by all of 
+# the sources in that island.  Sources are grouped by island, so each 
+# island's GADAG is computed exactly once.
 def Run_Basic_MRT_for_All_Sources(topo):
-    for src in topo.node_list:
+    done_set = set()
+    for node in topo.node_list:
+        if node in done_set:
+            continue
         Reset_Computed_Node_and_Intf_Values(topo)
-        Run_Basic_MRT_for_One_Source(topo,src)
-        if src is topo.gadag_root:
-            Store_GADAG_and_Named_Proxies_Once(topo)
+        Compute_Island_GADAG(topo, node, 0, 0)
+        for src in topo.island_node_list:
+            Run_Basic_MRT_for_One_Source_In_Island(topo,src)
+            if src is topo.gadag_root:
+                Store_GADAG_and_Named_Proxies_Once(topo)
+            done_set.add(src)
 
 def Run_MRT_for_One_Source(topo, src):
-    MRT_Island_Identification(topo, src, 0, 0)
-    Set_Island_Intf_and_Node_Lists(topo)
-    Set_GADAG_Root(topo,src)
-    Sort_Interfaces(topo)
-    Run_Lowpoint(topo)
-    Assign_Remaining_Lowpoint_Parents(topo)
-    Construct_GADAG_via_Lowpoint(topo)
-    Run_Assign_Block_ID(topo)
-    Add_Undirected_Links(topo)
+    Compute_Island_GADAG(topo, src, 0, 0)
+    Run_MRT_for_One_Source_In_Island(topo, src)
+
+def Run_MRT_for_One_Source_In_Island(topo, src):
+    topo.init_new_source_in_island()
+    Run_MRT_for_One_Source_To_Island_Dests(topo, src)
+    Run_MRT_for_One_Source_To_Named_Proxy_Nodes(topo, src)
+
+# The computation for one source is split in two stages.  The first 
+# does not depend on the prefix advertisements.  The second only 
+# reads the results of the first that are stored on src, and the 
+# following values left on the nodes by the first: the blue_next_hops,
+# red_next_hops, HIGHER, LOWER and order_proxy of the island nodes, 
+# and the primary_next_hops and primary_spf_metric of every node.
+def Run_MRT_for_One_Source_To_Island_Dests(topo, src):
     Compute_MRT_NH_For_One_Src_To_Island_Dests(topo,src)
     Store_MRT_Nexthops_For_One_Src_To_Island_Dests(topo,src)
     Select_Alts_For_One_Src_To_Island_Dests(topo,src)
     Store_Primary_and_Alts_For_One_Src_To_Island_Dests(topo,src)
-    Create_Basic_Named_Proxy_Nodes(topo) 
-    Attach_Named_Proxy_Nodes(topo) 
+
+def Run_MRT_for_One_Source_To_Named_Proxy_Nodes(topo, src):
+    Create_Named_Proxy_Nodes_For_One_Src(topo) 
     Compute_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src) 
     Store_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src) 
     Compute_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src) 
@@ -1854,24 +2423,678 @@ def Run_MRT_for_One_Source(topo, src):
     Store_Alts_For_One_Src_To_Named_Proxy_Nodes(topo,src) 
 
 def Run_Prim_SPF_for_One_Source(topo,src):
+    Run_Prim_SPF_for_One_Source_To_Nodes(topo, src)
+    Run_Prim_SPF_for_One_Source_To_Named_Proxy_Nodes(topo, src)
+
+def Run_Prim_SPF_for_One_Source_To_Nodes(topo, src):
     Normal_SPF(topo, src)
     Store_Primary_NHs_For_One_Source_To_Nodes(topo,src)
+
+def Run_Prim_SPF_for_One_Source_To_Named_Proxy_Nodes(topo, src):
     Create_Basic_Named_Proxy_Nodes(topo) 
     Compute_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src) 
     Store_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes(topo,src) 
        
 def Run_MRT_for_All_Sources(topo):
+    # the GADAG for the test_gr island is computed once and then 
+    # shared by every source in that island
+    Compute_Test_GR_Island_GADAG(topo)
     for src in topo.node_list:
-        Reset_Computed_Node_and_Intf_Values(topo)
-        if src in topo.island_node_list_for_test_gr:
+        # Compute_Island_GADAG() has marked the nodes of the test_gr 
+        # island, i.e. those in topo.island_node_list_for_test_gr.
+        if src.IN_MRT_ISLAND:
             # src runs MRT if it is in same MRT island as test_gr
-            Run_MRT_for_One_Source(topo,src)
+            Run_MRT_for_One_Source_In_Island(topo,src)
             if src is topo.gadag_root:
                 Store_GADAG_and_Named_Proxies_Once(topo)
         else:
             # src still runs SPF if not in MRT island
+            topo.init_new_source_in_island()
             Run_Prim_SPF_for_One_Source(topo,src)
             
+# Run_MRT_for_All_Sources_Parallel() produces the same results as 
+# Run_MRT_for_All_Sources(), but spreads the per-source computations 
+# over a pool of num_workers worker processes (by default, one per 
+# CPU).  The GADAG is computed once in this process before the pool 
+# is created, so each worker starts from a (forked) copy of the 
+# topology with the GADAG already in place.  Workers send back the 
+# per-source results with interfaces identified by 
+# (local node_id, link_data), and those are stored on the nodes of 
+# topo exactly as the serial driver would store them.
+def Run_MRT_for_All_Sources_Parallel(topo, num_workers=None):
+    if num_workers == None:
+        num_workers = multiprocessing.cpu_count()
+    if num_workers <= 1:
+        Run_MRT_for_All_Sources(topo)
+        return
+    Compute_Test_GR_Island_GADAG(topo)
+    # The GADAG root is computed here, since the named proxy nodes 
+    # stored along with the GADAG come from its computation.
+    if topo.island_node_list != []:
+        Run_MRT_for_One_Source_In_Island(topo, topo.gadag_root)
+        Store_GADAG_and_Named_Proxies_Once(topo)
+    task_list = []
+    for src in topo.node_list:
+        if src is not topo.gadag_root:
+            task_list.append((src.node_id, src.IN_MRT_ISLAND))
+    chunksize = max(1, len(task_list) // (num_workers * 8))
+    pool = multiprocessing.Pool(num_workers, Init_Parallel_Worker, 
+                                (topo,))
+    try:
+        for (src_node_id, result) in pool.imap_unordered(
+                Run_Parallel_Worker, task_list, chunksize):
+            Decode_Source_Results(topo, topo.node_dict[src_node_id],
+                                  result)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Only set in the worker processes of Run_MRT_for_All_Sources_Parallel
+parallel_worker_topo = None
+
+def Init_Parallel_Worker(topo):
+    global parallel_worker_topo
+    parallel_worker_topo = topo
+
+def Run_Parallel_Worker(task):
+    (src_node_id, in_island) = task
+    topo = parallel_worker_topo
+    src = topo.node_dict[src_node_id]
+    if in_island:
+        Run_MRT_for_One_Source_In_Island(topo,src)
+    else:
+        topo.init_new_source_in_island()
+        Run_Prim_SPF_for_One_Source(topo,src)
+    result = Encode_Source_Results(src)
+    # the results now live in the parent process
+    src.blue_next_hops_dict = {}
+    src.red_next_hops_dict = {}
+    src.blue_to_green_nh_dict = {}
+    src.red_to_green_nh_dict = {}
+    src.pnh_dict = {}
+    src.alt_dict = {}
+    return (src_node_id, result)
+
+def Intf_To_Key(intf):
+    if intf == None:
+        return None
+    return (intf.local_node.node_id, intf.link_data)
+
+def Key_To_Intf(topo, key):
+    if key == None:
+        return None
+    return topo.node_dict[key[0]].intf_list[key[1]]
+
+def Encode_Next_Hops_Dict(next_hops_dict):
+    encoded_dict = {}
+    for dest in next_hops_dict:
+        encoded_dict[dest] = [Intf_To_Key(intf) 
+                              for intf in next_hops_dict[dest]]
+    return encoded_dict
+
+def Decode_Next_Hops_Dict(topo, encoded_dict):
+    next_hops_dict = {}
+    for dest in encoded_dict:
+        next_hops_dict[dest] = [Key_To_Intf(topo, key) 
+                                for key in encoded_dict[dest]]
+    return next_hops_dict
+
+def Encode_Source_Results(src):
+    alt_dict = {}
+    for dest in src.alt_dict:
+        alt_dict[dest] = []
+        for alt in src.alt_dict[dest]:
+            alt_dict[dest].append(
+                (Intf_To_Key(alt.failed_intf), alt.red_or_blue,
+                 [Intf_To_Key(intf) for intf in alt.nh_list],
+                 alt.fec, alt.prot, alt.info))
+    return (Encode_Next_Hops_Dict(src.blue_next_hops_dict),
+            Encode_Next_Hops_Dict(src.red_next_hops_dict),
+            Encode_Next_Hops_Dict(src.pnh_dict),
+            alt_dict,
+            src.blue_to_green_nh_dict,
+            src.red_to_green_nh_dict)
+
+def Decode_Source_Results(topo, src, result):
+    (blue_dict, red_dict, pnh_dict, alt_dict, 
+     blue_to_green_nh_dict, red_to_green_nh_dict) = result
+    src.blue_next_hops_dict = Decode_Next_Hops_Dict(topo, blue_dict)
+    src.red_next_hops_dict = Decode_Next_Hops_Dict(topo, red_dict)
+    src.pnh_dict = Decode_Next_Hops_Dict(topo, pnh_dict)
+    src.alt_dict = {}
+    for dest in alt_dict:
+        src.alt_dict[dest] = []
+        for (failed_key, red_or_blue, nh_key_list, 
+             fec, prot, info) in alt_dict[dest]:
+            alt = Alternate()
+            alt.failed_intf = Key_To_Intf(topo, failed_key)
+            alt.red_or_blue = red_or_blue
+            alt.nh_list = [Key_To_Intf(topo, key) for key in nh_key_list]
+            alt.fec = fec
+            alt.prot = prot
+            alt.info = info
+            src.alt_dict[dest].append(alt)
+    src.blue_to_green_nh_dict = blue_to_green_nh_dict
+    src.red_to_green_nh_dict = red_to_green_nh_dict
+
+# Instrumentation of the per-source pipeline.  After
+# Enable_Instrumentation(), Get_Instrumentation_Stats() returns
+#
+#   {'phases': {phase name: {'calls': n, 'seconds': t}},
+#    'spf': {SPF name: {'runs': n, 'queue_inserts': n,
+#                       'decrease_keys': n, 'ecmp_merges': n}}}
+#
+# and Instrumentation_Stats_To_JSON() turns that into JSON.  The
+# phases are Compute_Island_GADAG(), Run_MRT_for_One_Source_In_Island(),
+# Run_Basic_MRT_for_One_Source_In_Island() and
+# Run_Prim_SPF_for_One_Source(), their steps, and the SPFs that those
+# run.  The time of a phase includes the phases that it calls, e.g.
+# Compute_MRT_NH_For_One_Src_To_Island_Dests includes
+# SPF_No_Traverse_Block_Root.  A queue insert is the first path found
+# to a node, a decrease key a shorter path to a node already in the
+# queue, and an ECMP merge the discovery of an equal cost path to
+# a node.
+#
+# Enable_Instrumentation() replaces each phase function in the module
+# globals with a wrapper that times it, and Disable_Instrumentation()
+# puts the original functions back, so the phases cost nothing extra
+# when instrumentation is disabled.  The SPFs always count in local
+# variables and only record the counts when it is enabled.  Only the
+# calling process is instrumented: the work done by the worker
+# processes of Run_MRT_for_All_Sources_Parallel() is not counted.
+INSTRUMENTED_PHASE_NAMES = (
+    'Compute_Island_GADAG', 'Run_MRT_for_One_Source_In_Island',
+    'Run_Basic_MRT_for_One_Source_In_Island', 'Run_Prim_SPF_for_One_Source',
+    'MRT_Island_Identification', 'Set_Island_Intf_and_Node_Lists',
+    'Set_GADAG_Root', 'Sort_Interfaces', 'Run_Lowpoint',
+    'Assign_Remaining_Lowpoint_Parents', 'Construct_GADAG_via_Lowpoint',
+    'Run_Assign_Block_ID', 'Add_Undirected_Links',
+    'Compute_MRT_NH_For_One_Src_To_Island_Dests',
+    'SPF_No_Traverse_Block_Root',
+    'Store_MRT_Nexthops_For_One_Src_To_Island_Dests',
+    'Select_Alts_For_One_Src_To_Island_Dests', 'Normal_SPF',
+    'Store_Primary_and_Alts_For_One_Src_To_Island_Dests',
+    'Create_Named_Proxy_Nodes_For_One_Src',
+    'Create_Basic_Named_Proxy_Nodes', 'Attach_Named_Proxy_Nodes',
+    'Island_Marking_SPF',
+    'Compute_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes',
+    'Store_MRT_NHs_For_One_Src_To_Named_Proxy_Nodes',
+    'Compute_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes',
+    'Store_Primary_NHs_For_One_Src_To_Named_Proxy_Nodes',
+    'Select_Alts_For_One_Src_To_Named_Proxy_Nodes',
+    'Store_Alts_For_One_Src_To_Named_Proxy_Nodes',
+    'Store_Primary_NHs_For_One_Source_To_Nodes')
+
+# None while instrumentation is disabled
+instrumentation_stats = None
+# phase name -> original function, while instrumentation is enabled
+instrumented_phase_dict = {}
+
+def Timed_Phase(phase_name, phase_func):
+    def Run_Timed_Phase(*args):
+        start_time = time.time()
+        try:
+            return phase_func(*args)
+        finally:
+            phase_stats = instrumentation_stats['phases'][phase_name]
+            phase_stats['calls'] += 1
+            phase_stats['seconds'] += time.time() - start_time
+    return Run_Timed_Phase
+
+def Enable_Instrumentation():
+    global instrumentation_stats
+    if instrumentation_stats == None:
+        module_globals = globals()
+        for phase_name in INSTRUMENTED_PHASE_NAMES:
+            instrumented_phase_dict[phase_name] = module_globals[phase_name]
+            module_globals[phase_name] = Timed_Phase(
+                phase_name, module_globals[phase_name])
+    instrumentation_stats = {'phases': {}, 'spf': {}}
+    for phase_name in INSTRUMENTED_PHASE_NAMES:
+        instrumentation_stats['phases'][phase_name] = \
+            {'calls': 0, 'seconds': 0.0}
+
+def Disable_Instrumentation():
+    global instrumentation_stats
+    if instrumentation_stats == None:
+        return
+    module_globals = globals()
+    for phase_name in INSTRUMENTED_PHASE_NAMES:
+        module_globals[phase_name] = instrumented_phase_dict.pop(phase_name)
+    instrumentation_stats = None
+
+def Record_SPF_Counts(spf_name, insert_count, decrease_key_count,
+                      ecmp_merge_count):
+    if spf_name not in instrumentation_stats['spf']:
+        instrumentation_stats['spf'][spf_name] = \
+            {'runs': 0, 'queue_inserts': 0, 'decrease_keys': 0,
+             'ecmp_merges': 0}
+    spf_stats = instrumentation_stats['spf'][spf_name]
+    spf_stats['runs'] += 1
+    spf_stats['queue_inserts'] += insert_count
+    spf_stats['decrease_keys'] += decrease_key_count
+    spf_stats['ecmp_merges'] += ecmp_merge_count
+
+# Returns a copy of the stats gathered since Enable_Instrumentation(),
+# leaving out the phases that were never called, or None if
+# instrumentation is disabled.
+def Get_Instrumentation_Stats():
+    if instrumentation_stats == None:
+        return None
+    stats = {'phases': {}, 'spf': {}}
+    for phase_name in instrumentation_stats['phases']:
+        phase_stats = instrumentation_stats['phases'][phase_name]
+        if phase_stats['calls'] > 0:
+            stats['phases'][phase_name] = dict(phase_stats)
+    for spf_name in instrumentation_stats['spf']:
+        stats['spf'][spf_name] = dict(instrumentation_stats['spf'][spf_name])
+    return stats
+
+def Instrumentation_Stats_To_JSON(stats):
+    return json.dumps(stats, sort_keys=True, indent=2)
+
+# Update_Link() changes the metric of one link of a topology on which 
+# Run_MRT_for_All_Sources() (or Run_MRT_for_All_Sources_Parallel()) 
+# has been run, or takes the link down when metric is 'DOWN', and then 
+# recomputes the results of only those sources that can be affected:
+# - the GADAG is recomputed only if the link is in the MRT Island, 
+#   and only if it is taken down or the new metric changes the order 
+#   of Sort_Interfaces() at either end of the link (see 
+#   Island_Intf_Order_Changed()).  If the new GADAG differs from the 
+#   old one (or the island itself has changed), every source in the 
+#   island is recomputed.
+# - the primary next-hops of source x can only change if the link is, 
+#   or becomes, part of a shortest path from x.  With the metrics to 
+#   each end of the link computed before the change, that is when 
+#   metric(x,a) + min(old metric, new metric) <= metric(x,b), for 
+#   either direction a->b of the link.
+# - otherwise, with the same GADAG, the blue and red next-hops can only 
+#   change for sources for which the link is, or becomes, part of a 
+#   shortest path of SPF_No_Traverse_Block_Root() (see 
+#   Sources_With_Link_On_MRT_Paths()).  HIGHER, LOWER and order_proxy 
+#   only depend on the GADAG, and the other results of a source only 
+#   depend on them, on its primary, blue and red next-hops, and on the 
+#   attachment of the named proxy nodes.
+# - so a source found by either of these two tests only has its SPFs 
+#   run again, and is recomputed only if they give different 
+#   next-hops (see Source_Next_Hops_Changed()).  This is not done for 
+#   the primary test if any node advertises a prefix, since the named 
+#   proxy nodes are then chosen by the primary metrics as well.
+# - both ends of the link are always recomputed, since an alternate 
+#   over a parallel cut-link is chosen by the metrics of their 
+#   interfaces.
+# - if the test_gr island has changed, the nodes that have left it get 
+#   the prefix of Add_Prefixes_for_Non_Island_Nodes(), the nodes that 
+#   have joined it lose theirs, and every source is recomputed.
+# - the attachment of the named proxy nodes does not depend on the 
+#   source.  It is recomputed once and, if it differs from the one 
+#   stored with the GADAG, every source in the island is recomputed.
+# The metric applies to the link from nodea to nodeb, and reverse_metric 
+# (by default the same as metric) to the link from nodeb to nodea.  If 
+# there are parallel links, the one with the lowest link_data at nodea
+# is updated.  Taking a link down removes its interfaces and renumbers 
+# the link_data of the remaining interfaces of nodea and nodeb, as if 
+# the topology had been read from a file without that link.
+# The return value is a Link_Update_Delta describing the change in the 
+# results.  A node or link that is not in the topology, or a metric 
+# (or reverse_metric) that is neither a non-negative integer nor 
+# 'DOWN', raises ValueError before anything is changed.
+class Link_Update_Delta(object):
+    __slots__ = ('gadag_changed', 'named_proxies_changed', 
+                 'affected_src_list', 'changed_list')
+    def __init__(self):
+        self.gadag_changed = False
+        self.named_proxies_changed = False
+        # node_ids of the recomputed sources, in topo.node_list order
+        self.affected_src_list = []
+        # (src node_id, result name, dest, old value, new value), where 
+        # result name is one of 'blue', 'red', 'primary', 'alternates',
+        # 'blue_to_green' and 'red_to_green', a value is the list (or 
+        # flag) stored for dest in the corresponding dict of the source,
+        # and None if there was none
+        self.changed_list = []
+
+def Compute_Metrics_To_Node(topo, dest):
+    spf_metric_dict = {}
+    for y in topo.node_list:
+        spf_metric_dict[y] = 2147483647
+    spf_metric_dict[dest] = 0
+    spf_heap = [(0, dest.node_id, dest)]
+    while spf_heap != []:
+        (min_metric, min_node_id, min_node) = heapq.heappop(spf_heap)
+        if min_metric > spf_metric_dict[min_node]:
+            continue
+        for intf in min_node.intf_list:
+            path_metric = min_metric + intf.remote_intf.metric
+            if path_metric < spf_metric_dict[intf.remote_node]:
+                spf_metric_dict[intf.remote_node] = path_metric
+                heapq.heappush(spf_heap, (path_metric,
+                                          intf.remote_node.node_id,
+                                          intf.remote_node))
+    return spf_metric_dict
+
+def Link_May_Be_On_Shortest_Path(metric_to_a, metric_to_b, intf_metric, 
+                                 new_metric):
+    if metric_to_a == 2147483647:
+        return False
+    if new_metric != 'DOWN':
+        intf_metric = min(intf_metric, new_metric)
+    return metric_to_a + intf_metric <= metric_to_b
+
+def GADAG_Signature(topo):
+    signature = [topo.gadag_root]
+    for node in topo.node_list:
+        signature.append((node.IN_MRT_ISLAND, node.localroot, 
+                          node.block_id, node.topo_order))
+        for intf in node.intf_list:
+            signature.append((intf, intf.IN_MRT_ISLAND, 
+                              intf.OUTGOING, intf.INCOMING))
+    return signature
+
+def Named_Proxy_Attachment_Signature(named_proxy_dict):
+    signature = []
+    for class_id in sorted(named_proxy_dict):
+        P = named_proxy_dict[class_id]
+        pnar_signature_list = []
+        for pnar in [P.pnar1, P.pnar2]:
+            if pnar == None:
+                pnar_signature_list.append(None)
+            else:
+                pnar_signature_list.append(
+                    (pnar.node, pnar.named_proxy_cost, pnar.min_lfin,
+                     list(pnar.nh_intf_list)))
+        signature.append((list(P.prefix_list), list(P.node_prefix_cost_list),
+                          list(P.lfin_list), pnar_signature_list))
+    return signature
+
+# The GADAG only depends on the metrics through the order in which 
+# Sort_Interfaces() sorts the island_intf_list of each node for the 
+# DFS of Run_Lowpoint(): the island, the GADAG root and the rest of 
+# Compute_Island_GADAG() do not use the metrics.  Returns True if the 
+# island_intf_list of node, sorted with the current metrics, would no 
+# longer be in the order that it was sorted in.
+def Island_Intf_Order_Changed(node):
+    intf_list = sorted(node.island_intf_list, 
+                       key=lambda intf: intf.link_data)
+    intf_list.sort(Interface_Compare)
+    return intf_list != node.island_intf_list
+
+# The reverse of SPF_No_Traverse_Block_Root() in direction, for the 
+# sources whose block_id is block_id: the metric from each of them to 
+# dest along the GADAG links that it follows.  All those sources have 
+# the same localroot, which is not traversed, and a path from one of 
+# them to a node of the block (or to the localroot) stays in the 
+# block.  A source that dest cannot be reached from is left out.
+def Compute_Block_Metrics_To_Node(dest, block_id, direction):
+    spf_metric_dict = {dest: 0}
+    spf_heap = [(0, dest.node_id, dest)]
+    while spf_heap != []:
+        (min_metric, min_node_id, min_node) = heapq.heappop(spf_heap)
+        if min_metric > spf_metric_dict[min_node]:
+            continue
+        for intf in min_node.island_intf_list:
+            y = intf.remote_node
+            if y.block_id != block_id:
+                continue
+            if direction == 'INCREASING':
+                if not intf.remote_intf.OUTGOING:
+                    continue
+            elif not intf.remote_intf.INCOMING:
+                continue
+            path_metric = min_metric + intf.remote_intf.metric
+            if path_metric < spf_metric_dict.get(y, 2147483647):
+                spf_metric_dict[y] = path_metric
+                heapq.heappush(spf_heap, (path_metric, y.node_id, y))
+    return spf_metric_dict
+
+# Used by Update_Link(), before the metrics of the island link of 
+# nodea_intf are changed, for when the GADAG stays the same.  Returns 
+# the sources whose blue and red next-hops may change: those of the 
+# block of the link for which the link is, or becomes, part of a 
+# shortest path of SPF_No_Traverse_Block_Root() in either direction, 
+# as in Link_May_Be_On_Shortest_Path(), and the localroot of the 
+# block, which explores it without that restriction.  Sources in 
+# other blocks only reach the block at its localroot, which they do 
+# not traverse.
+def Sources_With_Link_On_MRT_Paths(topo, nodea_intf, metric, 
+                                   reverse_metric):
+    nodea = nodea_intf.local_node
+    nodeb = nodea_intf.remote_node
+    if nodea.block_id == nodeb.block_id:
+        (block_id, block_root) = (nodea.block_id, nodea.localroot)
+    elif nodeb is nodea.localroot:
+        (block_id, block_root) = (nodea.block_id, nodeb)
+    else:
+        assert nodea is nodeb.localroot
+        (block_id, block_root) = (nodeb.block_id, nodea)
+    metric_to_node_dict = {}
+    for direction in ['INCREASING', 'DECREASING']:
+        for node in [nodea, nodeb]:
+            metric_to_node_dict[(direction, node)] = \
+                Compute_Block_Metrics_To_Node(node, block_id, direction)
+    affected_set = set([block_root])
+    for x in topo.island_node_list:
+        if x.block_id != block_id:
+            continue
+        if x.localroot is not block_root:
+            affected_set.add(x)
+            continue
+        for (intf, new_metric) in [(nodea_intf, metric), 
+                                   (nodea_intf.remote_intf, reverse_metric)]:
+            for (direction, in_direction) in \
+                    [('INCREASING', intf.OUTGOING), 
+                     ('DECREASING', intf.INCOMING)]:
+                if in_direction and Link_May_Be_On_Shortest_Path(
+                        metric_to_node_dict[(direction, 
+                            intf.local_node)].get(x, 2147483647),
+                        metric_to_node_dict[(direction, 
+                            intf.remote_node)].get(x, 2147483647),
+                        intf.metric, new_metric):
+                    affected_set.add(x)
+    return affected_set
+
+# Used by Update_Link() for a source x that only has to be recomputed 
+# if its SPFs now give different next-hops: with the same GADAG, 
+# HIGHER, LOWER and order_proxy are the same, and the results of x 
+# computed from its next-hops are too.  If mrt_may_change, the blue 
+# and red next-hops of x to the island nodes are computed again, and 
+# if primary_may_change, its primary next-hops.  Returns True if any 
+# differ from the ones stored on x.
+def Source_Next_Hops_Changed(topo, x, mrt_may_change, primary_may_change):
+    topo.init_new_source_in_island()
+    if mrt_may_change:
+        Compute_MRT_NH_For_One_Src_To_Island_Dests(topo, x)
+        for y in topo.island_node_list:
+            if y is x:
+                continue
+            if ( y.blue_next_hops != x.blue_next_hops_dict.get(y.node_id)
+                 or y.red_next_hops != x.red_next_hops_dict.get(y.node_id) ):
+                return True
+    if primary_may_change:
+        Normal_SPF(topo, x)
+        if x.IN_MRT_ISLAND:
+            dest_list = topo.island_node_list
+        else:
+            dest_list = topo.node_list
+        for y in dest_list:
+            if y.primary_next_hops != x.pnh_dict.get(y.node_id):
+                return True
+    return False
+
+def Source_Result_Dict_List(src):
+    return [('blue', src.blue_next_hops_dict), 
+            ('red', src.red_next_hops_dict),
+            ('primary', src.pnh_dict),
+            ('alternates', src.alt_dict),
+            ('blue_to_green', src.blue_to_green_nh_dict),
+            ('red_to_green', src.red_to_green_nh_dict)]
+
+def Alternate_Lists_Equal(alt_list_a, alt_list_b):
+    if alt_list_a == None or alt_list_b == None:
+        return alt_list_a is alt_list_b
+    if len(alt_list_a) != len(alt_list_b):
+        return False
+    for i in range(len(alt_list_a)):
+        alt_a = alt_list_a[i]
+        alt_b = alt_list_b[i]
+        if ( alt_a.failed_intf is not alt_b.failed_intf 
+             or alt_a.red_or_blue != alt_b.red_or_blue
+             or alt_a.nh_list != alt_b.nh_list
+             or alt_a.fec != alt_b.fec or alt_a.prot != alt_b.prot
+             or alt_a.info != alt_b.info ):
+            return False
+    return True
+
+def Add_Changed_Results_To_Delta(delta, src, old_result_dict_list):
+    new_result_dict_list = Source_Result_Dict_List(src)
+    for i in range(len(new_result_dict_list)):
+        (result_name, old_dict) = old_result_dict_list[i]
+        new_dict = new_result_dict_list[i][1]
+        for dest in sorted(set(old_dict) | set(new_dict)):
+            old_value = old_dict.get(dest)
+            new_value = new_dict.get(dest)
+            if result_name == 'alternates':
+                changed = not Alternate_Lists_Equal(old_value, new_value)
+            else:
+                changed = (old_value != new_value)
+            if changed:
+                delta.changed_list.append((src.node_id, result_name, dest,
+                                           old_value, new_value))
+
+def Clear_Source_Results(src):
+    src.blue_next_hops_dict = {}
+    src.red_next_hops_dict = {}
+    src.pnh_dict = {}
+    src.alt_dict = {}
+    src.blue_to_green_nh_dict = {}
+    src.red_to_green_nh_dict = {}
+
+def Remove_Link(nodea_intf):
+    for intf in [nodea_intf, nodea_intf.remote_intf]:
+        node = intf.local_node
+        node.intf_list.remove(intf)
+        for link_data in range(len(node.intf_list)):
+            node.intf_list[link_data].link_data = link_data
+
+def Update_Link(topo, nodea_node_id, nodeb_node_id, metric, 
+                reverse_metric=None):
+    for node_id in [nodea_node_id, nodeb_node_id]:
+        if node_id not in topo.node_dict:
+            raise ValueError('node %r is not in the topology' % (node_id,))
+    nodea = topo.node_dict[nodea_node_id]
+    nodeb = topo.node_dict[nodeb_node_id]
+    nodea_intf = None
+    for intf in nodea.intf_list:
+        if intf.remote_node is nodeb:
+            nodea_intf = intf
+            break
+    if nodea_intf == None:
+        raise ValueError('there is no link between nodes %r and %r' 
+                         % (nodea_node_id, nodeb_node_id))
+    nodeb_intf = nodea_intf.remote_intf
+    if reverse_metric == None or metric == 'DOWN':
+        reverse_metric = metric
+    # a link is taken down in both directions, by its metric
+    if metric != 'DOWN':
+        for value in [metric, reverse_metric]:
+            if ( not isinstance(value, (int, long)) 
+                 or isinstance(value, bool) or value < 0 ):
+                raise ValueError('metric %r is not a non-negative integer'
+                                 % (value,))
+    delta = Link_Update_Delta()
+
+    metric_to_a_dict = Compute_Metrics_To_Node(topo, nodea)
+    metric_to_b_dict = Compute_Metrics_To_Node(topo, nodeb)
+    primary_check_set = set()
+    for x in topo.node_list:
+        if ( Link_May_Be_On_Shortest_Path(metric_to_a_dict[x], 
+                 metric_to_b_dict[x], nodea_intf.metric, metric)
+             or Link_May_Be_On_Shortest_Path(metric_to_b_dict[x], 
+                 metric_to_a_dict[x], nodeb_intf.metric, reverse_metric) ):
+            primary_check_set.add(x)
+    # the sources that are recomputed without checking their next-hops 
+    # first
+    affected_set = set([nodea, nodeb])
+    for node in topo.node_list:
+        if node.prefix_cost_dict != {}:
+            # the results for the named proxy nodes also depend on the 
+            # primary metrics, not only on the next-hops
+            affected_set.update(primary_check_set)
+            break
+    old_island_node_list = topo.island_node_list_for_test_gr
+    old_attachment_signature = \
+        Named_Proxy_Attachment_Signature(topo.stored_named_proxy_dict)
+    island_link = nodea_intf.IN_MRT_ISLAND
+    mrt_check_set = set()
+    if island_link and metric != 'DOWN':
+        mrt_check_set = Sources_With_Link_On_MRT_Paths(topo, nodea_intf,
+                                                       metric, reverse_metric)
+
+    gadag_may_change = island_link
+    if metric != 'DOWN':
+        nodea_intf.metric = metric
+        nodeb_intf.metric = reverse_metric
+        gadag_may_change = island_link and (
+            Island_Intf_Order_Changed(nodea) 
+            or Island_Intf_Order_Changed(nodeb))
+    if gadag_may_change:
+        # the signature does not include the metrics, and always 
+        # changes when an island link is taken down
+        old_gadag_signature = GADAG_Signature(topo)
+    if metric == 'DOWN':
+        Remove_Link(nodea_intf)
+    topo.island_marking_dest_set = None
+    topo.island_named_proxy_dict = None
+
+    if gadag_may_change:
+        Compute_Test_GR_Island_GADAG(topo)
+        delta.gadag_changed = \
+            (GADAG_Signature(topo) != old_gadag_signature)
+    if delta.gadag_changed:
+        topo.island_node_list_for_test_gr = list(topo.island_node_list)
+        affected_set.update(old_island_node_list)
+        affected_set.update(topo.island_node_list)
+        if Update_Prefixes_for_Non_Island_Nodes(topo, old_island_node_list):
+            # the prefix classes, the island marking SPFs and the named 
+            # proxy nodes all depend on the prefixes, and the primary 
+            # next-hops of every source go to them
+            topo.prefix_class_dict = {}
+            topo.island_marking_dest_set = None
+            topo.island_named_proxy_dict = None
+            affected_set.update(topo.node_list)
+
+    if topo.island_node_list != []:
+        topo.init_new_source_in_island()
+        Attach_Named_Proxy_Nodes_Once(topo)
+        delta.named_proxies_changed = \
+            (Named_Proxy_Attachment_Signature(topo.island_named_proxy_dict)
+             != old_attachment_signature)
+    if delta.named_proxies_changed:
+        affected_set.update(topo.island_node_list)
+
+    for src in topo.node_list:
+        if src not in affected_set:
+            mrt_may_change = src in mrt_check_set
+            primary_may_change = src in primary_check_set
+            if not (mrt_may_change or primary_may_change):
+                continue
+            if not Source_Next_Hops_Changed(topo, src, mrt_may_change,
+                                            primary_may_change):
+                continue
+        delta.affected_src_list.append(src.node_id)
+        old_result_dict_list = Source_Result_Dict_List(src)
+        Clear_Source_Results(src)
+        if src.IN_MRT_ISLAND:
+            Run_MRT_for_One_Source_In_Island(topo, src)
+            if src is topo.gadag_root:
+                Store_GADAG_and_Named_Proxies_Once(topo)
+        else:
+            topo.init_new_source_in_island()
+            Run_Prim_SPF_for_One_Source(topo, src)
+        Add_Changed_Results_To_Delta(delta, src, old_result_dict_list)
+    return delta
+
 def Write_Output_To_Files(topo,file_prefix):
     Write_GADAG_To_File(topo,file_prefix)
     Write_Both_MRTs_For_All_Dests_To_File(topo,file_prefix)
@@ -1954,7 +3177,8 @@ def Generate_Complex_Topology_and_Run_MRT():
     Run_MRT_for_All_Sources(topo)
     Write_Output_To_Files(topo, res_file_base)
 
-Generate_Basic_Topology_and_Run_MRT()
+if __name__ == '__main__':
+    Generate_Basic_Topology_and_Run_MRT()
     
-Generate_Complex_Topology_and_Run_MRT()
+    Generate_Complex_Topology_and_Run_MRT()
 
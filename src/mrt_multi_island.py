@@ -0,0 +1,227 @@
+# A driver that runs the MRT computations for every MRT Island of a
+# topology, for every MRT profile and every IGP area, in one pass.
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.
+#
+# Run_MRT_for_All_Sources() only computes the island that contains
+# topo.test_gr for profile 0 and area 0.  Find_All_MRT_Islands() finds
+# every (profile, area) island in a single sweep over the intf_list of
+# every node.  An interface joins its two nodes in the island of
+# (profile, intf.area) for each profile that both nodes support, under
+# the same conditions that MRT_Island_Identification() uses to cross
+# it.  The islands are the connected components that this gives, so
+# each one is exactly the island that MRT_Island_Identification()
+# finds from any of its nodes.  A router with no interface that it
+# can use in an island only forms an island by itself, which has no
+# MRTs, so such one-node islands are not included.
+#
+# Run_MRT_for_All_Islands() sends the sources of all of the islands
+# to one pool of worker processes, as Run_MRT_for_All_Sources_Parallel()
+# does for one island.  The GADAG state of an island lives on the
+# nodes and interfaces of the topology, so a worker can only hold one
+# island at a time.  The tasks are sorted by island, and a worker
+# computes the GADAG of an island again only when its next task is in
+# a different island.  Computing a GADAG takes linear time, while the
+# sources of an island take much longer than that.  Only the sources
+# in each island are run: the routers outside an island have no MRT
+# results for it.  The results of each source are kept, in the
+# encoded form of Encode_Source_Results(), in the result_dict of its
+# island, since a router in several islands has different results
+# in each of them.
+#
+# The primary SPFs run over every interface, as they do in
+# Run_MRT_for_All_Sources(), so the primary next-hop from one node of
+# an island to another can be an interface of another area, which is
+# not in the island.  Select_Alternates() only expects that of an
+# MRT_INELIGIBLE interface, and picks the alternate for it from the
+# topological order.  So while the sources of an island are run,
+# such interfaces are marked MRT_INELIGIBLE, and they are put back
+# afterwards.  This does not change the island, since
+# MRT_Island_Identification() does not cross them anyway.
+#
+# Write_All_Island_Outputs_To_Files() writes the usual GADAG, MRT and
+# alternates files for each island, with file names
+# <file_prefix>_profile<P>_area<A>_island<N>, where N numbers the
+# islands of the same profile and area from 1.
+
+import multiprocessing
+
+import mrt_lowpoint_draft_text as mrt
+
+class MRT_Island:
+    def __init__(self, profile_id, area, node_id_list):
+        self.profile_id = profile_id
+        self.area = area
+        # in topo.node_list order
+        self.node_id_list = node_id_list
+        # src node_id -> result of Encode_Source_Results()
+        self.result_dict = {}
+
+def Find_Island_Root(parent_dict, node_id):
+    root = node_id
+    while parent_dict[root] != root:
+        root = parent_dict[root]
+    while parent_dict[node_id] != root:
+        next_node_id = parent_dict[node_id]
+        parent_dict[node_id] = root
+        node_id = next_node_id
+    return root
+
+# Returns the islands sorted by profile, area and the position of
+# their first node in topo.node_list.
+def Find_All_MRT_Islands(topo):
+    # (profile_id, area) -> {node_id: parent node_id}
+    island_parent_dict = {}
+    for node in topo.node_list:
+        for intf in node.intf_list:
+            if ( intf.MRT_INELIGIBLE or intf.remote_intf.MRT_INELIGIBLE
+                 or intf.IGP_EXCLUDED ):
+                continue
+            for profile_id in node.profile_id_list:
+                if profile_id not in intf.remote_node.profile_id_list:
+                    continue
+                island_key = (profile_id, intf.area)
+                if island_key not in island_parent_dict:
+                    island_parent_dict[island_key] = {}
+                parent_dict = island_parent_dict[island_key]
+                for node_id in [node.node_id, intf.remote_node.node_id]:
+                    if node_id not in parent_dict:
+                        parent_dict[node_id] = node_id
+                root_a = Find_Island_Root(parent_dict, node.node_id)
+                root_b = Find_Island_Root(parent_dict,
+                                          intf.remote_node.node_id)
+                if root_a != root_b:
+                    parent_dict[root_b] = root_a
+    island_list = []
+    for island_key in sorted(island_parent_dict):
+        (profile_id, area) = island_key
+        parent_dict = island_parent_dict[island_key]
+        root_island_dict = {}
+        for node in topo.node_list:
+            if node.node_id not in parent_dict:
+                continue
+            root = Find_Island_Root(parent_dict, node.node_id)
+            if root not in root_island_dict:
+                island = MRT_Island(profile_id, area, [])
+                root_island_dict[root] = island
+                island_list.append(island)
+            root_island_dict[root].node_id_list.append(node.node_id)
+    return island_list
+
+def Island_File_Prefix_List(island_list, file_prefix):
+    file_prefix_list = []
+    island_count_dict = {}
+    for island in island_list:
+        island_key = (island.profile_id, island.area)
+        island_count_dict[island_key] = \
+            island_count_dict.get(island_key, 0) + 1
+        file_prefix_list.append('%s_profile%d_area%d_island%d'
+                                % (file_prefix, island.profile_id,
+                                   island.area,
+                                   island_count_dict[island_key]))
+    return file_prefix_list
+
+# Leaves the GADAG of island on topo, with topo.gadag_root set, and
+# returns the interfaces of other areas between its nodes that it
+# marked MRT_INELIGIBLE.
+def Compute_GADAG_For_Island(topo, island):
+    mrt.Reset_Computed_Node_and_Intf_Values(topo)
+    mrt.Compute_Island_GADAG(topo, topo.node_dict[island.node_id_list[0]],
+                             island.profile_id, island.area)
+    marked_intf_list = []
+    for node in topo.island_node_list:
+        for intf in node.intf_list:
+            if ( intf.area != island.area
+                 and intf.remote_node.IN_MRT_ISLAND
+                 and not intf.MRT_INELIGIBLE ):
+                intf.MRT_INELIGIBLE = True
+                marked_intf_list.append(intf)
+    return marked_intf_list
+
+def Unmark_Intfs_Ineligible(marked_intf_list):
+    for intf in marked_intf_list:
+        intf.MRT_INELIGIBLE = False
+
+def Run_MRT_for_All_Islands(topo, num_workers=None):
+    if num_workers == None:
+        num_workers = multiprocessing.cpu_count()
+    island_list = Find_All_MRT_Islands(topo)
+    task_list = []
+    for island_index in range(len(island_list)):
+        for src_node_id in island_list[island_index].node_id_list:
+            task_list.append((island_index, src_node_id))
+    if num_workers <= 1:
+        Init_Island_Worker(topo, island_list)
+        for task in task_list:
+            (island_index, src_node_id, result) = Run_Island_Worker(task)
+            island_list[island_index].result_dict[src_node_id] = result
+        Unmark_Intfs_Ineligible(island_worker_marked_intf_list)
+        return island_list
+    chunksize = max(1, len(task_list) // (num_workers * 8))
+    pool = multiprocessing.Pool(num_workers, Init_Island_Worker,
+                                (topo, island_list))
+    try:
+        for (island_index, src_node_id, result) in pool.imap_unordered(
+                Run_Island_Worker, task_list, chunksize):
+            island_list[island_index].result_dict[src_node_id] = result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return island_list
+
+# Only set in the worker processes of Run_MRT_for_All_Islands(), or in
+# this process when it runs without workers
+island_worker_topo = None
+island_worker_island_list = None
+# the index of the island whose GADAG is on island_worker_topo, and
+# the interfaces that Compute_GADAG_For_Island() marked for it
+island_worker_island_index = None
+island_worker_marked_intf_list = []
+
+def Init_Island_Worker(topo, island_list):
+    global island_worker_topo, island_worker_island_list
+    global island_worker_island_index, island_worker_marked_intf_list
+    island_worker_topo = topo
+    island_worker_island_list = island_list
+    island_worker_island_index = None
+    island_worker_marked_intf_list = []
+
+def Run_Island_Worker(task):
+    global island_worker_island_index, island_worker_marked_intf_list
+    (island_index, src_node_id) = task
+    topo = island_worker_topo
+    if island_index != island_worker_island_index:
+        Unmark_Intfs_Ineligible(island_worker_marked_intf_list)
+        island_worker_marked_intf_list = Compute_GADAG_For_Island(topo,
+            island_worker_island_list[island_index])
+        island_worker_island_index = island_index
+    src = topo.node_dict[src_node_id]
+    mrt.Run_MRT_for_One_Source_In_Island(topo, src)
+    result = mrt.Encode_Source_Results(src)
+    mrt.Clear_Source_Results(src)
+    return (island_index, src_node_id, result)
+
+# For each island in turn, the GADAG is computed again, the results of
+# its sources are decoded onto their nodes, and the output files are
+# written as Write_Output_To_Files() writes them for the test_gr
+# island.  The results of the last island are left on the nodes, and
+# topo.island_node_list_for_test_gr is put back afterwards.
+def Write_All_Island_Outputs_To_Files(topo, island_list, file_prefix):
+    file_prefix_list = Island_File_Prefix_List(island_list, file_prefix)
+    island_node_list_for_test_gr = topo.island_node_list_for_test_gr
+    try:
+        for island_index in range(len(island_list)):
+            island = island_list[island_index]
+            Unmark_Intfs_Ineligible(Compute_GADAG_For_Island(topo, island))
+            mrt.Store_GADAG_and_Named_Proxies_Once(topo)
+            for src in topo.node_list:
+                mrt.Clear_Source_Results(src)
+            for src_node_id in island.result_dict:
+                mrt.Decode_Source_Results(topo, topo.node_dict[src_node_id],
+                                          island.result_dict[src_node_id])
+            topo.island_node_list_for_test_gr = list(topo.island_node_list)
+            mrt.Write_Output_To_Files(topo, file_prefix_list[island_index])
+    finally:
+        topo.island_node_list_for_test_gr = island_node_list_for_test_gr
@@ -0,0 +1,532 @@
+# A persistent, size-bounded on-disk cache of the per-source results of
+# Run_MRT_for_All_Sources().
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.
+#
+# Run_MRT_for_All_Sources_Cached(topo, cache) computes the same
+# results as Run_MRT_for_All_Sources(topo), in three stages that are
+# cached separately, each under a hash of everything it depends on:
+# - the GADAG of the test_gr island (GADAG_Input_Key()): the nodes in
+#   node_list order with their GR_sel_priority and profile ids, their
+#   interfaces with metrics, areas and MRT_INELIGIBLE/IGP_EXCLUDED
+#   flags, test_gr, and whether test_gr has a profile 0 island.
+# - the island stage of each source (Island_Input_Key()), which is
+#   Run_MRT_for_One_Source_To_Island_Dests() for a source in the
+#   island and Run_Prim_SPF_for_One_Source_To_Nodes() for the others.
+#   It depends on the GADAG inputs and the alternate tie-break policy
+#   and seed, but not on the prefix advertisements.  Besides the
+#   results to the nodes, the entry keeps the values that the named
+#   proxy stage reads from the nodes, and the RED and BLUE alternate
+#   counts of the source.
+# - the named proxy stage of each source (Named_Proxy_Input_Key()),
+#   which depends on the island stage inputs and the prefix
+#   advertisements of every node.
+# Each stage is a single entry, with the results of every source for
+# the per-source stages.  So a change to only the prefix
+# advertisements recomputes only the named proxy stage of each
+# source, starting from its cached island stage.  On a hit of all three, only the named proxy stage of the
+# GADAG root is recomputed, to restore the named proxy nodes that
+# Store_GADAG_and_Named_Proxies_Once() keeps on topo.  Any change to
+# the GADAG inputs misses all three; topo.update_link() is the way to
+# recompute only the sources affected by a link change.  With the
+# 'RANDOM' tie-break policy a hit returns the alternates of the run
+# that filled the entry.
+#
+# The results are not pickled in the nested form of
+# Encode_Source_Results(), since pickling and unpickling O(N^2) small
+# tuples takes longer than computing them.  Instead, each next-hops
+# dict is packed into three arrays (the dest ids, the number of
+# next-hops to each dest, and the next-hops), and each alternates
+# dict into the dest ids, the number of alternates to each dest, and
+# for each alternate its failed_intf, red_or_blue, fec, prot, info,
+# number of next-hops and next-hops.  An interface is stored as its
+# position in Interface_Table() (-1 for None), which only depends on
+# inputs that are part of the key, and the strings of an Alternate
+# as their position in the value_list of the entry.
+#
+# Each entry is a zlib-compressed pickle in its own file in
+# cache_dir.  Reading an entry marks it as most recently used by
+# setting its modification time, and after each write the least
+# recently used entries are removed until the files fit in
+# max_bytes.  An entry that cannot be read back is treated as a miss,
+# and the hit_count and miss_count of the cache count each stage.
+# CACHE_VERSION is part of every key and must be changed whenever a
+# change to the algorithm changes its results.
+
+import array
+import cPickle as pickle
+import gc
+import hashlib
+import os
+import tempfile
+import zlib
+
+import mrt_lowpoint_draft_text as mrt
+
+CACHE_VERSION = '2'
+CACHE_FILE_SUFFIX = '.cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class Result_Cache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hit_count = 0
+        self.miss_count = 0
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+def Cache_Entry_Filename(cache, key):
+    return os.path.join(cache.cache_dir, key + CACHE_FILE_SUFFIX)
+
+def Get_Cache_Entry(cache, key):
+    filename = Cache_Entry_Filename(cache, key)
+    try:
+        with open(filename, 'rb') as cache_file:
+            value = pickle.loads(zlib.decompress(cache_file.read()))
+        os.utime(filename, None)
+    except (IOError, OSError, zlib.error, pickle.UnpicklingError,
+            EOFError, ValueError):
+        cache.miss_count += 1
+        return None
+    cache.hit_count += 1
+    return value
+
+# The entry is written to a temporary file that is then renamed, so
+# that other processes sharing cache_dir never read a partial entry.
+def Put_Cache_Entry(cache, key, value):
+    data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), 1)
+    (temp_fd, temp_filename) = tempfile.mkstemp(dir=cache.cache_dir,
+                                                suffix='.tmp')
+    with os.fdopen(temp_fd, 'wb') as temp_file:
+        temp_file.write(data)
+    os.rename(temp_filename, Cache_Entry_Filename(cache, key))
+    Evict_Least_Recently_Used_Entries(cache)
+
+def Evict_Least_Recently_Used_Entries(cache):
+    entry_list = []
+    total_bytes = 0
+    for name in os.listdir(cache.cache_dir):
+        if not name.endswith(CACHE_FILE_SUFFIX):
+            continue
+        filename = os.path.join(cache.cache_dir, name)
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        entry_list.append((stat.st_mtime, filename, stat.st_size))
+        total_bytes += stat.st_size
+    entry_list.sort()
+    for (mtime, filename, size) in entry_list:
+        if total_bytes <= cache.max_bytes:
+            break
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        total_bytes -= size
+
+def GADAG_Input_Key(topo):
+    key_hash = hashlib.sha1()
+    key_hash.update(repr((CACHE_VERSION, 'GADAG', topo.test_gr.node_id,
+                          topo.island_node_list_for_test_gr != [])))
+    for node in topo.node_list:
+        key_hash.update(repr((node.node_id, node.GR_sel_priority,
+                              sorted(node.profile_id_list))))
+        for intf in node.intf_list:
+            key_hash.update(repr((intf.link_data, intf.remote_node.node_id,
+                                  intf.remote_intf.link_data, intf.metric,
+                                  intf.area, intf.MRT_INELIGIBLE,
+                                  intf.IGP_EXCLUDED)))
+    return key_hash.hexdigest()
+
+def Island_Input_Key(topo, gadag_key):
+    key_hash = hashlib.sha1()
+    key_hash.update(repr((CACHE_VERSION, 'ISLAND', gadag_key,
+                          topo.alt_tie_break, topo.alt_tie_break_seed)))
+    return key_hash.hexdigest()
+
+def Named_Proxy_Input_Key(topo, island_key):
+    key_hash = hashlib.sha1()
+    key_hash.update(repr((CACHE_VERSION, 'NAMED_PROXY', island_key)))
+    for node in topo.node_list:
+        key_hash.update(repr((node.node_id,
+                              sorted(node.prefix_cost_dict.items()))))
+    return key_hash.hexdigest()
+
+def Interface_Table(topo):
+    intf_table = []
+    for node in topo.node_list:
+        intf_table.extend(node.intf_list)
+    return intf_table
+
+class Result_Encoder:
+    def __init__(self, topo):
+        self.intf_index_dict = {None: -1}
+        for (index, intf) in enumerate(Interface_Table(topo)):
+            self.intf_index_dict[intf] = index
+        self.value_list = []
+        self.value_index_dict = {}
+
+def Value_Index(encoder, value):
+    if value not in encoder.value_index_dict:
+        encoder.value_index_dict[value] = len(encoder.value_list)
+        encoder.value_list.append(value)
+    return encoder.value_index_dict[value]
+
+def Encode_Next_Hops_Arrays(encoder, next_hops_dict):
+    dest_array = array.array('l')
+    count_array = array.array('i')
+    intf_array = array.array('i')
+    intf_index_dict = encoder.intf_index_dict
+    for dest in next_hops_dict:
+        nh_list = next_hops_dict[dest]
+        dest_array.append(dest)
+        count_array.append(len(nh_list))
+        intf_array.extend([intf_index_dict[intf] for intf in nh_list])
+    return (dest_array.tostring(), count_array.tostring(),
+            intf_array.tostring())
+
+def Encode_Alternate_Arrays(encoder, alt_dict):
+    dest_array = array.array('l')
+    count_array = array.array('i')
+    alt_array = array.array('i')
+    intf_index_dict = encoder.intf_index_dict
+    for dest in alt_dict:
+        dest_array.append(dest)
+        count_array.append(len(alt_dict[dest]))
+        for alt in alt_dict[dest]:
+            alt_array.extend([intf_index_dict[alt.failed_intf],
+                              Value_Index(encoder, alt.red_or_blue),
+                              Value_Index(encoder, alt.fec),
+                              Value_Index(encoder, alt.prot),
+                              Value_Index(encoder, alt.info),
+                              len(alt.nh_list)])
+            alt_array.extend([intf_index_dict[intf]
+                              for intf in alt.nh_list])
+    return (dest_array.tostring(), count_array.tostring(),
+            alt_array.tostring())
+
+def Decode_Array(typecode, array_string):
+    decoded_array = array.array(typecode)
+    decoded_array.fromstring(array_string)
+    return decoded_array
+
+def Decode_Arrays(encoded_arrays):
+    (dest_string, count_string, item_string) = encoded_arrays
+    return (Decode_Array('l', dest_string), Decode_Array('i', count_string),
+            Decode_Array('i', item_string))
+
+def Decode_Next_Hops_Arrays(intf_table, encoded_arrays):
+    (dest_array, count_array, intf_array) = Decode_Arrays(encoded_arrays)
+    next_hops_dict = {}
+    pos = 0
+    for (dest, count) in zip(dest_array, count_array):
+        next_hops_dict[dest] = [intf_table[index]
+                                for index in intf_array[pos:pos + count]]
+        pos += count
+    return next_hops_dict
+
+def Decode_Alternate_Arrays(intf_table, value_list, encoded_arrays):
+    (dest_array, count_array, alt_array) = Decode_Arrays(encoded_arrays)
+    alt_dict = {}
+    pos = 0
+    for (dest, count) in zip(dest_array, count_array):
+        alt_list = []
+        for i in xrange(count):
+            alt = mrt.Alternate()
+            alt.failed_intf = intf_table[alt_array[pos]]
+            alt.red_or_blue = value_list[alt_array[pos + 1]]
+            alt.fec = value_list[alt_array[pos + 2]]
+            alt.prot = value_list[alt_array[pos + 3]]
+            alt.info = value_list[alt_array[pos + 4]]
+            num_nhs = alt_array[pos + 5]
+            pos += 6
+            alt.nh_list = [intf_table[index]
+                           for index in alt_array[pos:pos + num_nhs]]
+            pos += num_nhs
+            alt_list.append(alt)
+        alt_dict[dest] = alt_list
+    return alt_dict
+
+# The GADAG entry keeps the values of the GADAG that are read after
+# Compute_Island_GADAG(): the island nodes with their localroot,
+# block_id, topo_order and (sorted) island_intf_list, the
+# IN_MRT_ISLAND, UNDIRECTED, OUTGOING and INCOMING flags of every
+# interface, and the GADAG root.  The values that are only used while
+# the GADAG is built, like the DFS and lowpoint numbers, are left
+# reset by Restore_GADAG().
+def Encode_GADAG(encoder, topo):
+    island_array = array.array('l')
+    localroot_array = array.array('l')
+    block_id_array = array.array('l')
+    topo_order_array = array.array('l')
+    island_intf_dict = {}
+    for node in topo.island_node_list:
+        island_array.append(node.node_id)
+        if node.localroot == None:
+            localroot_array.append(-1)
+        else:
+            localroot_array.append(node.localroot.node_id)
+        block_id_array.append(node.block_id)
+        topo_order_array.append(node.topo_order)
+        island_intf_dict[node.node_id] = node.island_intf_list
+    flag_array = array.array('b')
+    for intf in Interface_Table(topo):
+        flag_array.append(intf.IN_MRT_ISLAND | intf.UNDIRECTED << 1
+                          | intf.OUTGOING << 2 | intf.INCOMING << 3)
+    if topo.island_node_list == []:
+        gadag_root_id = None
+    else:
+        gadag_root_id = topo.gadag_root.node_id
+    return (island_array.tostring(), localroot_array.tostring(),
+            block_id_array.tostring(), topo_order_array.tostring(),
+            Encode_Next_Hops_Arrays(encoder, island_intf_dict),
+            flag_array.tostring(), gadag_root_id,
+            topo.island_profile_id, topo.island_area)
+
+def Restore_GADAG(topo, entry, intf_table):
+    (island_string, localroot_string, block_id_string, topo_order_string,
+     island_intf_arrays, flag_string, gadag_root_id, island_profile_id,
+     island_area) = entry
+    mrt.Reset_Computed_Node_and_Intf_Values(topo)
+    node_dict = topo.node_dict
+    island_intf_dict = Decode_Next_Hops_Arrays(intf_table,
+                                               island_intf_arrays)
+    for (node_id, localroot_id, block_id, topo_order) in zip(
+            Decode_Array('l', island_string),
+            Decode_Array('l', localroot_string),
+            Decode_Array('l', block_id_string),
+            Decode_Array('l', topo_order_string)):
+        node = node_dict[node_id]
+        node.IN_MRT_ISLAND = True
+        if localroot_id != -1:
+            node.localroot = node_dict[localroot_id]
+        node.block_id = block_id
+        node.topo_order = topo_order
+        node.island_intf_list = island_intf_dict[node_id]
+        topo.island_node_list.append(node)
+    for (intf, flags) in zip(intf_table, Decode_Array('b', flag_string)):
+        intf.IN_MRT_ISLAND = bool(flags & 1)
+        intf.UNDIRECTED = bool(flags & 2)
+        intf.OUTGOING = bool(flags & 4)
+        intf.INCOMING = bool(flags & 8)
+    if gadag_root_id != None:
+        topo.gadag_root = node_dict[gadag_root_id]
+    topo.island_profile_id = island_profile_id
+    topo.island_area = island_area
+
+# The island stage of src is stored as its results to the nodes, and
+# the values that Run_MRT_for_One_Source_To_Named_Proxy_Nodes() reads
+# from the nodes.  Those are the same as the results for the island
+# nodes other than src, so only the HIGHER, LOWER and order_proxy of
+# the island nodes, the blue and red next-hops of src itself, the
+# primary next-hops of the nodes that are not in src.pnh_dict and the
+# primary_spf_metric of every node are stored in addition.
+def Encode_Island_Stage(encoder, topo, src):
+    flag_array = array.array('b')
+    order_proxy_array = array.array('l')
+    if src.IN_MRT_ISLAND:
+        for node in topo.island_node_list:
+            flag_array.append(node.HIGHER | node.LOWER << 1)
+            order_proxy_array.append(node.order_proxy.node_id)
+        src_blue_dict = {src.node_id: src.blue_next_hops}
+        src_red_dict = {src.node_id: src.red_next_hops}
+    else:
+        src_blue_dict = {}
+        src_red_dict = {}
+    other_pnh_dict = {}
+    metric_array = array.array('l')
+    for node in topo.node_list:
+        if node.node_id not in src.pnh_dict:
+            other_pnh_dict[node.node_id] = node.primary_next_hops
+        metric_array.append(node.primary_spf_metric)
+    return (Encode_Next_Hops_Arrays(encoder, src.blue_next_hops_dict),
+            Encode_Next_Hops_Arrays(encoder, src.red_next_hops_dict),
+            Encode_Next_Hops_Arrays(encoder, src.pnh_dict),
+            Encode_Alternate_Arrays(encoder, src.alt_dict),
+            flag_array.tostring(), order_proxy_array.tostring(),
+            Encode_Next_Hops_Arrays(encoder, src_blue_dict),
+            Encode_Next_Hops_Arrays(encoder, src_red_dict),
+            Encode_Next_Hops_Arrays(encoder, other_pnh_dict),
+            metric_array.tostring(),
+            topo.red_alt_count, topo.blue_alt_count)
+
+# intf_table is Interface_Table(topo) with None appended, so that
+# index -1 decodes to None.
+def Decode_Island_Stage_Results(src, result, intf_table, value_list):
+    (blue_arrays, red_arrays, pnh_arrays, alt_arrays) = result[:4]
+    mrt.Clear_Source_Results(src)
+    src.blue_next_hops_dict = Decode_Next_Hops_Arrays(intf_table,
+                                                      blue_arrays)
+    src.red_next_hops_dict = Decode_Next_Hops_Arrays(intf_table,
+                                                     red_arrays)
+    src.pnh_dict = Decode_Next_Hops_Arrays(intf_table, pnh_arrays)
+    src.alt_dict = Decode_Alternate_Arrays(intf_table, value_list,
+                                           alt_arrays)
+
+# The next-hop lists of the nodes are shared with the results of src,
+# since the island stage of the next source replaces them rather than
+# changing them.
+def Restore_Island_Stage(topo, src, result, intf_table, value_list):
+    (flag_string, order_proxy_string, src_blue_arrays, src_red_arrays,
+     other_pnh_arrays, metric_string, red_alt_count,
+     blue_alt_count) = result[4:]
+    Decode_Island_Stage_Results(src, result, intf_table, value_list)
+    node_dict = topo.node_dict
+    if src.IN_MRT_ISLAND:
+        blue_dict = Decode_Next_Hops_Arrays(intf_table, src_blue_arrays)
+        blue_dict.update(src.blue_next_hops_dict)
+        red_dict = Decode_Next_Hops_Arrays(intf_table, src_red_arrays)
+        red_dict.update(src.red_next_hops_dict)
+        for (node, flags, order_proxy_id) in zip(
+                topo.island_node_list, Decode_Array('b', flag_string),
+                Decode_Array('l', order_proxy_string)):
+            node.HIGHER = bool(flags & 1)
+            node.LOWER = bool(flags & 2)
+            node.order_proxy = node_dict[order_proxy_id]
+            node.blue_next_hops = blue_dict[node.node_id]
+            node.red_next_hops = red_dict[node.node_id]
+    pnh_dict = Decode_Next_Hops_Arrays(intf_table, other_pnh_arrays)
+    pnh_dict.update(src.pnh_dict)
+    for (node, metric) in zip(topo.node_list,
+                              Decode_Array('l', metric_string)):
+        node.primary_spf_metric = metric
+        node.primary_next_hops = pnh_dict[node.node_id]
+    topo.red_alt_count = red_alt_count
+    topo.blue_alt_count = blue_alt_count
+
+# The named proxy stage adds the results for the prefixes to the
+# results of the island stage of src.  A prefix with the same id as
+# a node replaces its results, as it does in Run_MRT_for_All_Sources().
+def Encode_Named_Proxy_Stage(encoder, topo, src):
+    dict_list = []
+    for results_dict in (src.blue_next_hops_dict, src.red_next_hops_dict,
+                         src.pnh_dict, src.alt_dict):
+        prefix_dict = {}
+        for prefix in topo.prefix_class_dict:
+            if prefix in results_dict:
+                prefix_dict[prefix] = results_dict[prefix]
+        dict_list.append(prefix_dict)
+    return (Encode_Next_Hops_Arrays(encoder, dict_list[0]),
+            Encode_Next_Hops_Arrays(encoder, dict_list[1]),
+            Encode_Next_Hops_Arrays(encoder, dict_list[2]),
+            Encode_Alternate_Arrays(encoder, dict_list[3]),
+            src.blue_to_green_nh_dict,
+            src.red_to_green_nh_dict)
+
+def Decode_Named_Proxy_Stage(src, result, intf_table, value_list):
+    (blue_arrays, red_arrays, pnh_arrays, alt_arrays,
+     blue_to_green_nh_dict, red_to_green_nh_dict) = result
+    src.blue_next_hops_dict.update(Decode_Next_Hops_Arrays(intf_table,
+                                                           blue_arrays))
+    src.red_next_hops_dict.update(Decode_Next_Hops_Arrays(intf_table,
+                                                          red_arrays))
+    src.pnh_dict.update(Decode_Next_Hops_Arrays(intf_table, pnh_arrays))
+    src.alt_dict.update(Decode_Alternate_Arrays(intf_table, value_list,
+                                                alt_arrays))
+    src.blue_to_green_nh_dict = blue_to_green_nh_dict
+    src.red_to_green_nh_dict = red_to_green_nh_dict
+
+def Run_Island_Stage(topo, src):
+    if src.IN_MRT_ISLAND:
+        mrt.Run_MRT_for_One_Source_To_Island_Dests(topo, src)
+    else:
+        mrt.Run_Prim_SPF_for_One_Source_To_Nodes(topo, src)
+
+def Run_Named_Proxy_Stage(topo, src):
+    if src.IN_MRT_ISLAND:
+        mrt.Run_MRT_for_One_Source_To_Named_Proxy_Nodes(topo, src)
+        if src is topo.gadag_root:
+            mrt.Store_GADAG_and_Named_Proxies_Once(topo)
+    else:
+        mrt.Run_Prim_SPF_for_One_Source_To_Named_Proxy_Nodes(topo, src)
+
+# Runs the sources in node_list order, as Run_MRT_for_All_Sources()
+# does.  The island stage of each source is restored from
+# island_entry, or computed and cached if island_entry is None, and
+# then its named proxy stage is computed and cached.
+def Run_Stages_for_All_Sources(topo, cache, island_key, proxy_key,
+                               island_entry):
+    intf_table = Interface_Table(topo) + [None]
+    if island_entry == None:
+        island_encoder = Result_Encoder(topo)
+        island_result_dict = {}
+    else:
+        (island_result_dict, island_value_list) = island_entry
+    proxy_encoder = Result_Encoder(topo)
+    proxy_result_dict = {}
+    for src in topo.node_list:
+        topo.init_new_source_in_island()
+        if island_entry == None:
+            mrt.Clear_Source_Results(src)
+            Run_Island_Stage(topo, src)
+            island_result_dict[src.node_id] = Encode_Island_Stage(
+                island_encoder, topo, src)
+        else:
+            Restore_Island_Stage(topo, src,
+                                 island_result_dict[src.node_id],
+                                 intf_table, island_value_list)
+        Run_Named_Proxy_Stage(topo, src)
+        proxy_result_dict[src.node_id] = Encode_Named_Proxy_Stage(
+            proxy_encoder, topo, src)
+    if island_entry == None:
+        Put_Cache_Entry(cache, island_key,
+                        (island_result_dict, island_encoder.value_list))
+    Put_Cache_Entry(cache, proxy_key,
+                    (proxy_result_dict, proxy_encoder.value_list,
+                     topo.red_alt_count, topo.blue_alt_count))
+
+# Decoding the entries creates O(N^2) objects that live as long as the
+# results, and no cyclic garbage, so the cyclic garbage collector is
+# disabled while they are created.  Otherwise its full collections,
+# which traverse every object of the topology, would take longer
+# than the decoding itself.
+def Run_MRT_for_All_Sources_Cached(topo, cache):
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        Run_Stages_Cached(topo, cache)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def Run_Stages_Cached(topo, cache):
+    gadag_key = GADAG_Input_Key(topo)
+    island_key = Island_Input_Key(topo, gadag_key)
+    proxy_key = Named_Proxy_Input_Key(topo, island_key)
+    intf_table = Interface_Table(topo) + [None]
+    gadag_entry = Get_Cache_Entry(cache, gadag_key)
+    if gadag_entry == None:
+        mrt.Compute_Test_GR_Island_GADAG(topo)
+        Put_Cache_Entry(cache, gadag_key,
+                        Encode_GADAG(Result_Encoder(topo), topo))
+    else:
+        Restore_GADAG(topo, gadag_entry, intf_table)
+    island_entry = Get_Cache_Entry(cache, island_key)
+    if island_entry == None:
+        Run_Stages_for_All_Sources(topo, cache, island_key, proxy_key,
+                                   None)
+        return
+    proxy_entry = Get_Cache_Entry(cache, proxy_key)
+    if proxy_entry == None:
+        Run_Stages_for_All_Sources(topo, cache, island_key, proxy_key,
+                                   island_entry)
+        return
+    (island_result_dict, island_value_list) = island_entry
+    (proxy_result_dict, proxy_value_list, red_alt_count,
+     blue_alt_count) = proxy_entry
+    if topo.island_node_list != []:
+        src = topo.gadag_root
+        topo.init_new_source_in_island()
+        Restore_Island_Stage(topo, src, island_result_dict[src.node_id],
+                             intf_table, island_value_list)
+        Run_Named_Proxy_Stage(topo, src)
+    for src in topo.node_list:
+        Decode_Island_Stage_Results(src, island_result_dict[src.node_id],
+                                    intf_table, island_value_list)
+        Decode_Named_Proxy_Stage(src, proxy_result_dict[src.node_id],
+                                 intf_table, proxy_value_list)
+    topo.red_alt_count = red_alt_count
+    topo.blue_alt_count = blue_alt_count
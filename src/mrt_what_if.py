@@ -0,0 +1,343 @@
+# A batch what-if engine that checks, for every single link or node
+# failure, whether the alternates computed by Run_MRT_for_All_Sources()
+# actually deliver packets to their destinations.
+#
+# Like mrt_lowpoint_draft_text.py, this program runs on Python 2.6
+# and 2.7.
+#
+# No MRTs are recomputed.  For a failure scenario, the only routers
+# that switch to an alternate are the points of local repair (PLRs):
+# the two ends of a failed link, or the neighbors of a failed node.
+# For each PLR, each destination in its alt_dict and each failed
+# interface among its primary next-hops to that destination, the
+# Alternate record for that interface is looked up and the packet is
+# followed hop by hop through the stored results of the other
+# routers:
+#
+#   - on the BLUE (RED) MRT, router X forwards over
+#     X.blue_next_hops_dict[dest] (X.red_next_hops_dict[dest]), and
+#     the packet moves to GREEN when X.blue_to_green_nh_dict[dest]
+#     (X.red_to_green_nh_dict[dest]) is set, as a PNAR does when it
+#     hands the packet to the LFIN of a named proxy node;
+#   - on GREEN, router X forwards over X.pnh_dict[dest].
+#
+# Packets are only repaired once, by the PLR.  With ECMP every
+# next-hop is followed, and an alternate delivers the packet only if
+# every branch reaches a router that is dest or that advertises the
+# prefix dest.  The outcome of each check is one of:
+#
+#   'DELIVERED'     every branch reached the destination
+#   'NO_ALTERNATE'  the PLR has no alternate (fec 'NO_ALTERNATE')
+#   'NO_NEXT_HOPS'  the alternate has a fec but no next-hops
+#   'HIT_FAILURE'   a branch tried to use a failed link
+#   'NO_ROUTE'      a branch reached a router with no next-hops
+#   'LOOP'          a branch came back to a router it had visited
+#                   with the same fec
+#
+# Destinations that the PLR cannot reach at all without the failed
+# link or node are not checked, since no alternate can reach them:
+# the failed node itself, the prefixes that only it advertises, and
+# the nodes and prefixes that the failure cuts off from the PLR (for
+# example, behind a failed cut-vertex or cut-link).  A failure
+# scenario is ('LINK', node_id, link_data), for the link on that
+# interface, or ('NODE', node_id).
+# Run_What_If_Scenarios() spreads batches of scenarios over a pool of
+# worker processes, each of which starts from a forked copy of the
+# computed topology, in the same way as
+# Run_MRT_for_All_Sources_Parallel().
+
+import multiprocessing
+
+import mrt_lowpoint_draft_text as mrt
+
+class What_If_Report:
+    def __init__(self):
+        self.num_scenarios = 0
+        # (scenario kind, alt.prot, outcome) -> number of checks
+        self.count_dict = {}
+        # (scenario, PLR node_id, dest, remote node_id and link_data
+        # of the failed primary next-hop, alt.fec, alt.prot, outcome)
+        # for every check that was not 'DELIVERED'
+        self.failure_list = []
+
+def Single_Link_Failure_Scenarios(topo):
+    scenario_list = []
+    for node in topo.node_list:
+        for intf in node.intf_list:
+            # each link once, from its end with the lower key
+            if (mrt.Intf_To_Key(intf) <
+                mrt.Intf_To_Key(intf.remote_intf)):
+                scenario_list.append(('LINK', node.node_id, intf.link_data))
+    return scenario_list
+
+def Single_Node_Failure_Scenarios(topo):
+    return [('NODE', node.node_id) for node in topo.node_list]
+
+def Prefix_Advertiser_Dict(topo):
+    advertiser_dict = {}
+    for node in topo.node_list:
+        for prefix in node.prefix_cost_dict:
+            if prefix in advertiser_dict:
+                advertiser_dict[prefix].append(node)
+            else:
+                advertiser_dict[prefix] = [node]
+    return advertiser_dict
+
+# Returns the set of failed interfaces, the failed node (or None) and
+# a list of (PLR, failed interface of the PLR).
+def Scenario_Failures(topo, scenario):
+    if scenario[0] == 'LINK':
+        intf = topo.node_dict[scenario[1]].intf_list[scenario[2]]
+        failed_intf_set = set([intf, intf.remote_intf])
+        plr_list = [(intf.local_node, intf),
+                    (intf.remote_node, intf.remote_intf)]
+        return (failed_intf_set, None, plr_list)
+    failed_node = topo.node_dict[scenario[1]]
+    failed_intf_set = set()
+    plr_list = []
+    for intf in failed_node.intf_list:
+        failed_intf_set.add(intf)
+        failed_intf_set.add(intf.remote_intf)
+        plr_list.append((intf.remote_node, intf.remote_intf))
+    return (failed_intf_set, failed_node, plr_list)
+
+# Maps each node that is not failed to the first node (in node_list
+# order) of its connected component once the failed interfaces are
+# removed.  The failed node is in no component.
+def Component_Dict_Without_Failures(topo, failed_intf_set, failed_node):
+    component_dict = {}
+    for start_node in topo.node_list:
+        if start_node is failed_node or start_node in component_dict:
+            continue
+        component_dict[start_node] = start_node
+        stack = [start_node]
+        while stack != []:
+            node = stack.pop()
+            for intf in node.intf_list:
+                if intf in failed_intf_set:
+                    continue
+                if intf.remote_node not in component_dict:
+                    component_dict[intf.remote_node] = start_node
+                    stack.append(intf.remote_node)
+    return component_dict
+
+def Is_Reachable(plr, dest, topo, component_dict, advertiser_dict):
+    plr_component = component_dict[plr]
+    if dest in topo.node_dict:
+        if component_dict.get(topo.node_dict[dest]) is plr_component:
+            return True
+    for node in advertiser_dict.get(dest, []):
+        if component_dict.get(node) is plr_component:
+            return True
+    return False
+
+def Is_Destination(node, dest):
+    return node.node_id == dest or dest in node.prefix_cost_dict
+
+# The next state of every branch of a packet for dest that router node
+# forwards over nh_list with the given fec, or the outcome if the
+# packet cannot be forwarded.
+def Forward_Packet(node, fec, nh_list, dest, failed_intf_set):
+    if nh_list == None or nh_list == []:
+        return ('NO_ROUTE', [])
+    next_fec = fec
+    if fec == 'BLUE' and node.blue_to_green_nh_dict.get(dest):
+        next_fec = 'GREEN'
+    elif fec == 'RED' and node.red_to_green_nh_dict.get(dest):
+        next_fec = 'GREEN'
+    next_state_list = []
+    for intf in nh_list:
+        if intf == None:
+            return ('NO_ROUTE', [])
+        if intf in failed_intf_set:
+            return ('HIT_FAILURE', [])
+        next_state_list.append((intf.remote_node, next_fec))
+    return (None, next_state_list)
+
+def Next_State_List(state, dest, failed_intf_set):
+    (node, fec) = state
+    if Is_Destination(node, dest):
+        return ('DELIVERED', [])
+    if fec == 'BLUE':
+        nh_list = node.blue_next_hops_dict.get(dest)
+    elif fec == 'RED':
+        nh_list = node.red_next_hops_dict.get(dest)
+    else:
+        nh_list = node.pnh_dict.get(dest)
+    return Forward_Packet(node, fec, nh_list, dest, failed_intf_set)
+
+# Depth-first search over the (router, fec) states reachable from
+# start_state.  outcome_dict holds the outcome of each finished state,
+# and 'ON_PATH' for the states on the current path, so that reaching
+# one of those again is a loop.  The outcome of a state is that of
+# the first of its branches that is not 'DELIVERED'.
+def Trace_From_State(start_state, dest, failed_intf_set, outcome_dict):
+    if start_state in outcome_dict:
+        outcome = outcome_dict[start_state]
+        if outcome == 'ON_PATH':
+            return 'LOOP'
+        return outcome
+    stack = [[start_state, None, 0]]
+    while stack != []:
+        entry = stack[-1]
+        state = entry[0]
+        if entry[1] == None:
+            (outcome, next_state_list) = Next_State_List(state, dest,
+                                                         failed_intf_set)
+            if outcome != None:
+                outcome_dict[state] = outcome
+                stack.pop()
+                continue
+            outcome_dict[state] = 'ON_PATH'
+            entry[1] = next_state_list
+        if entry[2] == len(entry[1]):
+            outcome_dict[state] = 'DELIVERED'
+            stack.pop()
+            continue
+        next_state = entry[1][entry[2]]
+        if next_state not in outcome_dict:
+            stack.append([next_state, None, 0])
+            continue
+        outcome = outcome_dict[next_state]
+        if outcome == 'ON_PATH':
+            outcome = 'LOOP'
+        if outcome == 'DELIVERED':
+            entry[2] += 1
+        else:
+            outcome_dict[state] = outcome
+            stack.pop()
+    return outcome_dict[start_state]
+
+def Check_Alternate(plr, dest, alt, failed_intf_set, outcome_dict):
+    if alt.fec == 'NO_ALTERNATE':
+        return 'NO_ALTERNATE'
+    if alt.nh_list == []:
+        return 'NO_NEXT_HOPS'
+    (outcome, next_state_list) = Forward_Packet(plr, alt.fec, alt.nh_list,
+                                                dest, failed_intf_set)
+    if outcome != None:
+        return outcome
+    for next_state in next_state_list:
+        outcome = Trace_From_State(next_state, dest, failed_intf_set,
+                                   outcome_dict)
+        if outcome != 'DELIVERED':
+            return outcome
+    return 'DELIVERED'
+
+def Add_Check_To_Report(report, scenario, plr, dest, failed_intf, alt,
+                        outcome):
+    if alt == None:
+        (fec, prot) = ('NO_ALTERNATE', 'NO_PROTECTION')
+    else:
+        (fec, prot) = (alt.fec, alt.prot)
+    count_key = (scenario[0], prot, outcome)
+    report.count_dict[count_key] = report.count_dict.get(count_key, 0) + 1
+    if outcome != 'DELIVERED':
+        report.failure_list.append((scenario, plr.node_id, dest,
+                                    failed_intf.remote_node.node_id,
+                                    failed_intf.link_data, fec, prot,
+                                    outcome))
+
+def Evaluate_Failure_Scenario(topo, scenario, report, advertiser_dict):
+    (failed_intf_set, failed_node, plr_list) = \
+        Scenario_Failures(topo, scenario)
+    report.num_scenarios += 1
+    component_dict = Component_Dict_Without_Failures(topo, failed_intf_set,
+                                                     failed_node)
+    # The outcome of a (router, fec) state only depends on dest and on
+    # the failure, so it is shared by all the PLRs of the scenario.
+    outcome_dict_by_dest = {}
+    for (plr, failed_intf) in plr_list:
+        for dest in plr.alt_dict:
+            if failed_intf not in plr.pnh_dict.get(dest, []):
+                continue
+            if not Is_Reachable(plr, dest, topo, component_dict,
+                                advertiser_dict):
+                continue
+            failed_alt = None
+            for alt in plr.alt_dict[dest]:
+                if alt.failed_intf is failed_intf:
+                    failed_alt = alt
+                    break
+            if failed_alt == None:
+                outcome = 'NO_ALTERNATE'
+            else:
+                if dest not in outcome_dict_by_dest:
+                    outcome_dict_by_dest[dest] = {}
+                outcome = Check_Alternate(plr, dest, failed_alt,
+                                          failed_intf_set,
+                                          outcome_dict_by_dest[dest])
+            Add_Check_To_Report(report, scenario, plr, dest, failed_intf,
+                                failed_alt, outcome)
+
+def Merge_What_If_Reports(report, other_report):
+    report.num_scenarios += other_report.num_scenarios
+    for count_key in other_report.count_dict:
+        report.count_dict[count_key] = (report.count_dict.get(count_key, 0)
+            + other_report.count_dict[count_key])
+    report.failure_list.extend(other_report.failure_list)
+
+def Evaluate_Scenario_Batch(topo, scenario_batch):
+    report = What_If_Report()
+    advertiser_dict = Prefix_Advertiser_Dict(topo)
+    for scenario in scenario_batch:
+        Evaluate_Failure_Scenario(topo, scenario, report, advertiser_dict)
+    return report
+
+# topo must hold the results of Run_MRT_for_All_Sources() (or
+# Run_MRT_for_All_Sources_Parallel()).  The failure_list of the
+# returned report is in scenario_list order.
+def Run_What_If_Scenarios(topo, scenario_list, num_workers=None,
+                          batch_size=None):
+    if num_workers == None:
+        num_workers = multiprocessing.cpu_count()
+    if num_workers <= 1:
+        return Evaluate_Scenario_Batch(topo, scenario_list)
+    if batch_size == None:
+        batch_size = max(1, len(scenario_list) // (num_workers * 8))
+    batch_list = []
+    for start in range(0, len(scenario_list), batch_size):
+        batch_list.append(scenario_list[start:start + batch_size])
+    report = What_If_Report()
+    pool = multiprocessing.Pool(num_workers, Init_What_If_Worker, (topo,))
+    try:
+        for batch_report in pool.imap(Run_What_If_Worker, batch_list):
+            Merge_What_If_Reports(report, batch_report)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return report
+
+# Only set in the worker processes of Run_What_If_Scenarios()
+what_if_worker_topo = None
+
+def Init_What_If_Worker(topo):
+    global what_if_worker_topo
+    what_if_worker_topo = topo
+
+def Run_What_If_Worker(scenario_batch):
+    return Evaluate_Scenario_Batch(what_if_worker_topo, scenario_batch)
+
+def Write_What_If_Report_To_Files(report, file_prefix):
+    with open(file_prefix + '_what_if_summary.csv', 'w') as summary_file:
+        summary_file.write('failure,prot,outcome,count\n')
+        for count_key in sorted(report.count_dict):
+            (kind, prot, outcome) = count_key
+            summary_file.write(kind + ',' + prot + ',' + outcome + ',' +
+                               str(report.count_dict[count_key]) + '\n')
+    with open(file_prefix + '_what_if_failures.csv', 'w') as failure_file:
+        failure_file.write('failure,failed.node,failed.link_data,plr,dest,'
+                           'prim_nh.remote_node,prim_nh.link_data,fec,'
+                           'prot,outcome\n')
+        for (scenario, plr_node_id, dest, remote_node_id, link_data, fec,
+             prot, outcome) in report.failure_list:
+            if scenario[0] == 'LINK':
+                failed_link_data = "%03d" % (scenario[2])
+            else:
+                failed_link_data = ''
+            failure_file.write(scenario[0] + ',' +
+                "%04d" % (scenario[1]) + ',' + failed_link_data + ',' +
+                "%04d" % (plr_node_id) + ',' + "%04d" % (dest) + ',' +
+                "%04d" % (remote_node_id) + ',' + "%03d" % (link_data) +
+                ',' + fec + ',' + prot + ',' + outcome + '\n')